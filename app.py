@@ -1,5 +1,6 @@
 # app.py
 
+import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -9,15 +10,25 @@ import os
 from streamlit_lottie import st_lottie
 from src.data_preparation import get_clean_data, add_features, normalize_features
 from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
+from src.column_stats import describe_columns
+from src.spatial_index import GridIndex, selection_rows
 from src.visualization import interactive_plot_distribution, interactive_plot_metrics
 
+# Points sent to the browser by the scatter plot (selections are answered server-side on all the rows)
+MAX_PLOTTED_POINTS = 5000
+
 
 # -- Page config ---------------------------------------
 st.set_page_config("Fake Metrics Dashboard", "📊", layout="wide")
 
 # -- Optional: Lottie animation ------------------------
+@st.cache_data(show_spinner=False)
 def load_lottie(url):
-    r = requests.get(url)
+    # Fetched once per server, not on every rerun; the dashboard works without it
+    try:
+        r = requests.get(url, timeout=5)
+    except requests.RequestException:
+        return None
     if r.status_code == 200:
         return r.json()
     return None
@@ -48,7 +59,8 @@ with st.sidebar.expander("ℹ️ How to interact with this dashboard", expanded=
     - **Hover** on a point to see its exact `(views, likes, anomaly)` values.  
     - **Drag** to zoom into a region.  
     - **Double-click** to reset the view.  
-    - Use the **lasso** or **box select** tools in the top-right menu to select subsets of points.  
+    - Use the **lasso** or **box select** tools in the top-right menu to select a region:
+      its rows and anomalies are listed below the plot.  
 
     **3) Histogram**  
     - **Hover** over a bar to see count & bin range.  
@@ -77,15 +89,31 @@ Load the dataset, generate new features, and normalize values for consistent ana
 - Data normalization to facilitate comparison across metrics.
 """)
 
-# Load and prepare the dataset
-data = get_clean_data(n_samples=500, save_if_generated=True)
-data = add_features(data)
-data = normalize_features(data)
-data = detect_anomalies(data, contamination=0.05)
-
-# Display an overview of the dataset
-st.write("### Dataset Preview", data.head())
-st.markdown("""
+# Each section below is a fragment: a widget change reruns only its own section,
+# and the prepared data / detection results are kept in the session state.
+
+def prepared_data():
+    # Loaded, enriched and normalized once per session
+    if 'prepared' not in st.session_state:
+        data = get_clean_data(n_samples=500, save_if_generated=True)
+        data = normalize_features(add_features(data))
+        st.session_state['prepared'] = data
+        # Grid index over views/likes: the coordinates do not depend on the detector settings
+        st.session_state['prepared_index'] = GridIndex.from_frame(data)
+    return st.session_state['prepared']
+
+def prepared_index():
+    prepared_data()
+    return st.session_state['prepared_index']
+
+def scored_data(contamination):
+    # Detection results for the current detector settings (same rows, in the same order, as the prepared data)
+    if st.session_state.get('scored_contamination') != contamination:
+        st.session_state['scored'] = detect_anomalies(prepared_data().copy(), contamination=contamination)
+        st.session_state['scored_contamination'] = contamination
+    return st.session_state['scored'], prepared_index()
+
+PREVIEW_TEXT = """
 **Dataset description:**  
 - **views**: Number of video views (standardized).  
 - **likes**: Number of video likes (standardized).  
@@ -104,10 +132,9 @@ st.markdown("""
 
 **Conclusion:**  
 In the preview above, all `anomaly` values are 0, meaning these observations are considered normal.
-""")
+"""
 
-st.write("### Descriptive Statistics", data.describe())
-st.markdown("""
+STATS_TEXT = """
 **Statistics breakdown:**  
 - **count:** Total number of observations.  
 - **mean:**  
@@ -120,13 +147,9 @@ st.markdown("""
   - anomaly ≈ 0.22 (binary dispersion).  
 - **min / max / percentiles:**  
   Shows the range and quartiles for each metric.
-""")
+"""
 
-# ====================================
-# 2. Interactive Scatter Plot
-# ====================================
-st.header("2. Interactive Scatter Plot: Views vs. Likes")
-st.markdown("""
+SCATTER_TEXT = """
 **Goal:**  
 Highlight the relationship between views and likes and spot anomalies visually.
 
@@ -143,16 +166,9 @@ Highlight the relationship between views and likes and spot anomalies visually.
 
 **Conclusion:**  
 Anomalous points stand out in red, indicating potential data issues (e.g. more likes than views).
-""")
+"""
 
-fig_interactive = interactive_plot_metrics(data)
-st.plotly_chart(fig_interactive, use_container_width=True, key="interactive_scatter")
-
-# ====================================
-# 3. Interactive Histogram: Views
-# ====================================
-st.header("3. Interactive Distribution of Views")
-st.markdown("""
+HISTOGRAM_TEXT = """
 **Goal:**  
 Show how views are distributed and allow dynamic exploration of data spread.
 
@@ -165,10 +181,64 @@ Show how views are distributed and allow dynamic exploration of data spread.
 
 **Conclusion:**  
 This helps identify where most observations lie (usually around 0) and spot any extreme values.
-""")
+"""
+
+@st.fragment
+def detection_section():
+    # Detector settings, then everything that depends on the anomaly flags
+    contamination = st.slider("Expected share of anomalies (contamination)", 0.01, 0.2, 0.05, 0.01,
+                              key="contamination")
+    data, index = scored_data(contamination)
+
+    # Display an overview of the dataset
+    st.write("### Dataset Preview", data.head())
+    st.markdown(PREVIEW_TEXT)
+
+    st.write("### Descriptive Statistics", describe_columns(data))
+    st.markdown(STATS_TEXT)
+
+    # ====================================
+    # 2. Interactive Scatter Plot
+    # ====================================
+    st.header("2. Interactive Scatter Plot: Views vs. Likes")
+    st.markdown(SCATTER_TEXT)
+
+    # The plot gets a thinned subset (plus every anomaly);
+    # the box / lasso selections are resolved on the full data
+    plotted = np.union1d(index.thin(MAX_PLOTTED_POINTS), np.flatnonzero(data['anomaly'].to_numpy() == 1))
+    fig_interactive = interactive_plot_metrics(data.iloc[plotted])
+    scatter = st.plotly_chart(fig_interactive, use_container_width=True, key="interactive_scatter",
+                              on_select="rerun", selection_mode=("box", "lasso"))
+
+    st.subheader("Selected region")
+    rows = selection_rows(index, scatter.selection)
+    if rows is None:
+        st.info("Draw a box or a lasso on the scatter plot to inspect a region.")
+    else:
+        region = data.iloc[rows]
+        rows_col, anomalies_col = st.columns(2)
+        rows_col.metric("Rows in the region", len(region))
+        anomalies_col.metric("Anomalies in the region", int(region['anomaly'].sum()))
+        st.write("### Anomalies in the region", region[region['anomaly'] == 1])
+
+@st.fragment
+def histogram_section():
+    # Only needs the prepared data: detector changes do not rerun it
+    st.header("3. Interactive Distribution of Views")
+    st.markdown(HISTOGRAM_TEXT)
+
+    column_col, bins_col = st.columns(2)
+    column = column_col.selectbox("Column", ['views', 'likes', 'like_view_ratio'], key="hist_column")
+    nbins = bins_col.slider("Bins", 10, 100, 30, 5, key="hist_bins")
+    fig_distribution = interactive_plot_distribution(prepared_data(), column=column, nbins=nbins)
+    st.plotly_chart(fig_distribution, use_container_width=True, key="interactive_hist")
+
+detection_section()
 
-fig_distribution = interactive_plot_distribution(data, column='views')
-st.plotly_chart(fig_distribution,   use_container_width=True, key="interactive_hist")
+# ====================================
+# 3. Interactive Histogram: Views
+# ====================================
+histogram_section()
 
 # ====================================
 # 4. Overall Conclusion
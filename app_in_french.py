@@ -1,12 +1,18 @@
 # app.py
 
+import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 from src.data_preparation import get_clean_data, add_features, normalize_features
 from src.anomaly_detection import detect_anomalies
+from src.column_stats import describe_columns
+from src.spatial_index import GridIndex, selection_rows
 from src.visualization import interactive_plot_distribution, interactive_plot_metrics
 
+# Points envoyés au navigateur par le scatter plot (les sélections sont calculées côté serveur sur toutes les lignes)
+MAX_PLOTTED_POINTS = 5000
+
 
 # ====================================
 # 1. Chargement et Préparation des Données
@@ -26,15 +32,31 @@ Charger le dataset, générer de nouvelles features et normaliser les valeurs po
 - La normalisation des données pour faciliter la comparaison entre les différentes métriques.
 """)
 
-# Load and prepare the dataset
-data = get_clean_data(n_samples=500, save_if_generated=True)
-data = add_features(data)
-data = normalize_features(data)
-data = detect_anomalies(data, contamination=0.05)
+# Each section below is a fragment: a widget change reruns only its own section,
+# and the prepared data / detection results are kept in the session state.
 
-# Dislay an overview of the dataset
-st.write("### Aperçu du dataset", data.head())
-st.markdown("""
+def prepared_data():
+    # Loaded, enriched and normalized once per session
+    if 'prepared' not in st.session_state:
+        data = get_clean_data(n_samples=500, save_if_generated=True)
+        data = normalize_features(add_features(data))
+        st.session_state['prepared'] = data
+        # Grid index over views/likes: the coordinates do not depend on the detector settings
+        st.session_state['prepared_index'] = GridIndex.from_frame(data)
+    return st.session_state['prepared']
+
+def prepared_index():
+    prepared_data()
+    return st.session_state['prepared_index']
+
+def scored_data(contamination):
+    # Detection results for the current detector settings (same rows, in the same order, as the prepared data)
+    if st.session_state.get('scored_contamination') != contamination:
+        st.session_state['scored'] = detect_anomalies(prepared_data().copy(), contamination=contamination)
+        st.session_state['scored_contamination'] = contamination
+    return st.session_state['scored'], prepared_index()
+
+PREVIEW_TEXT = """
 **Description du dataset :**
 - **views** : Nombre de vues sur la vidéo (standardisées).
 - **likes** : Nombre de likes sur la vidéo (standardisées).
@@ -56,10 +78,9 @@ st.markdown("""
 
 **Conclusion :**  
 Dans les 5 premières lignes, anomaly est 0 partout, donc ces observations sont considérées normales par l’algorithme.
-""")            
+"""
 
-st.write("### Statistiques descriptives", data.describe())
-st.markdown("""
+STATS_TEXT = """
 **Description des statistiques :**
 - **count** : Nous avons 1000 lignes d'observations dans le dataset.
             
@@ -89,12 +110,9 @@ st.markdown("""
 
 **Conclusion :**  
 Dans les 5 premières lignes, anomaly est 0 partout, donc ces observations sont considérées normales par l’algorithme.
-""")  
-# ====================================
-# 2. Analyse visuelle : Scatter Plot
-# ====================================
-st.header("2. Scatter Plot Interactif des Vues vs Likes")
-st.markdown("""
+"""
+
+SCATTER_TEXT = """
 **But :**  
 Le scatter plot met en évidence la relation entre vues et likes, et permet de repérer visuellement les observations qui s’écartent de la tendance générale (les anomalies).
             
@@ -129,17 +147,9 @@ Les anomalies sont clairement identifiées et indiquent des incohérences potent
 - En général, on observe une tendance croissante (plus il y a de vues, plus il y a de likes).
 - Les points colorés différemment (Anomaly) indiquent des observations que l’algorithme juge peu probables (e.g., beaucoup de likes pour un nombre de vues standardisé faible, ou l’inverse).
 - Un point (views = -1.0, likes = 2.0) signifierait qu’il est 1 écart-type en dessous de la moyenne pour les vues, mais 2 écarts-types au-dessus pour les likes (cas potentiellement anormal, car on n’attend pas tant de likes pour un faible nombre de vues).
-""")
-
-# Generate an interative plot with Plotly
-fig_interactive = interactive_plot_metrics(data)  
-st.plotly_chart(fig_interactive, use_container_width=True)
+"""
 
-# ======================================================
-# 3. Analyse visuelle : Distribution Interactive des Vues
-# ======================================================
-st.header("3. Distribution Interactive des Vues")
-st.markdown("""
+HISTOGRAM_TEXT = """
 **But :**  
 Montre comment les valeurs de views sont réparties sur l’axe (standardisé), et permet de voir où se situe le « cœur » des observations et d’évaluer l’étendue (jusqu’à -1.5, +1.5, etc.).
 
@@ -168,11 +178,65 @@ L’histogramme permet de voir où se situe la majorité des observations (souve
 - S’il y a des barres élevées autour de -1 ou +1, on comprend qu’un pourcentage non négligeable de posts se trouvent avec des vues plus faibles ou plus élevées que la moyenne.
 - Les valeurs extrêmes (vers -1.5 ou +1.5, etc.) peuvent indiquer des outliers potentiels, selon la forme de la distribution.
 - La visualisation interactive révèle la dispersion des vues et met en évidence des éventuelles anomalies dans la répartition des données.
-""")
+"""
+
+@st.fragment
+def detection_section():
+    # Detector settings, then everything that depends on the anomaly flags
+    contamination = st.slider("Part attendue d'anomalies (contamination)", 0.01, 0.2, 0.05, 0.01,
+                              key="contamination")
+    data, index = scored_data(contamination)
+
+    # Dislay an overview of the dataset
+    st.write("### Aperçu du dataset", data.head())
+    st.markdown(PREVIEW_TEXT)
+
+    st.write("### Statistiques descriptives", describe_columns(data))
+    st.markdown(STATS_TEXT)
+
+    # ====================================
+    # 2. Analyse visuelle : Scatter Plot
+    # ====================================
+    st.header("2. Scatter Plot Interactif des Vues vs Likes")
+    st.markdown(SCATTER_TEXT)
 
-# Generate an interative histogram with Plotly
-fig_distribution = interactive_plot_distribution(data, column='views')
-st.plotly_chart(fig_distribution, use_container_width=True)
+    # The plot gets a thinned subset (plus every anomaly);
+    # the box / lasso selections are resolved on the full data
+    plotted = np.union1d(index.thin(MAX_PLOTTED_POINTS), np.flatnonzero(data['anomaly'].to_numpy() == 1))
+    fig_interactive = interactive_plot_metrics(data.iloc[plotted])
+    scatter = st.plotly_chart(fig_interactive, use_container_width=True, key="interactive_scatter",
+                              on_select="rerun", selection_mode=("box", "lasso"))
+
+    st.subheader("Région sélectionnée")
+    rows = selection_rows(index, scatter.selection)
+    if rows is None:
+        st.info("Tracez un rectangle ou un lasso sur le scatter plot pour inspecter une région.")
+    else:
+        region = data.iloc[rows]
+        rows_col, anomalies_col = st.columns(2)
+        rows_col.metric("Lignes dans la région", len(region))
+        anomalies_col.metric("Anomalies dans la région", int(region['anomaly'].sum()))
+        st.write("### Anomalies de la région", region[region['anomaly'] == 1])
+
+@st.fragment
+def histogram_section():
+    # Only needs the prepared data: detector changes do not rerun it
+    st.header("3. Distribution Interactive des Vues")
+    st.markdown(HISTOGRAM_TEXT)
+
+    # Generate an interative histogram with Plotly
+    column_col, bins_col = st.columns(2)
+    column = column_col.selectbox("Colonne", ['views', 'likes', 'like_view_ratio'], key="hist_column")
+    nbins = bins_col.slider("Nombre d'intervalles", 10, 100, 30, 5, key="hist_bins")
+    fig_distribution = interactive_plot_distribution(prepared_data(), column=column, nbins=nbins)
+    st.plotly_chart(fig_distribution, use_container_width=True, key="interactive_hist")
+
+detection_section()
+
+# ======================================================
+# 3. Analyse visuelle : Distribution Interactive des Vues
+# ======================================================
+histogram_section()
 
 # ====================================
 # 4. Conclusion générale
@@ -0,0 +1,75 @@
+# benchmarks/bench_logging.py
+
+# Cost of a diagnostic log call on the scoring path: no handler, a plain
+# synchronous FileHandler, and the queue logging of src.utils (the caller only
+# enqueues the record; a listener thread formats and writes it).
+#   python benchmarks/bench_logging.py --batches 5000
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.anomaly_detection import FEATURES, score_features, train_isolation_forest  # noqa: E402
+from src.data_preparation import simulate_data  # noqa: E402
+from src.utils import setup_queue_logging, stop_queue_logging  # noqa: E402
+
+
+def _run(logger, model, batches):
+    start = time.perf_counter()
+    for i, batch in enumerate(batches):
+        scores, flags = score_features(model, batch)
+        logger.info("Scored batch %d: %d rows, %d anomalies", i, len(batch), int(flags.sum()))
+    return time.perf_counter() - start
+
+
+def bench(model, batches, directory):
+    rows = []
+
+    logger = logging.getLogger('bench.none')
+    logger.propagate = False
+    logger.addHandler(logging.NullHandler())
+    rows.append(('no handler', _run(logger, model, batches)))
+
+    logger = logging.getLogger('bench.sync')
+    logger.propagate = False
+    handler = logging.FileHandler(os.path.join(directory, 'sync.log'))
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    rows.append(('FileHandler', _run(logger, model, batches)))
+    handler.close()
+
+    setup_queue_logging('bench.queue', log_file=os.path.join(directory, 'queue.log'), console=False)
+    logger = logging.getLogger('bench.queue')
+    logger.propagate = False
+    rows.append(('queue', _run(logger, model, batches)))
+    stop_queue_logging('bench.queue')
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the logging overhead of the scoring path.")
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    data = simulate_data(args.batches * args.batch_size, n_accounts=10)
+    model = train_isolation_forest(data)
+    features = data[FEATURES].to_numpy()
+    batches = [features[i:i + args.batch_size] for i in range(0, len(features), args.batch_size)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        rows = bench(model, batches, directory)
+    baseline = rows[0][1]
+    print(f"{'logging':<14}{'seconds':>10}{'us/batch':>12}{'overhead':>10}")
+    for label, seconds in rows:
+        print(f"{label:<14}{seconds:>10.3f}{1e6 * seconds / len(batches):>12.1f}{seconds / baseline - 1:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_pipelined.py
+
+# Chunked detection run: the same read -> prepare -> score -> write steps
+# executed one chunk after the other, then through the threaded pipeline of
+# src.pipelined (bounded queues between the stages).
+#   python benchmarks/bench_pipelined.py --rows 2000000 --chunk-size 100000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.data_preparation import simulate_data  # noqa: E402
+from src.pipelined import ChunkedDetector  # noqa: E402
+from src.results_store import ResultsStore  # noqa: E402
+
+
+def serial(path, store, chunk_size):
+    detector = ChunkedDetector(store=store, run_id='serial')
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        detector.write(detector.score(detector.prepare(chunk)))
+    return detector.rows
+
+
+def pipelined(path, store, chunk_size, queue_size):
+    detector = ChunkedDetector(store=store, run_id='pipelined')
+    stats = detector.run(pd.read_csv(path, chunksize=chunk_size), queue_size=queue_size)
+    return detector.rows, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipelined chunked run against a serial loop.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--queue-size', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'raw.csv')
+        simulate_data(args.rows, n_accounts=10).to_csv(path, index=False)
+        store = ResultsStore(os.path.join(directory, 'results'))
+
+        start = time.perf_counter()
+        serial(path, store, args.chunk_size)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, stats = pipelined(path, store, args.chunk_size, args.queue_size)
+        pipelined_s = time.perf_counter() - start
+
+    print(f"{'run':<12}{'seconds':>10}{'rows/s':>14}")
+    print(f"{'serial':<12}{serial_s:>10.3f}{args.rows / serial_s:>14,.0f}")
+    print(f"{'pipelined':<12}{pipelined_s:>10.3f}{args.rows / pipelined_s:>14,.0f}")
+    print("busy time per stage: " + ', '.join(f"{name} {s['busy_s']:.2f}s" for name, s in stats.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_spatial_index.py
+
+# Dashboard selections: a full scan of the (views, likes) columns versus the
+# grid index of src.spatial_index, for small box and lasso regions.
+#   python benchmarks/bench_spatial_index.py --rows 5000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.data_preparation import simulate_data  # noqa: E402
+from src.spatial_index import GridIndex, _inside_polygon  # noqa: E402
+
+
+def _best(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the grid index against full scans.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = simulate_data(args.rows)
+    x, y = data['views'].to_numpy(dtype=float), data['likes'].to_numpy(dtype=float)
+    start = time.perf_counter()
+    index = GridIndex(x, y)
+    build = time.perf_counter() - start
+
+    box = ((400, 420), (100, 150))
+    lasso = np.array([(400, 100), (430, 110), (420, 160), (395, 140)], dtype=float)
+    cases = [
+        ('box scan', lambda: np.flatnonzero((x >= 400) & (x <= 420) & (y >= 100) & (y <= 150))),
+        ('box index', lambda: index.query_box(*box)),
+        ('lasso scan', lambda: np.flatnonzero(_inside_polygon(x, y, lasso[:, 0], lasso[:, 1]))),
+        ('lasso index', lambda: index.query_polygon(lasso)),
+    ]
+    print(f"index build: {build:.3f}s for {args.rows:,} rows, {index.shape[0]}x{index.shape[1]} cells")
+    print(f"{'query':<14}{'ms':>10}")
+    for label, func in cases:
+        print(f"{label:<14}{1e3 * _best(func, args.repeat):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_write_throughput.py
+
+# Write throughput of the pipeline outputs: plain DataFrame.to_csv versus the
+# atomic buffered writer of src.utils, for every format / compression.
+#   python benchmarks/bench_write_throughput.py --rows 1000000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.data_preparation import simulate_data  # noqa: E402
+from src.utils import write_frame  # noqa: E402
+
+CASES = [
+    ('to_csv (direct)', 'out.csv', None),
+    ('csv', 'out.csv', 'infer'),
+    ('csv.gz', 'out.csv.gz', 'infer'),
+    ('csv.bz2', 'out.csv.bz2', 'infer'),
+    ('csv.xz', 'out.csv.xz', 'infer'),
+    ('json', 'out.json', 'infer'),
+    ('parquet', 'out.parquet', 'infer'),
+]
+
+
+def bench(data, repeat=3):
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for label, name, compression in CASES:
+            path = os.path.join(directory, name)
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                if compression is None:
+                    data.to_csv(path, index=False)
+                else:
+                    write_frame(data, path, compression=compression)
+                best = min(best, time.perf_counter() - start)
+            rows.append((label, best, os.path.getsize(path)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the write throughput of the pipeline outputs.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data = simulate_data(args.rows, n_accounts=10)
+    print(f"{'format':<16}{'seconds':>10}{'MB':>10}{'rows/s':>14}")
+    for label, seconds, size in bench(data, repeat=args.repeat):
+        print(f"{label:<16}{seconds:>10.3f}{size / 1e6:>10.2f}{args.rows / seconds:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
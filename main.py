@@ -1,61 +1,341 @@
-from src.data_preparation import get_clean_data, normalize_features, add_features
-from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from src.data_preparation import (get_data, get_clean_data, clean_data, normalize_features, add_features,
+                                  RAW_DATA_PATH)
+from src.sql_source import read_sql, read_sql_chunks
+from src.results_store import ResultsStore, new_run_id
+from src.pipelined import ChunkedDetector
+from src.anomaly_detection import (detect_anomalies, detect_anomalies_lof, detect_anomalies_by,
+                                   detect_anomalies_sampled, prepare_features, sampling_agreement)
 from src.visualization import plot_metrics, plot_distribution, interactive_plot_metrics, interactive_plot_distribution
 from src.generate_report import generate_report
+from src.segment_reports import generate_segment_reports
+from src.instrumentation import RunMetrics
+from src.rules import RULE_COLUMN, flag_rule_violations
+from src.profiling import configure_profiling, reset_profiling, PROFILERS, PROFILE_ENV
+from src.utils import setup_logger, setup_queue_logging, stop_queue_logging
+
+# Structured per-stage records (wall/CPU time, increase of the peak RSS, rows) are written here
+PIPELINE_LOG = 'pipeline.log'
+
+# Optional stages (data preparation always runs) and the stages they need
+STAGES = ('detect', 'plots', 'interactive', 'report')
+STAGE_REQUIREMENTS = {'plots': ('detect',), 'report': ('detect', 'plots')}
+
+# Names of the measured (and profilable) stages; the --stages names are accepted as aliases
+PROFILE_STAGES = ('data_preparation', 'detection', 'store', 'plotting', 'interactive_plotting', 'report',
+                  'pipelined_detection')
+PROFILE_ALIASES = {'detect': 'detection', 'plots': 'plotting', 'interactive': 'interactive_plotting'}
+
+def _profile_list(value):
+    # argparse type for "--profile detection,report" (or "all"): unknown names would silently profile nothing
+    stages = [PROFILE_ALIASES.get(s.strip(), s.strip()) for s in value.split(',') if s.strip()]
+    if stages == ['all']:
+        return stages
+    unknown = [s for s in stages if s not in PROFILE_STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {', '.join(unknown)}; choose from "
+                                         f"{', '.join(PROFILE_STAGES)} (or {', '.join(PROFILE_ALIASES)})")
+    return stages
+
+def _max_samples(value):
+    # argparse type of --max-samples: 'auto', a row count or a fraction of the training rows
+    if value == 'auto':
+        return value
+    try:
+        number = float(value) if '.' in value else int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'auto', a row count or a fraction, got {value!r}")
+    if number <= 0 or (isinstance(number, float) and number > 1):
+        raise argparse.ArgumentTypeError("a row count must be positive and a fraction in (0, 1]")
+    return number
+
+def _stage_list(value):
+    # argparse type for "--stages detect,report" (or "all")
+    stages = [s.strip() for s in value.split(',') if s.strip()]
+    if stages == ['all']:
+        return list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+    return stages
+
+def parse_args(argv=None):
+    # Build the command line of the analysis pipeline. Defaults reproduce the historical main() run.
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description="Detect fake views/likes metrics, plot them and generate a PDF report.")
+
+    inputs = parser.add_argument_group('inputs / outputs')
+    inputs.add_argument('--raw-path', default=RAW_DATA_PATH, help="raw CSV (simulated and saved if missing); the --clean-path cache "
+                             "is reused unless this file is newer")
+    inputs.add_argument('--clean-path', default=None,
+                        help="cleaned CSV cache of --raw-path (default: one cache per raw file under data/processed)")
+    inputs.add_argument('--source-db', default=None, metavar='PATH',
+                        help="read the metrics from this SQLite database instead of the CSV files")
+    inputs.add_argument('--source-table', default='metrics', help="table of --source-db")
+    inputs.add_argument('--n-samples', type=int, default=500, help="rows to simulate when no raw data exists")
+    inputs.add_argument('--plots-dir', default='plots', help="directory of the generated plots")
+    inputs.add_argument('--column', default='views', help="column of the distribution plots")
+    inputs.add_argument('--results-store', default=None, metavar='DIR',
+                        help="append the scored rows to this partitioned Parquet store")
+    inputs.add_argument('--run-id', default=None, help="run partition of --results-store (default: timestamp)")
+    inputs.add_argument('--output', default='FakeMetrics_Report.pdf', help="PDF report path")
+    inputs.add_argument('--segment-by', default=None, metavar='COLUMN',
+                        help="also write one report per value of this column (e.g. account), in parallel")
+    inputs.add_argument('--segment-dir', default='reports', help="directory of the per-segment reports")
+
+    run = parser.add_argument_group('run')
+    run.add_argument('--stages', type=_stage_list, default=list(STAGES),
+                     help=f"comma separated stages among {', '.join(STAGES)} (default: all)")
+    run.add_argument('--headless', action='store_true',
+                     help="never open plot windows (non-interactive matplotlib backend)")
+    run.add_argument('--workers', type=int, default=1,
+                     help="parallel jobs of the detectors, --group-by models and --segment-by reports "
+                          "(default: 1, -1 = all cores)")
+    run.add_argument('--chunk-size', type=int, default=None, metavar='ROWS',
+                     help="stream the input in chunks through overlapped read/prepare/score/write threads "
+                          "(IsolationForest only; needs --stages detect and --results-store)")
+    run.add_argument('--queue-size', type=int, default=4, help="chunks buffered between two --chunk-size stages")
+    run.add_argument('--log-file', default=PIPELINE_LOG, help="structured per-stage log")
+    run.add_argument('--metrics-json', default=None, help="also dump the stage metrics to this JSON file")
+
+    detector = parser.add_argument_group('detectors')
+    detector.add_argument('--contamination', type=float, default=0.05, help="expected ratio of anomalies")
+    detector.add_argument('--n-neighbors', type=int, default=20, help="neighbors used by LOF")
+    detector.add_argument('--group-by', default=None, metavar='COLUMN',
+                          help="fit one IsolationForest per group of this column (e.g. account), in parallel")
+    detector.add_argument('--min-group-size', type=int, default=50,
+                          help="with --group-by, smaller groups share a pooled model")
+    detector.add_argument('--train-sample-size', type=int, default=None, metavar='N',
+                          help="train IsolationForest on at most N sampled rows, then score every row in batches "
+                               "(with --chunk-size: sampled by a first pass over the whole input)")
+    detector.add_argument('--sample-strategy', choices=('reservoir', 'stratified'), default='reservoir')
+    detector.add_argument('--n-estimators', type=int, default=100, help="trees of the sampled IsolationForest")
+    detector.add_argument('--max-samples', type=_max_samples, default='auto',
+                          help="rows drawn per tree of the sampled IsolationForest ('auto', a count or a fraction)")
+    detector.add_argument('--report-agreement', action='store_true',
+                          help="with --train-sample-size, also train on every row and report how much the "
+                               "sampled flags agree with it (costs a full training)")
+    detector.add_argument('--float32', action='store_true',
+                          help="build one C-contiguous float32 feature array shared by both detectors")
+    detector.add_argument('--dedup', action='store_true',
+                          help="IsolationForest scores each distinct (views, likes) pair once and broadcasts "
+                               "the result to its duplicates (same flags)")
+    detector.add_argument('--lof-dedup', action='store_true',
+                          help="LOF also queries each distinct pair once; its flags then differ from the plain "
+                               "LOF when neighbor distances tie, as on repeated integer counts")
+    detector.add_argument('--rules', action='store_true',
+                          help="flag deterministic violations (likes > views, negative counts) before the "
+                               "detectors and keep them out of model training")
+    detector.add_argument('--max-ratio', type=float, default=None,
+                          help="with --rules, also flag rows whose likes/views ratio exceeds this value")
+
+    profiling = parser.add_argument_group('profiling')
+    profiling.add_argument('--profile', type=_profile_list, default=None, metavar='STAGES',
+                           help=f"profile these stages (comma separated among {', '.join(PROFILE_STAGES)}, "
+                                f"the --stages names, or 'all'; default: ${PROFILE_ENV})")
+    profiling.add_argument('--profiler', choices=PROFILERS, default=None)
+    profiling.add_argument('--profile-dir', default=None)
+
+    args = parser.parse_args(argv)
+    if args.profile is None and os.environ.get(PROFILE_ENV):
+        try:
+            args.profile = _profile_list(os.environ[PROFILE_ENV])
+        except argparse.ArgumentTypeError as e:
+            parser.error(f"{PROFILE_ENV}: {e}")
+    for stage, requirements in STAGE_REQUIREMENTS.items():
+        for required in requirements:
+            if stage in args.stages and required not in args.stages:
+                parser.error(f"stage '{stage}' requires stage '{required}'")
+    if args.workers == 0:
+        parser.error("--workers must be positive, or -1 for all cores")
+    if not 0 < args.contamination <= 0.5:
+        parser.error("--contamination must be in (0, 0.5]")
+    if args.results_store and args.train_sample_size and args.chunk_size is None:
+        parser.error("--results-store stores the detector scores, which --train-sample-size does not produce")
+    if args.train_sample_size and args.chunk_size is None and args.dedup:
+        parser.error("--dedup has no effect with --train-sample-size (each row is scored once anyway)")
+    if (args.report_agreement or args.max_samples != 'auto') and not args.train_sample_size:
+        parser.error("--report-agreement and --max-samples apply to --train-sample-size")
+    if args.chunk_size is not None and (args.report_agreement or args.max_samples != 'auto'):
+        parser.error("--report-agreement and --max-samples are not available with --chunk-size")
+    if args.chunk_size is not None:
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be positive")
+        if args.stages != ['detect'] or not args.results_store:
+            parser.error("--chunk-size only runs the detect stage: use --stages detect and --results-store")
+        if args.group_by:
+            parser.error("--chunk-size cannot be combined with --group-by")
+    return args
+
+def main(argv=None):
+    # argv=None runs with the default options (the command line is only read when run as a script)
+    args = parse_args([] if argv is None else argv)
+    show = not args.headless
+    if args.headless:
+        import matplotlib.pyplot as plt
+        plt.switch_backend('Agg')
+    # Diagnostics of the src modules go through a queue, written by a background thread
+    setup_queue_logging()
+    reset_profiling()
+    configure_profiling(stages=args.profile, profiler=args.profiler, output_dir=args.profile_dir)
+
+    metrics = RunMetrics(setup_logger('fake_metrics.pipeline', args.log_file))
+
+    if args.chunk_size:
+        # Chunked run: the reader, preparation, scoring and writing of successive chunks overlap
+        # The work runs in the pipeline threads: profiled with every thread (see profiling.profile_stage)
+        with metrics.stage('pipelined_detection', threads=True) as stage:
+            detector = ChunkedDetector(store=ResultsStore(args.results_store), run_id=args.run_id,
+                                       contamination=args.contamination, rules=args.rules,
+                                       max_ratio=args.max_ratio, n_jobs=args.workers)
+            if args.train_sample_size:
+                # First pass: the model is fitted on a uniform sample of the whole input
+                detector.fit_sample(_read_chunks(args), args.train_sample_size)
+            stage['pipeline'] = detector.run(_read_chunks(args), queue_size=args.queue_size)
+            stage['rows'] = detector.rows
+        return _finish(args, metrics)
+
+    with metrics.stage('data_preparation') as stage:
+        if args.source_db:
+            # Only the analyzed columns are read from the database
+            columns = list(dict.fromkeys(['views', 'likes'] + [c for c in (args.group_by, args.segment_by) if c]))
+            data = read_sql(args.source_db, args.source_table, columns=columns)
+            if data is None:
+                raise SystemExit(f"Cannot read '{args.source_table}' from {args.source_db}")
+            data = clean_data(data)
+        else:
+            # Load or generate then clean the dataset
+            data = get_clean_data(raw_filepath=args.raw_path, clean_filepath=args.clean_path,
+                                  n_samples=args.n_samples, save_if_generated=True)
+
+        # Fast-path rule checks, on the raw counts (before normalization)
+        if args.rules:
+            data = flag_rule_violations(data, max_ratio=args.max_ratio)
+
+        # Raw counts, stored in the results store (normalize_features scales the frame in place)
+        raw_counts = data[['views', 'likes']].copy() if args.results_store else None
+
+        # Normalize the features
+        data = normalize_features(data)
+
+        # Calcul the ratio likes/views for each observation
+        data = add_features(data)
+        stage['rows'] = len(data)
+
+    if 'detect' in args.stages:
+        with metrics.stage('detection', rows=len(data)) as stage:
+            # Detect anomalies with IsolationForest and LOF
+            features = prepare_features(data) if args.float32 else None
+            if args.group_by:
+                data = detect_anomalies_by(data, key=args.group_by, contamination=args.contamination,
+                                           min_group_size=args.min_group_size, n_workers=args.workers,
+                                           exclude_rule_violations=args.rules, features=features,
+                                           dedup=args.dedup, keep_scores=bool(args.results_store))
+            elif args.train_sample_size:
+                sampling = {'sample_size': args.train_sample_size, 'strategy': args.sample_strategy,
+                            'max_samples': args.max_samples, 'n_estimators': args.n_estimators}
+                if args.report_agreement:
+                    # Compared on the rows the model scores (rule violations are flagged without it)
+                    scored = data[data[RULE_COLUMN] == 0] if args.rules else data
+                    report = stage['sampling_agreement'] = sampling_agreement(scored, contamination=args.contamination,
+                                                                              **sampling)
+                    print(f"Sampling agreement with full training: {report['agreement']:.1%} "
+                          f"(precision {report['precision']:.2f}, recall {report['recall']:.2f})")
+                data = detect_anomalies_sampled(data, contamination=args.contamination, n_jobs=args.workers,
+                                                exclude_rule_violations=args.rules, features=features, **sampling)
+            else:
+                data = detect_anomalies(data, contamination=args.contamination, n_jobs=args.workers,
+                                        exclude_rule_violations=args.rules, features=features, dedup=args.dedup,
+                                        keep_scores=bool(args.results_store))
+            data = detect_anomalies_lof(data, n_neighbors=args.n_neighbors,
+                                        contamination=args.contamination, n_jobs=args.workers,
+                                        exclude_rule_violations=args.rules, features=features, dedup=args.lof_dedup,
+                                        keep_scores=bool(args.results_store))
+
+        if args.results_store:
+            with metrics.stage('store', rows=len(data)):
+                # Keep the scored rows, so later queries do not have to rerun the detection
+                # Stored in raw counts like the chunked runs, so queries across runs compare the same units
+                ResultsStore(args.results_store).append(data.assign(views=raw_counts['views'],
+                                                                    likes=raw_counts['likes']),
+                                                        run_id=args.run_id or new_run_id())
 
-def main():
-    # Load or generate then clean the dataset
-    data = get_clean_data(n_samples=500, save_if_generated=True)
-
-    # Normalize the features
-    data = normalize_features(data)
-
-    # Calcul the ratio likes/views for each observation
-    data = add_features(data)
-
-
-
-    # Detect anomalies with IsolationForest and LOF
-    data = detect_anomalies(data, contamination=0.05) 
-    data = detect_anomalies_lof(data, contamination=0.05)
-    
-    
-    # Visualize and save the plots
-    plot_metrics(data)  # Save by default : plots/metrics_scatter.png
-    plot_distribution(data, column='views')  # Save : plots/distribution_views.png
-
-    # Interactive vizualisation
-    interactive_plot_metrics(data)
-
-    # Interactif histogram
-    interactive_plot_distribution(data, column='views')
-    
-    # Calcul the global statistics
-    total_views = data['views'].sum()
-    total_likes = data['likes'].sum()
-    anomaly_count = data['anomaly'].sum()
-    ratio = total_likes / total_views if total_views != 0 else 0
-    
-    # Accompagnying explanations for the metrics and distribution plots
-    metrics_explanation = (
-        "Ce scatter plot montre la relation entre les vues et les likes.\n"
-        "Les points en rouge indiquent les anomalies détectées (où le nombre de likes est incohérent par rapport aux vues).\n"
-        "Un nombre élevé de points rouges pourrait indiquer un problème dans le système de mesure des interactions."
-    )
-    distribution_explanation = (
-        "L'histogramme présente la distribution des vues à travers l'ensemble du dataset.\n"
-        "Cela permet de visualiser la dispersion des valeurs et d'identifier d'éventuelles irrégularités."
-    )
-    
     # Assess the paths to the images generated by the visualization functions
-    metrics_image = 'plots/metrics_scatter.png'
-    distribution_image = 'plots/distribution_views.png'
-    
-    # Generate the PDF report
-    generate_report(total_views, total_likes, anomaly_count, ratio,
-                    metrics_image, distribution_image,
-                    metrics_explanation, distribution_explanation,
-                    output_file="FakeMetrics_Report.pdf")
+    metrics_image = os.path.join(args.plots_dir, 'metrics_scatter.png')
+    distribution_image = os.path.join(args.plots_dir, f'distribution_{args.column}.png')
+
+    if 'plots' in args.stages:
+        with metrics.stage('plotting', rows=len(data)):
+            # Visualize and save the plots
+            plot_metrics(data, save_path=metrics_image, show=show)
+            plot_distribution(data, column=args.column, save_path=distribution_image, show=show)
+
+    if 'interactive' in args.stages:
+        with metrics.stage('interactive_plotting', rows=len(data)):
+            # Interactive vizualisation
+            interactive_plot_metrics(data, output_file=os.path.join(args.plots_dir, 'metrics_scatter_interactive.html'))
+
+            # Interactif histogram
+            interactive_plot_distribution(data, column=args.column,
+                                          output_file=os.path.join(args.plots_dir, f'distribution_{args.column}_interactive.html'))
+
+    if 'report' in args.stages:
+        with metrics.stage('report', rows=len(data)):
+            # Calcul the global statistics (only the three sums: the report needs no other moment)
+            total_views = data['views'].sum()
+            total_likes = data['likes'].sum()
+            anomaly_count = int(data['anomaly'].sum())
+            ratio = total_likes / total_views if total_views != 0 else 0
+
+            # Accompagnying explanations for the metrics and distribution plots
+            metrics_explanation = (
+                "Ce scatter plot montre la relation entre les vues et les likes.\n"
+                "Les points en rouge indiquent les anomalies détectées (où le nombre de likes est incohérent par rapport aux vues).\n"
+                "Un nombre élevé de points rouges pourrait indiquer un problème dans le système de mesure des interactions."
+            )
+            distribution_explanation = (
+                "L'histogramme présente la distribution des vues à travers l'ensemble du dataset.\n"
+                "Cela permet de visualiser la dispersion des valeurs et d'identifier d'éventuelles irrégularités."
+            )
+
+            # Generate the PDF report
+            generate_report(total_views, total_likes, anomaly_count, ratio,
+                            metrics_image, distribution_image,
+                            metrics_explanation, distribution_explanation,
+                            output_file=args.output)
+
+            # Batch mode: one report per segment from the same scored data
+            if args.segment_by:
+                generate_segment_reports(data, args.segment_by, output_dir=args.segment_dir,
+                                         plots_dir=os.path.join(args.plots_dir, 'segments'), column=args.column,
+                                         metrics_explanation=metrics_explanation,
+                                         distribution_explanation=distribution_explanation,
+                                         n_workers=args.workers)
+
+    return _finish(args, metrics)
+
+def _read_chunks(args):
+    # Raw chunks of --chunk-size rows from the database table or the raw CSV
+    if args.source_db:
+        columns = ['views', 'likes'] + ([args.segment_by] if args.segment_by else [])
+        return read_sql_chunks(args.source_db, args.source_table, columns=columns, chunk_size=args.chunk_size)
+    if not os.path.exists(args.raw_path):
+        get_data(args.raw_path, n_samples=args.n_samples, save_if_generated=True)
+    return pd.read_csv(args.raw_path, chunksize=args.chunk_size)
+
+def _finish(args, metrics):
+    # Summary of where the time went during this run (after the queued diagnostics)
+    stop_queue_logging()
+    print(metrics.summary_table())
+    if args.metrics_json:
+        metrics.dump_json(args.metrics_json)
+    return metrics
 
 if __name__ == '__main__':
-    main()
+    main(sys.argv[1:])
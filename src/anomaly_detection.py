@@ -1,41 +1,486 @@
 # src/anomaly_detection.py
 
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
-from sklearn.neighbors import LocalOutlierFactor
+from sklearn.neighbors import LocalOutlierFactor, NearestNeighbors
+
+from src.rules import RULE_COLUMN
+from src.utils import worker_logging
+
+logger = logging.getLogger(__name__)
+
+# Columns the detectors are trained on
+FEATURES = ['views', 'likes']
+
+def prepare_features(data, dtype=np.float32):
+    """
+    Builds the detector input once: a C-contiguous array of the 'views' and
+    'likes' columns.
+
+    float32 halves the memory of float64. IsolationForest works in float32
+    internally, so its flags are unchanged. LOF computes its distances in the
+    dtype of the input: its scores move slightly (most at tied neighbor
+    distances) and only rows scored next to the threshold may change flag.
+
+    :param data: DataFrame containing the metrics.
+    :param dtype: Array dtype (float32 by default).
+    :return: 2-D numpy array, one row per observation.
+    """
+    return np.ascontiguousarray(data[FEATURES].to_numpy(dtype=dtype))
+
+def _features(data, features):
+    # Precomputed feature array when given, otherwise the columns as pandas produced them
+    return features if features is not None else data[FEATURES].to_numpy()
+
+def train_isolation_forest(data, contamination=0.05, n_jobs=None, features=None):
+    """
+    Fits the IsolationForest used by detect_anomalies on the 'views' and 'likes' columns.
+
+    The model is fitted on a plain array so it can later score arrays coming
+    from other sources (scoring service, streams) without feature-name checks.
+
+    :param data: DataFrame containing the metrics.
+    :param contamination: The expected ratio of anomalies.
+    :param n_jobs: Number of parallel jobs (None = 1, -1 = all cores).
+    :param features: Optional array from prepare_features, used instead of the data columns.
+    :return: The fitted IsolationForest.
+    """
+    model = IsolationForest(contamination=contamination, random_state=42, n_jobs=n_jobs)
+    model.fit(_features(data, features))
+    return model
+
+def save_model(model, file_path):
+    # Persist a fitted detector with joblib and return the file path
+    joblib.dump(model, file_path)
+    return file_path
+
+def load_model(file_path):
+    # Load a detector saved with save_model
+    return joblib.load(file_path)
+
+def _rule_violations(data, exclude_rule_violations):
+    # Mask of the rows already flagged by the rule engine (src.rules) when they must skip the models
+    if exclude_rule_violations and RULE_COLUMN in data.columns:
+        return data[RULE_COLUMN].to_numpy() != 0
+    return np.zeros(len(data), dtype=bool)
+
+# Deduplicated scoring (dedup=True): views/likes are integer counts and real
+# exports repeat the same pairs many times. The feature matrix is collapsed to
+# its unique rows with their multiplicities, each unique row is scored once and
+# the result is broadcast back to every row. Thresholds are percentiles of the
+# scores weighted by the multiplicities, i.e. of the scores of all rows.
+# IsolationForest gives exactly the flags of the plain path. LOF does not on
+# such data (see _lof_dedup), so it only deduplicates when asked separately.
+
+def _unique_rows(X):
+    # Unique feature rows, row -> unique index, multiplicity of each unique row
+    unique, inverse, counts = np.unique(X, axis=0, return_inverse=True, return_counts=True)
+    return unique, inverse.reshape(-1), counts
+
+def _weighted_percentile(values, counts, q):
+    """
+    np.percentile(np.repeat(values, counts), q) without materializing the repeat.
+
+    :param values: Distinct values.
+    :param counts: Multiplicity of each value.
+    :param q: Percentile in [0, 100] (linear interpolation, numpy's default).
+    """
+    order = np.argsort(values, kind='stable')
+    values, ends = values[order], np.cumsum(counts[order])
+    position = q / 100.0 * (ends[-1] - 1)
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+    # Value at 0-based rank r of the expanded array: first value whose cumulative count exceeds r
+    low_value, high_value = values[np.searchsorted(ends, [lower, upper], side='right')]
+    return low_value + (high_value - low_value) * (position - lower)
+
+def _isolation_forest_dedup(X, contamination, n_jobs=None):
+    # (scores, flags) identical to isolation_forest_scores without dedup, scoring each unique row once
+    unique, inverse, counts = _unique_rows(X)
+    # The trees do not depend on contamination and are fitted on sub-samples drawn
+    # from all rows (IsolationForest ignores sample weights when building them),
+    # so fitting with 'auto' gives the same trees while skipping the scoring of
+    # every training row that a numeric contamination triggers in fit.
+    model = IsolationForest(contamination='auto', random_state=42, n_jobs=n_jobs).fit(X)
+    scores = model.score_samples(unique)
+    offset = _weighted_percentile(scores, counts, 100.0 * contamination)
+    return scores[inverse], (scores - offset < 0).astype(np.int8)[inverse]
+
+def _lof_dedup(X, n_neighbors=20, contamination=0.05, n_jobs=None):
+    """
+    LocalOutlierFactor flags and negative outlier factors with one neighbors query per unique row.
+
+    Each unique row stands for `count` identical points: the k nearest
+    neighbors of a point are its count - 1 copies (distance 0), then the
+    nearest unique rows with their multiplicities, until k points are reached.
+    Reachability distances, densities and factors follow LOF's definitions on
+    these weighted neighborhoods. Without distance ties this is sklearn's
+    result. Integer counts are full of ties, and LOF is then ill-defined:
+    sklearn keeps an arbitrary subset of the points tied at the k-th distance
+    (and warns about duplicates), this function keeps the nearest unique rows
+    in index order. A point with more than k copies has a k-distance of 0 and
+    a density of 1e10, so whether such a point is counted as a neighbor moves
+    factors by billions: on repeated integer counts most flags can differ from
+    sklearn's (e.g. 124 of about 150 on the tests' repeated_counts data).
+
+    :return: (flags, negative_outlier_factor) for every row of X.
+    """
+    unique, inverse, counts = _unique_rows(np.asarray(X, dtype=np.float64))
+    k = max(1, min(n_neighbors, len(X) - 1))
+
+    # k + 1 unique rows (self included) always hold at least k other points
+    n_query = min(k + 1, len(unique))
+    distances, indices = NearestNeighbors(n_neighbors=n_query, n_jobs=n_jobs).fit(unique).kneighbors(unique)
+    weights = counts[indices].astype(np.int64)
+    weights[indices == np.arange(len(unique))[:, None]] -= 1  # a point is not its own neighbor
+    # Number of points taken from each neighbor column to reach exactly k
+    taken = np.clip(k - (np.cumsum(weights, axis=1) - weights), 0, weights)
+    k_distance = np.where(taken > 0, distances, 0.0).max(axis=1)
+
+    reach = np.maximum(distances, k_distance[indices])
+    lrd = 1.0 / ((taken * reach).sum(axis=1) / k + 1e-10)
+    negative_outlier_factor = -((taken * lrd[indices]).sum(axis=1) / k) / lrd
+
+    offset = _weighted_percentile(negative_outlier_factor, counts, 100.0 * contamination)
+    return (negative_outlier_factor < offset)[inverse], negative_outlier_factor[inverse]
+
+# Functional detector API: a feature array in, score and flag arrays out.
+# Nothing here modifies a DataFrame, prints or keeps state between calls, so
+# several threads can run detections (or share one fitted model through
+# score_features) at the same time. The heavy work happens in sklearn's tree
+# and neighbors code and in numpy, which release the GIL while they run.
+# detect_anomalies / detect_anomalies_lof are DataFrame wrappers around it.
+
+def score_features(model, features):
+    """
+    Scores a feature array with a fitted IsolationForest (or a FlatForest export).
+
+    :return: (scores, flags) — score_samples values (lower = more abnormal) and
+             int8 flags (1 = anomaly), identical to model.predict.
+    """
+    scores = model.score_samples(features)
+    return scores, (scores - model.offset_ < 0).astype(np.int8)
 
-def detect_anomalies(data, contamination=0.05):
+def isolation_forest_scores(features, contamination=0.05, n_jobs=None, dedup=False):
+    """
+    Fits an IsolationForest on a feature array and scores the same rows.
+
+    :param features: 2-D array, one row per observation (e.g. from prepare_features).
+    :param contamination: The expected ratio of anomalies.
+    :param n_jobs: Number of parallel jobs (None = 1, -1 = all cores).
+    :param dedup: Score each distinct row once (same result, see _isolation_forest_dedup).
+    :return: (scores, flags) as in score_features.
+    """
+    if dedup:
+        return _isolation_forest_dedup(features, contamination, n_jobs=n_jobs)
+    model = train_isolation_forest(None, contamination=contamination, n_jobs=n_jobs, features=features)
+    return score_features(model, features)
+
+def lof_scores(features, n_neighbors=20, contamination=0.05, n_jobs=None, dedup=False):
+    """
+    Local Outlier Factor of every row of a feature array.
+
+    :param features: 2-D array, one row per observation.
+    :param n_neighbors: Neighbors of the LOF neighborhoods.
+    :param contamination: The expected ratio of anomalies.
+    :param n_jobs: Parallel jobs of the neighbors search (None = 1, -1 = all cores).
+    :param dedup: One neighbors query per distinct row; results differ from sklearn's on tied
+                  distances, e.g. repeated integer counts (see _lof_dedup).
+    :return: (negative_outlier_factor, flags) — lower factor = more abnormal, int8 flags (1 = anomaly),
+             identical to LocalOutlierFactor.fit_predict.
+    """
+    if dedup:
+        flags, factors = _lof_dedup(features, n_neighbors=n_neighbors, contamination=contamination, n_jobs=n_jobs)
+        return factors, flags.astype(np.int8)
+    lof = LocalOutlierFactor(n_neighbors=n_neighbors, contamination=contamination, n_jobs=n_jobs).fit(features)
+    return lof.negative_outlier_factor_, (lof.negative_outlier_factor_ < lof.offset_).astype(np.int8)
+
+def detect_anomalies(data, contamination=0.05, n_jobs=None, exclude_rule_violations=False, features=None,
+                     dedup=False, keep_scores=False):
     # Uses IsolationForest to detect anomalies in the 'views 'and 'likes' columns
 
     # param data: DataFrame containing the metrics.
     # :param contamination: The expected ratio of anomalies.
+    # :param n_jobs: Number of parallel jobs for fit and predict (None = 1, -1 = all cores).
+    # :param exclude_rule_violations: Rows with a non-zero 'rule_violation' code (see src.rules)
+    #   are flagged directly and left out of training and scoring; contamination then applies
+    #   to the remaining rows only.
+    # :param features: Optional array from prepare_features (e.g. float32), aligned with data rows.
+    # :param dedup: Score each distinct (views, likes) pair once and broadcast the result
+    #   to its duplicates (same flags, less scoring work on repetitive data).
+    # :param keep_scores: Also add the raw IsolationForest scores as 'anomaly_score'
+    #   (lower = more abnormal, NaN for rule violations).
     # :return: DataFrame with an 'anomaly' column (1 for an anomaly, 0 for normal)
-    features = data[['views', 'likes']]
-
-    model = IsolationForest(contamination=contamination, random_state=42)
-    model.fit(features)
-
-    # Prediction : -1 for an anomaly, 1 indicate normal
-    # Convert -1 to 1 (anomaly) and 1 to 0 (normal)
-    data['anomaly'] = model.predict(features)
-    data['anomaly'] = data['anomaly'].apply(lambda x: 1 if x == -1 else 0)
+    violations = _rule_violations(data, exclude_rule_violations)
+    anomaly = np.ones(len(data), dtype=int)
+    scores = np.full(len(data), np.nan)
+    if not violations.all():
+        X = _features(data, features)
+        if violations.any():
+            X = X[~violations]
+        # 1 for an anomaly, 0 for normal
+        scores[~violations], anomaly[~violations] = isolation_forest_scores(X, contamination=contamination,
+                                                                            n_jobs=n_jobs, dedup=dedup)
+    data['anomaly'] = anomaly
+    if keep_scores:
+        data['anomaly_score'] = scores
 
     # Number of anomalies detected
     anomaly_count = data['anomaly'].sum()
-    print(f"Number of anomalies detected: {anomaly_count}")
+    logger.info("Number of anomalies detected: %d", anomaly_count)
 
     return data
 
-def detect_anomalies_lof(data, n_neighbors=20, contamination=0.05):
+def detect_anomalies_lof(data, n_neighbors=20, contamination=0.05, n_jobs=None, exclude_rule_violations=False,
+                         features=None, dedup=False, keep_scores=False):
     # Detect anomalies using Local Outlier Factor
     # Add a column 'anomaly_lof' where 1 indicates an anomaly
+    # n_jobs parallelizes the neighbors search (None = 1, -1 = all cores)
+    # exclude_rule_violations: rows failing a rule are flagged directly and kept out of the neighbors graph
+    # features: optional array from prepare_features (e.g. float32), aligned with data rows
+    # dedup: one neighbors query per distinct (views, likes) pair, duplicates counted as neighbors
+    #   (flags differ from the plain path when neighbor distances tie, see _lof_dedup)
+    # keep_scores: also add the negative outlier factors as 'lof_score' (NaN for rule violations)
+
+    violations = _rule_violations(data, exclude_rule_violations)
+    anomaly_lof = np.ones(len(data), dtype=int)
+    scores = np.full(len(data), np.nan)
+    if not violations.all():
+        X = _features(data, features)
+        if violations.any():
+            X = X[~violations]
+        scores[~violations], anomaly_lof[~violations] = lof_scores(X, n_neighbors=n_neighbors,
+                                                                   contamination=contamination,
+                                                                   n_jobs=n_jobs, dedup=dedup)
+    data['anomaly_lof'] = anomaly_lof
+    if keep_scores:
+        data['lof_score'] = scores
+    return data
+
+def _fit_predict_block(features, contamination, dedup=False):
+    # IsolationForest fitted and applied on one block of rows -> (scores, 1/0 flags)
+    return isolation_forest_scores(features, contamination=contamination, dedup=dedup)
+
+def _fit_predict_shared(shm_name, shape, dtype, start, stop, contamination, dedup=False):
+    # Worker side of detect_anomalies_by: the rows of one group are read from shared memory (no pickling)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        features = np.ndarray(shape, dtype=dtype, buffer=shm.buf)[start:stop]
+        return (start, stop) + _fit_predict_block(features, contamination, dedup=dedup)
+    finally:
+        shm.close()
+
+def detect_anomalies_by(data, key='account', contamination=0.05, min_group_size=50, n_workers=None,
+                        exclude_rule_violations=False, features=None, dedup=False, keep_scores=False):
+    """
+    Detects anomalies with one IsolationForest per group (account, channel...).
+
+    Rows are reordered once so every group is a contiguous block of a feature
+    array placed in shared memory; each worker process attaches to it and fits
+    and scores its groups without copying the data. Groups smaller than
+    `min_group_size` are too small for a model of their own and are scored
+    together by a pooled fallback model. Rows without a key value form their
+    own group.
+
+    :param data: DataFrame with 'views', 'likes' and the `key` column.
+    :param key: Column identifying the group of each row.
+    :param contamination: The expected ratio of anomalies within each model.
+    :param min_group_size: Groups below this size use the pooled model.
+    :param n_workers: Worker processes (None or -1 = all cores, 1 = in-process).
+    :param exclude_rule_violations: Rows failing a rule (see src.rules) are flagged directly
+        and left out of the group models, as in detect_anomalies.
+    :param features: Optional array from prepare_features (e.g. float32), aligned with data rows.
+    :param dedup: Score each distinct (views, likes) pair of a group once (see detect_anomalies).
+    :param keep_scores: Also add the raw scores of the group models as 'anomaly_score'
+        (lower = more abnormal within a group, NaN for rule violations).
+    :return: DataFrame with an 'anomaly' column (1 for an anomaly, 0 for normal)
+    """
+    kept = np.flatnonzero(~_rule_violations(data, exclude_rule_violations))
+    codes, groups = pd.factorize(data[key].to_numpy()[kept], use_na_sentinel=False)
+    sizes = np.bincount(codes, minlength=len(groups))
+    small = sizes < min_group_size
+
+    # Own-model groups first (largest first to balance the pool), then the pooled block
+    order_by_group = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    large = sorted(np.flatnonzero(~small), key=lambda g: -sizes[g])
+    order = [order_by_group[starts[g]:starts[g] + sizes[g]] for g in large]
+    pooled = np.flatnonzero(small[codes])
+    order = np.concatenate(order + [pooled]).astype(np.intp)
 
-    features = data[['views', 'likes']]
-    lof = LocalOutlierFactor(n_neighbors=n_neighbors, contamination=contamination)
-    data['anomaly_lof'] = lof.fit_predict(features)
+    blocks = np.concatenate([[0], np.cumsum([sizes[g] for g in large] + [len(pooled)])])
+    tasks = [(int(a), int(b)) for a, b in zip(blocks[:-1], blocks[1:]) if b > a]
 
-    # Mapping : -1 (anomalie) transform to 1 et 1 (normal) transform to 0
-    data['anomaly_lof'] = data['anomaly_lof'].apply(lambda x: 1 if x == -1 else 0)
+    X = _features(data, features)[kept][order]
+    dtype = X.dtype if X.dtype in (np.float32, np.float64) else np.float64
+    X = np.ascontiguousarray(X, dtype=dtype)
+    flags = np.zeros(len(X), dtype=np.int8)
+    scores = np.zeros(len(X))
+    if n_workers is None or n_workers < 1:
+        n_workers = os.cpu_count()
+
+    if n_workers == 1 or len(tasks) <= 1:
+        for start, stop in tasks:
+            scores[start:stop], flags[start:stop] = _fit_predict_block(X[start:stop], contamination, dedup=dedup)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        try:
+            np.ndarray(X.shape, dtype=dtype, buffer=shm.buf)[:] = X
+            initializer, initargs = worker_logging()
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks)),
+                                     initializer=initializer, initargs=initargs) as pool:
+                futures = [pool.submit(_fit_predict_shared, shm.name, X.shape, dtype, start, stop,
+                                       contamination, dedup)
+                           for start, stop in tasks]
+                for future in futures:
+                    start, stop, block_scores, block_flags = future.result()
+                    scores[start:stop], flags[start:stop] = block_scores, block_flags
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # Back to the original row order (rule violations stay flagged)
+    anomaly = np.ones(len(data), dtype=int)
+    anomaly[kept[order]] = flags
+    data['anomaly'] = anomaly
+    if keep_scores:
+        anomaly_score = np.full(len(data), np.nan)
+        anomaly_score[kept[order]] = scores
+        data['anomaly_score'] = anomaly_score
+    logger.info("Number of anomalies detected: %d (%d group models, %d groups pooled)",
+                anomaly.sum(), len(large), int(small.sum()))
+    return data
+
+def reservoir_sample(chunks, size, random_state=42):
+    """
+    Uniform sample of at most `size` rows from an iterable of 2-D array chunks
+    (reservoir sampling, one pass, memory bounded by `size`).
+
+    Each chunk is processed with vectorized draws: the row of global index i
+    replaces reservoir slot j ~ U[0, i] when j < size (Algorithm R).
+    """
+    rng = np.random.default_rng(random_state)
+    reservoir = None
+    seen = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        if reservoir is None:
+            reservoir = np.empty((size,) + chunk.shape[1:], dtype=chunk.dtype)
+        # Fill phase: the first `size` rows go straight into the reservoir
+        fill = max(0, min(size - seen, len(chunk)))
+        reservoir[seen:seen + fill] = chunk[:fill]
+        rest = chunk[fill:]
+        if len(rest):
+            index = seen + fill + np.arange(len(rest))
+            slots = (rng.random(len(rest)) * (index + 1)).astype(np.int64)
+            keep = slots < size
+            reservoir[slots[keep]] = rest[keep]
+        seen += len(chunk)
+    if reservoir is None:
+        return np.empty((0, len(FEATURES)))
+    return reservoir[:min(size, seen)]
+
+def stratified_sample(features, size, strata, random_state=42):
+    """
+    Sample of about `size` rows with each stratum represented in proportion
+    to its size (at least one row per stratum).
+
+    :param features: 2-D array of rows.
+    :param strata: Stratum label of each row.
+    """
+    rng = np.random.default_rng(random_state)
+    labels, codes = np.unique(strata, return_inverse=True)
+    counts = np.bincount(codes, minlength=len(labels))
+    quotas = np.maximum(1, np.round(counts * min(1.0, size / len(features)))).astype(int)
+    picked = [rng.choice(np.flatnonzero(codes == k), size=min(q, c), replace=False)
+              for k, (q, c) in enumerate(zip(quotas, counts))]
+    return features[np.sort(np.concatenate(picked))]
+
+def detect_anomalies_sampled(data, contamination=0.05, sample_size=10000, strategy='reservoir',
+                             max_samples='auto', n_estimators=100, batch_size=100000, strata=None, n_jobs=None,
+                             exclude_rule_violations=False, features=None):
+    """
+    IsolationForest trained on a bounded sample, then applied to every row.
+
+    Training cost depends on `sample_size`, not on the number of rows; scoring
+    runs in batches of `batch_size` rows to bound memory. The decision
+    threshold is the contamination percentile of the sample's scores.
+
+    :param data: DataFrame containing the metrics.
+    :param contamination: The expected ratio of anomalies.
+    :param sample_size: Maximum number of training rows.
+    :param strategy: "reservoir" (uniform) or "stratified" (proportional per stratum).
+    :param max_samples: Rows drawn per tree (IsolationForest parameter).
+    :param n_estimators: Number of trees.
+    :param batch_size: Rows scored per predict call.
+    :param strata: Stratum of each row for the stratified strategy (default: deciles of 'views').
+    :param n_jobs: Number of parallel jobs (None = 1, -1 = all cores).
+    :param exclude_rule_violations: Rows with a non-zero 'rule_violation' code are flagged
+                                    directly and neither sampled nor scored (see detect_anomalies).
+    :param features: Optional array from prepare_features (e.g. float32), aligned with data rows.
+    :return: DataFrame with an 'anomaly' column (1 for an anomaly, 0 for normal)
+    """
+    violations = _rule_violations(data, exclude_rule_violations)
+    if violations.all():
+        data['anomaly'] = np.ones(len(data), dtype=int)
+        return data
+    features = _features(data, features)
+    if violations.any():
+        features = features[~violations]
+        if strata is not None:
+            strata = np.asarray(strata)[~violations]
+    if strategy == 'reservoir':
+        chunks = (features[i:i + batch_size] for i in range(0, len(features), batch_size))
+        sample = reservoir_sample(chunks, sample_size)
+    elif strategy == 'stratified':
+        if strata is None:
+            strata = pd.qcut(data['views'][~violations], q=10, labels=False, duplicates='drop').to_numpy()
+        sample = stratified_sample(features, sample_size, strata)
+    else:
+        raise ValueError(f"Unknown sampling strategy '{strategy}', expected 'reservoir' or 'stratified'")
+
+    model = IsolationForest(contamination=contamination, max_samples=max_samples, n_estimators=n_estimators,
+                            random_state=42, n_jobs=n_jobs)
+    model.fit(sample)
+
+    scored = np.empty(len(features), dtype=int)
+    for start in range(0, len(features), batch_size):
+        batch = features[start:start + batch_size]
+        scored[start:start + len(batch)] = model.predict(batch) == -1
+    anomaly = np.ones(len(data), dtype=int)
+    anomaly[~violations] = scored
+    data['anomaly'] = anomaly
+    logger.info("Number of anomalies detected: %d (trained on %d of %d rows)", anomaly.sum(), len(sample), len(features))
     return data
 
-    #
\ No newline at end of file
+def sampling_agreement(data, contamination=0.05, **sampling_options):
+    """
+    Compares the flags of detect_anomalies_sampled with a model trained on all rows.
+
+    :param sampling_options: Options of detect_anomalies_sampled (sample_size, strategy...).
+    :return: Dict with the agreement rate, precision/recall of the sampled flags
+             against the full-data flags, and both anomaly counts.
+    """
+    sampled = detect_anomalies_sampled(data[FEATURES].copy(), contamination=contamination,
+                                       **sampling_options)['anomaly'].to_numpy()
+    full_model = IsolationForest(contamination=contamination, random_state=42,
+                                 max_samples=sampling_options.get('max_samples', 'auto'),
+                                 n_estimators=sampling_options.get('n_estimators', 100))
+    features = data[FEATURES].to_numpy()
+    full = (full_model.fit(features).predict(features) == -1).astype(int)
+
+    both = int(np.sum((sampled == 1) & (full == 1)))
+    return {
+        'rows': len(features),
+        'agreement': float(np.mean(sampled == full)),
+        'precision': both / sampled.sum() if sampled.sum() else 1.0,
+        'recall': both / full.sum() if full.sum() else 1.0,
+        'sampled_anomalies': int(sampled.sum()),
+        'full_anomalies': int(full.sum()),
+    }
@@ -0,0 +1,382 @@
+# src/column_stats.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# Mergeable summary statistics.
+# Every statistic here can be computed on a chunk of rows (or by a worker) and
+# merged with the statistics of other chunks afterwards, which gives the same
+# result as computing it on all rows at once (up to the quantile sketch error).
+
+
+class QuantileSketch:
+    """
+    KLL-style mergeable quantile sketch.
+
+    Values are stored in a stack of compactors: level h holds items that each
+    stand for 2**h original values. When a level grows beyond its capacity it
+    is sorted and every other item (random offset) is promoted to the next
+    level. Memory is O(k log(n / k)); as long as fewer than `k` values were
+    added, nothing is compacted and quantiles are exact.
+
+    :param k: Capacity of the top compactor (accuracy / memory trade-off).
+    """
+
+    def __init__(self, k=1024, random_state=42):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(random_state)
+
+    def _capacity(self, level):
+        # Top level keeps k items, lower levels shrink geometrically (KLL)
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        # Combine with another sketch (same k) in place and return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays at this level so no weight is lost
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q):
+        """
+        Estimated quantile(s) q in [0, 1].
+
+        Exact (numpy linear interpolation) while nothing has been compacted,
+        weighted rank estimate otherwise.
+        """
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2.0 ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, weights = items[order], weights[order]
+        cumulative = np.cumsum(weights) - weights / 2
+        return np.interp(np.asarray(q) * cumulative[-1], cumulative, items)
+
+    def __len__(self):
+        return self.n
+
+    def to_state(self):
+        # JSON-serializable state (see from_state)
+        return {'k': self.k, 'n': self.n, 'levels': [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(k=state['k'])
+        sketch.n = state['n']
+        sketch.levels = [np.asarray(level, dtype=float) for level in state['levels']]
+        return sketch
+
+
+class Histogram:
+    """
+    Fixed-bin histogram that can be filled chunk by chunk and merged.
+
+    Values outside [low, high] are counted in `underflow` / `overflow`
+    instead of being dropped silently. Two histograms merge when they have the
+    same bins.
+
+    :param low: Lower edge of the first bin.
+    :param high: Upper edge of the last bin.
+    :param bins: Number of equal-width bins.
+    """
+
+    def __init__(self, low, high, bins=30):
+        if high <= low:
+            high = low + 1.0  # constant column: one meaningful bin is enough
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        low, high = self.edges[0], self.edges[-1]
+        self.underflow += int(np.count_nonzero(values < low))
+        self.overflow += int(np.count_nonzero(values > high))
+        inside = values[(values >= low) & (values <= high)]
+        bins = len(self.counts)
+        # The last bin is closed on the right, like numpy.histogram
+        index = np.minimum(((inside - low) / (high - low) * bins).astype(np.int64), bins - 1)
+        self.counts += np.bincount(index, minlength=bins)
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bins cannot be merged")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def to_state(self):
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist(),
+                'underflow': self.underflow, 'overflow': self.overflow}
+
+    @classmethod
+    def from_state(cls, state):
+        histogram = cls(state['edges'][0], state['edges'][-1], bins=len(state['counts']))
+        histogram.edges = np.asarray(state['edges'], dtype=float)
+        histogram.counts = np.asarray(state['counts'], dtype=np.int64)
+        histogram.underflow = state['underflow']
+        histogram.overflow = state['overflow']
+        return histogram
+
+
+class ColumnStats:
+    """
+    Summary statistics of one column: count, sum, mean, variance, min, max
+    and an optional quantile sketch, mergeable across chunks or workers.
+
+    The variance is kept as M2 (sum of squared deviations from the mean) and
+    combined with Chan et al.'s parallel formula, which is numerically stable.
+
+    :param k: Quantile sketch size.
+    :param quantiles: Keep a quantile sketch (sketch is None otherwise; it costs
+                      far more than the moments, so only ask for it when needed).
+    """
+
+    def __init__(self, k=1024, quantiles=True):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = QuantileSketch(k=k) if quantiles else None
+
+    @classmethod
+    def from_moments(cls, count, total, m2, minimum, maximum, values=None, k=1024):
+        # values feed the quantile sketch (None = moments only)
+        stats = cls(k=k, quantiles=values is not None)
+        stats.count = int(count)
+        stats.sum = float(total)
+        stats.mean = float(total / count) if count else 0.0
+        stats.m2 = float(m2)
+        stats.min = float(minimum) if count else np.inf
+        stats.max = float(maximum) if count else -np.inf
+        if values is not None:
+            stats.sketch.update(values)
+        return stats
+
+    def update(self, values):
+        # Add a chunk of values (NaN are ignored)
+        values = np.asarray(values, dtype=float)
+        return self.merge(summarize_array(values.reshape(-1, 1), k=self.k,
+                                          quantiles=self.sketch is not None)[0])
+
+    @property
+    def k(self):
+        return self.sketch.k if self.sketch is not None else 1024
+
+    def merge(self, other):
+        # Merge the statistics of another chunk in place and return self
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.sum += other.sum
+        self.mean = self.sum / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        # Quantiles are only known when both sides have a sketch
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        else:
+            self.sketch = None
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.variance(ddof)))
+
+    def quantile(self, q):
+        if self.sketch is None:
+            raise ValueError("These statistics have no quantile sketch (summarize with quantiles=True)")
+        return self.sketch.quantile(q)
+
+    def to_state(self):
+        # JSON-serializable state (see from_state); min/max are None for an empty column
+        return {'count': self.count, 'sum': self.sum, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None,
+                'sketch': self.sketch.to_state() if self.sketch is not None else None}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = state['sketch']
+        stats = cls(k=sketch['k'] if sketch else 1024, quantiles=sketch is not None)
+        stats.count, stats.sum, stats.mean, stats.m2 = state['count'], state['sum'], state['mean'], state['m2']
+        stats.min = state['min'] if state['min'] is not None else np.inf
+        stats.max = state['max'] if state['max'] is not None else -np.inf
+        if sketch:
+            stats.sketch = QuantileSketch.from_state(sketch)
+        return stats
+
+    def to_dict(self, percentiles=(0.25, 0.5, 0.75)):
+        # Same fields as pandas' describe() (no percentiles without a quantile sketch)
+        summary = {'count': self.count, 'mean': self.mean if self.count else np.nan, 'std': self.std(),
+                   'min': self.min if self.count else np.nan}
+        if self.sketch is not None:
+            for p, value in zip(percentiles, np.atleast_1d(self.quantile(list(percentiles)))):
+                summary[f'{p * 100:g}%'] = float(value)
+        summary['max'] = self.max if self.count else np.nan
+        summary['sum'] = self.sum
+        return summary
+
+
+def summarize_array(values, k=1024, quantiles=False):
+    """
+    ColumnStats of every column of a 2-D array, computed with whole-block
+    NumPy reductions (each reduction covers all the columns at once).
+
+    :param quantiles: Also fill a quantile sketch per column (much slower than the moments).
+    """
+    values = np.asarray(values, dtype=float)
+    total = values.sum(axis=0)
+    if len(values) and not np.isnan(total).any():
+        # A NaN would make its column sum NaN: no missing value, plain reductions without the masked copies
+        count = np.full(values.shape[1], len(values))
+        mean = total / count
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        minimum, maximum = values.min(axis=0), values.max(axis=0)
+    else:
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        total = np.where(valid, values, 0.0).sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+        m2 = (np.where(valid, values - mean, 0.0) ** 2).sum(axis=0)
+        minimum = np.where(valid, values, np.inf).min(axis=0) if len(values) else np.full(values.shape[1], np.inf)
+        maximum = np.where(valid, values, -np.inf).max(axis=0) if len(values) else np.full(values.shape[1], -np.inf)
+    return [ColumnStats.from_moments(count[j], total[j], m2[j], minimum[j], maximum[j],
+                                     values[:, j] if quantiles else None, k=k)
+            for j in range(values.shape[1])]
+
+
+def summarize_columns(data, columns=None, k=1024, quantiles=False):
+    """
+    Summary statistics of several DataFrame columns in one vectorized pass
+    per statistic.
+
+    :param data: DataFrame (or a chunk of one).
+    :param columns: Columns to summarize (default: all numeric columns).
+    :param k: Quantile sketch size.
+    :param quantiles: Also build a quantile sketch per column (needed by
+                      describe_columns' percentiles; off by default, it is the costly part).
+    :return: Dict {column: ColumnStats}, mergeable with merge_summaries.
+    """
+    if columns is None:
+        columns = data.select_dtypes('number').columns.tolist()
+    return dict(zip(columns, summarize_array(data[columns].to_numpy(dtype=float), k=k, quantiles=quantiles)))
+
+
+def merge_summaries(*summaries):
+    # Merge several {column: ColumnStats} dicts (e.g. one per chunk) into a new one
+    merged = {}
+    for summary in summaries:
+        for column, stats in summary.items():
+            if column not in merged:
+                merged[column] = ColumnStats(k=stats.k, quantiles=stats.sketch is not None)
+            merged[column].merge(stats)
+    return merged
+
+
+def describe_columns(summary):
+    """
+    describe()-like table built from summary statistics.
+
+    :param summary: {column: ColumnStats} or a DataFrame (summarized first).
+    :return: DataFrame indexed by count, mean, std, min, 25%, 50%, 75%, max.
+    """
+    if isinstance(summary, pd.DataFrame):
+        summary = summarize_columns(summary, quantiles=True)
+    table = pd.DataFrame({column: stats.to_dict() for column, stats in summary.items()})
+    return table.drop(index='sum')
+
+
+def save_summary(file_path, summary, histograms=None):
+    """
+    Persists summary statistics (and optional histograms) as JSON.
+
+    :param summary: {column: ColumnStats}.
+    :param histograms: Optional {column: Histogram}.
+    :return: The file path.
+    """
+    state = {'columns': {column: stats.to_state() for column, stats in summary.items()},
+             'histograms': {column: h.to_state() for column, h in (histograms or {}).items()}}
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    return file_path
+
+
+def load_summary(file_path):
+    # Reload (summary, histograms) saved with save_summary
+    with open(file_path, encoding='utf-8') as f:
+        state = json.load(f)
+    summary = {column: ColumnStats.from_state(s) for column, s in state['columns'].items()}
+    histograms = {column: Histogram.from_state(h) for column, h in state['histograms'].items()}
+    return summary, histograms
+
+
+def summarize_csv(file_path, columns, chunksize=100_000, bins=30, k=1024):
+    """
+    Summary statistics and histograms of CSV columns without loading the file
+    in memory.
+
+    The file is read twice, chunk by chunk: the first pass builds the
+    mergeable statistics (which give the min/max range), the second fills
+    fixed-bin histograms over that range.
+
+    :param file_path: CSV file.
+    :param columns: Numeric columns to summarize.
+    :param chunksize: Rows read per chunk.
+    :param bins: Histogram bins per column.
+    :param k: Quantile sketch size.
+    :return: ({column: ColumnStats}, {column: Histogram})
+    """
+    summary = {}
+    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
+        summary = merge_summaries(summary, summarize_columns(chunk, columns, k=k, quantiles=True))
+
+    histograms = {column: Histogram(summary[column].min, summary[column].max, bins=bins) for column in columns}
+    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
+        for column in columns:
+            histograms[column].update(chunk[column].to_numpy())
+    return summary, histograms
@@ -0,0 +1,167 @@
+# src/compiled_scorer.py
+
+import threading
+
+import numpy as np
+
+from src.anomaly_detection import FEATURES
+from src.flat_forest import FlatForest
+
+# The detectors only see two features, so the score surface of a trained
+# IsolationForest can be tabulated once and looked up afterwards.
+#
+# An IsolationForest score is piecewise constant on rectangles bounded by the
+# split thresholds of its trees. The grid lines are quantiles of those
+# thresholds, so cells are small where the model splits often (dense data)
+# and large where the surface is flat. The model is evaluated once on the
+# grid nodes; a new point is then scored by bilinear interpolation of its cell.
+#
+# Flags must not depend on the interpolation, so every cell also gets bounds
+# of the model's score over the whole cell: in each tree, the leaves whose
+# boxes overlap the cell give the shortest and longest path a point of the
+# cell can take, and the sums of those over the trees bound the average path
+# length, hence the score. Points outside the grid, and points in cells whose
+# bounds include the decision threshold, are scored exactly by the model; in
+# the other cells every point (and the interpolated score) is on the same side
+# of the threshold, so the table flags are the model's flags. The exact scores
+# come from the FlatForest export, without sklearn's fixed cost per call on the
+# few rows of a streaming batch.
+
+
+def _split_thresholds(model, feature):
+    # All split thresholds of the forest on one feature
+    if isinstance(model, FlatForest):
+        return model.threshold[(model.feature == feature) & np.isfinite(model.threshold)]
+    thresholds = []
+    for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+        nodes = tree.tree_.feature >= 0  # internal nodes (leaves are -2)
+        used = np.asarray(tree_features)[tree.tree_.feature[nodes]] == feature
+        thresholds.append(tree.tree_.threshold[nodes][used])
+    return np.concatenate(thresholds) if thresholds else np.empty(0)
+
+
+def _leaf_boxes(flat):
+    # (low, high) corners of the box of every node: a row reaches the node iff low < x <= high
+    n_nodes = len(flat.threshold)
+    low = np.full((n_nodes, flat.n_features), -np.inf)
+    high = np.full((n_nodes, flat.n_features), np.inf)
+    for node in np.flatnonzero(np.isfinite(flat.threshold)):
+        # Breadth-first layout: a parent always comes before its children
+        left, f, split = flat.children[node], flat.feature[node], flat.threshold[node]
+        low[left:left + 2] = low[node]
+        high[left:left + 2] = high[node]
+        high[left, f] = split
+        low[left + 1, f] = split
+    return low, high
+
+
+def _cell_path_bounds(flat, ex, ey):
+    # Per grid cell, (min, max) of the summed leaf path lengths over every point of the cell
+    low, high = _leaf_boxes(flat)
+    # Widen the boxes by more than a float32 rounding step (the trees compare float32 values)
+    low = low - 1e-6 * (np.abs(low) + 1.0)
+    high = high + 1e-6 * (np.abs(high) + 1.0)
+    shape = (len(ex) - 1, len(ey) - 1)
+    total_min, total_max = np.zeros(shape), np.zeros(shape)
+    leaf = ~np.isfinite(flat.threshold)
+    bounds = np.append(flat.roots, len(flat.threshold))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        leaves = start + np.flatnonzero(leaf[start:stop])
+        # Cells overlapping each leaf box (closed intervals: boundary cells are included)
+        i0 = np.searchsorted(ex[1:], low[leaves, 0], side='left')
+        i1 = np.searchsorted(ex[:-1], high[leaves, 0], side='right')
+        j0 = np.searchsorted(ey[1:], low[leaves, 1], side='left')
+        j1 = np.searchsorted(ey[:-1], high[leaves, 1], side='right')
+        tree_min, tree_max = np.full(shape, np.inf), np.full(shape, -np.inf)
+        for value, a, b, c, d in zip(flat.leaf_value[leaves], i0, i1, j0, j1):
+            np.minimum(tree_min[a:b, c:d], value, out=tree_min[a:b, c:d])
+            np.maximum(tree_max[a:b, c:d], value, out=tree_max[a:b, c:d])
+        total_min += tree_min
+        total_max += tree_max
+    return total_min, total_max
+
+
+def _grid_axis(thresholds, grid_size):
+    # grid_size cells between the extreme thresholds, spaced like the thresholds
+    edges = np.unique(np.quantile(thresholds, np.linspace(0, 1, grid_size + 1))) if len(thresholds) else np.empty(0)
+    if len(edges) < 2:
+        # The model never (or only once) splits this feature: its score does not depend on it
+        center = edges[0] if len(edges) else 0.0
+        edges = np.array([center - 1.0, center + 1.0])
+    return edges
+
+
+class CompiledScorer:
+    """
+    Table-lookup scorer of a fitted IsolationForest on (views, likes).
+
+    :param model: Fitted IsolationForest on the FEATURES columns (plain array), or its FlatForest export.
+    :param grid_size: Cells per axis (the table holds (grid_size + 1)^2 nodes).
+    :param tolerance: Extra score margin around the threshold handled exactly
+                      (covers the rounding of the summed path lengths).
+    """
+
+    def __init__(self, model, grid_size=256, tolerance=1e-3):
+        if getattr(model, 'n_features_in_', len(FEATURES)) != len(FEATURES):
+            raise ValueError(f"CompiledScorer needs a model fitted on {len(FEATURES)} features")
+        self.model = model
+        # Exact scoring (table nodes and fallback rows); large batches still go to sklearn
+        self.flat = model if isinstance(model, FlatForest) else FlatForest.from_model(model)
+        self.offset_ = model.offset_
+        self.edges = [_grid_axis(_split_thresholds(model, f), grid_size) for f in range(len(FEATURES))]
+        ex, ey = self.edges
+
+        # Exact scores on the grid nodes (interpolation table)
+        self.table = self._exact(np.meshgrid(ex, ey, indexing='ij'))
+
+        # Score bounds of each cell; a longer path means a higher (more normal) score
+        flat = self.flat
+        shortest, longest = _cell_path_bounds(flat, ex, ey)
+        if flat.normalizer == 0:
+            lowest = highest = np.full(shortest.shape, -0.5)
+        else:
+            lowest, highest = -(2.0 ** (-shortest / flat.normalizer)), -(2.0 ** (-longest / flat.normalizer))
+        # Cells whose score range comes near the threshold are scored exactly
+        self._uncertain = (lowest - tolerance <= self.offset_) & (self.offset_ <= highest + tolerance)
+        # score may run in several threads (e.g. the pool of the scoring service)
+        self._lock = threading.Lock()
+        self.exact_rows = 0
+        self.rows = 0
+
+    def _exact(self, mesh):
+        x, y = mesh
+        return self.flat.score_samples(np.column_stack([x.ravel(), y.ravel()])).reshape(x.shape)
+
+    @property
+    def uncertain_fraction(self):
+        # Share of the grid cells that fall back to the model
+        return float(self._uncertain.mean())
+
+    def score(self, points):
+        """
+        Scores (views, likes) rows.
+
+        :param points: 2-D array (or anything reshapeable to (n, 2)) in the model's feature space.
+        :return: (scores, flags) like scoring_service.score_batch: scores (lower = more abnormal,
+                 interpolated away from the threshold) and 1/0 anomaly flags.
+        """
+        X = np.asarray(points, dtype=np.float64).reshape(-1, len(FEATURES))
+        ex, ey = self.edges
+        x, y = X[:, 0], X[:, 1]
+        inside = (x >= ex[0]) & (x <= ex[-1]) & (y >= ey[0]) & (y <= ey[-1])
+
+        i = np.clip(np.searchsorted(ex, x, side='right') - 1, 0, len(ex) - 2)
+        j = np.clip(np.searchsorted(ey, y, side='right') - 1, 0, len(ey) - 2)
+        tx = np.clip((x - ex[i]) / (ex[i + 1] - ex[i]), 0.0, 1.0)
+        ty = np.clip((y - ey[j]) / (ey[j + 1] - ey[j]), 0.0, 1.0)
+        t = self.table
+        scores = ((1 - tx) * (1 - ty) * t[i, j] + tx * (1 - ty) * t[i + 1, j]
+                  + (1 - tx) * ty * t[i, j + 1] + tx * ty * t[i + 1, j + 1])
+
+        exact = ~inside | self._uncertain[i, j]
+        if exact.any():
+            scores[exact] = self.flat.score_samples(X[exact])
+        with self._lock:
+            self.rows += len(X)
+            self.exact_rows += int(exact.sum())
+        return scores, (scores < self.offset_).astype(np.int8)
@@ -1,11 +1,17 @@
 # src/data_preparation.py
 
+import hashlib
+import logging
 import pandas as pd
 import numpy as np
 import os
 
 from sklearn.preprocessing import StandardScaler
 
+from src.utils import write_frame
+
+logger = logging.getLogger(__name__)
+
 # Default file paths
 RAW_DATA_PATH = 'data/raw/dataset.csv'
 CLEAN_DATA_PATH = 'data/processed/fake_metrics_clean.csv'
@@ -42,10 +48,10 @@ def load_data(filepath):
 
     try :
         data = pd.read_csv(filepath)
-        print(f"Dataset chargé depuis : ",filepath)
+        logger.info("Dataset chargé depuis : %s", filepath)
         return data
     except Exception as e:
-        print(f"Erreur lors du chargement des données: {e}")
+        logger.error("Erreur lors du chargement des données: %s", e)
         return None
 
 def clean_data(data):
@@ -54,9 +60,10 @@ def clean_data(data):
 
     return data_clean
 
-def simulate_data(n_samples=1000):
+def simulate_data(n_samples=1000, n_accounts=None):
     # Generate a simulated dataset with for 'views' and 'likes' metrics
     # Deliberately introduces anomalies (like > views)
+    # n_accounts adds an 'account' column (account_0 ... account_<n-1>) to split the data per account
 
     np.random.seed(42)
     views = np.random.randint(50, 1000, n_samples)
@@ -70,7 +77,9 @@ def simulate_data(n_samples=1000):
         'views' : views,
         'likes' : likes.astype(int)
     })
-    print("Dataset simulé généré")
+    if n_accounts:
+        data['account'] = [f'account_{i}' for i in np.random.randint(0, n_accounts, n_samples)]
+    logger.info("Dataset simulé généré")
     return data
 
 def get_data(filepath, n_samples=1000, save_if_generated=False):
@@ -79,38 +88,54 @@ def get_data(filepath, n_samples=1000, save_if_generated=False):
     if os.path.exists(filepath):
         data = load_data(filepath)
     else:
-        data = simulate_data(n_samples=1000)
+        data = simulate_data(n_samples=n_samples)
         if save_if_generated:
             try:
                 # Ensure the output directory exists
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                data.to_csv(filepath, index=False)
-                print("Dataset simulé sauvegardé dans :", filepath)
+                os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+                write_frame(data, filepath)
+                logger.info("Dataset simulé sauvegardé dans : %s", filepath)
             except Exception as e:
-                print(f"Erreur lors de la sauvegarde du dataset: {e}")
+                logger.error("Erreur lors de la sauvegarde du dataset: %s", e)
     return data
 
-def get_clean_data(raw_filepath=RAW_DATA_PATH, clean_filepath=CLEAN_DATA_PATH, n_samples=1000, save_if_generated=False):
+def clean_path_for(raw_filepath):
+    # Cache of the cleaned dataset of a raw file: CLEAN_DATA_PATH for the default raw file, else a file
+    # of the same directory named after the raw file and a hash of its path, so two raw files never share a cache
+    raw_filepath = os.path.abspath(raw_filepath)
+    if raw_filepath == os.path.abspath(RAW_DATA_PATH):
+        return CLEAN_DATA_PATH
+    stem = os.path.splitext(os.path.basename(raw_filepath))[0]
+    digest = hashlib.sha1(raw_filepath.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(os.path.dirname(CLEAN_DATA_PATH), f'{stem}-{digest}_clean.csv')
+
+def get_clean_data(raw_filepath=RAW_DATA_PATH, clean_filepath=None, n_samples=1000, save_if_generated=False):
     # Load the raw dataset, cleand it and save the result in clean_filepath file. If the dataset cleaned already exists, directly load it
-
-    if os.path.exists(clean_filepath):
+    # (unless the raw file was modified after it: the cache is then rebuilt)
+    # clean_filepath None = the cache of raw_filepath (see clean_path_for)
+
+    if clean_filepath is None:
+        clean_filepath = clean_path_for(raw_filepath)
+    stale = os.path.exists(raw_filepath) and os.path.exists(clean_filepath) \
+        and os.path.getmtime(raw_filepath) > os.path.getmtime(clean_filepath)
+    if os.path.exists(clean_filepath) and not stale:
         data_clean = load_data(clean_filepath)
-        print("Clean dataset loaded from :", clean_filepath)
+        logger.info("Clean dataset loaded from : %s", clean_filepath)
         return data_clean
     else:
         # Load or generate the raw dataset
-        data = get_data(raw_filepath, n_samples=500, save_if_generated=True)
+        data = get_data(raw_filepath, n_samples=n_samples, save_if_generated=True)
         
         # Clean the dataset
         data_clean = clean_data(data)
         if save_if_generated:
             try:
                 # Ensure the output directory exists
-                os.makedirs(os.path.dirname(clean_filepath), exist_ok=True)
-                data_clean.to_csv(clean_filepath, index=False)
-                print("Clean dataset saved to :", clean_filepath)
+                os.makedirs(os.path.dirname(clean_filepath) or '.', exist_ok=True)
+                write_frame(data_clean, clean_filepath)
+                logger.info("Clean dataset saved to : %s", clean_filepath)
             except Exception as e:
-                print(f"Erreur lors de la sauvegarde du dataset nettoyé: {e}")
+                logger.error("Erreur lors de la sauvegarde du dataset nettoyé: %s", e)
         return data_clean
 
 def normalize_features(data):
@@ -0,0 +1,189 @@
+# src/flat_forest.py
+
+import os
+
+import numpy as np
+
+# Flat, array-backed copy of a fitted IsolationForest.
+#
+# All the trees are concatenated into a handful of node arrays (split feature,
+# threshold, children, leaf path length), and a batch is scored by moving a
+# (trees x rows) matrix of node indices down all trees at once, one level per
+# step. There is no per-tree Python call as in sklearn's score_samples, which
+# makes small batches much cheaper, and the arrays are saved as a single .npz
+# that loads without unpickling any sklearn object.
+#
+# Large batches are walked LEAVES_CHUNK_ROWS rows at a time, so the node
+# matrix stays small and memory does not grow with the batch. Past a few
+# thousand rows sklearn's compiled per-tree loop is faster than the NumPy
+# gathers: an export made with from_model keeps the fitted model and hands it
+# the batches of SKLEARN_MIN_ROWS rows or more (loaded .npz exports have no
+# model and always use the flat arrays).
+
+LEAVES_CHUNK_ROWS = 1024
+SKLEARN_MIN_ROWS = 5000
+
+
+def _average_path_length(n_samples):
+    # Average path length of an unsuccessful BST search (same formula as sklearn's IsolationForest)
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    two = n_samples == 2
+    more = n_samples > 2
+    lengths[two] = 1.0
+    lengths[more] = (2.0 * (np.log(n_samples[more] - 1.0) + np.euler_gamma)
+                     - 2.0 * (n_samples[more] - 1.0) / n_samples[more])
+    return lengths
+
+
+class FlatForest:
+    """
+    Vectorized IsolationForest scorer over flat node arrays.
+
+    Nodes are numbered breadth-first within each tree so the two children of a
+    node are adjacent: a row at `node` moves to children[node] if its value is
+    <= threshold[node], to children[node] + 1 otherwise. Leaves point to
+    themselves with a +inf threshold, so every tree can be stepped `max_depth`
+    times without checking which rows already reached a leaf.
+
+    :param feature: Split feature of each node (0 for leaves).
+    :param threshold: Split threshold of each node (+inf for leaves).
+    :param children: Index of the left child of each node (the node itself for leaves).
+    :param leaf_value: Path length credited when a row ends in the node (depth + average
+                       path length of the samples left in it - 1).
+    :param roots: Index of the root node of each tree.
+    :param normalizer: n_estimators * average path length of max_samples.
+    :param offset: Decision threshold (offset_ of the fitted model).
+    :param max_depth: Depth of the deepest tree.
+    :param n_features: Number of input features.
+    :param model: The fitted IsolationForest, scoring the large batches (None = flat arrays only).
+    """
+
+    FIELDS = ('feature', 'threshold', 'children', 'leaf_value', 'roots')
+
+    def __init__(self, feature, threshold, children, leaf_value, roots, normalizer, offset, max_depth, n_features,
+                 model=None):
+        # Node indices are intp, so the gathers do not convert them at every step
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.intp)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.normalizer = float(normalizer)
+        self.offset_ = float(offset)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.model = model
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Exports a fitted IsolationForest (e.g. from anomaly_detection.train_isolation_forest).
+        """
+        feature, threshold, children, leaf_value, roots = [], [], [], [], []
+        start = max_depth = 0
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            # Breadth-first order: the children of a node are appended as a pair
+            order = [0]
+            for node in order:
+                if t.children_left[node] != -1:
+                    order += [t.children_left[node], t.children_right[node]]
+            order = np.array(order)
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+
+            leaf = t.children_left[order] == -1
+            depths = t.compute_node_depths()[order]  # root = 1, as in sklearn's decision path lengths
+            feature.append(np.where(leaf, 0, np.asarray(tree_features)[np.maximum(t.feature[order], 0)]))
+            threshold.append(np.where(leaf, np.inf, t.threshold[order]))
+            children.append(start + np.where(leaf, np.arange(len(order)), position[np.maximum(t.children_left[order], 0)]))
+            leaf_value.append(depths + _average_path_length(t.n_node_samples[order]) - 1.0)
+            roots.append(start)
+            start += len(order)
+            max_depth = max(max_depth, int(depths.max()) - 1)
+
+        normalizer = len(model.estimators_) * _average_path_length([model.max_samples_])[0]
+        return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(children),
+                   np.concatenate(leaf_value), roots, normalizer, model.offset_, max_depth, model.n_features_in_,
+                   model=model)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_features_in_(self):
+        # sklearn attribute name, so the export can stand in for the model
+        return self.n_features
+
+    def leaves(self, X):
+        # Leaf reached by every row in every tree: (n_estimators, n_rows) node indices
+        n = len(X)
+        values = np.ascontiguousarray(np.asarray(X).T).ravel()  # feature-major: value of (f, row) at f * n + row
+        rows = np.arange(n)
+        offsets = self.feature * n
+        nodes = np.repeat(self.roots[:, None].astype(np.intp), n, axis=1)
+        # Preallocated step buffers; mode='clip' lets take write into them directly (indices are always valid)
+        index, following = np.empty_like(nodes), np.empty_like(nodes)
+        value = np.empty(nodes.shape, dtype=values.dtype)
+        threshold = np.empty(nodes.shape)
+        go_right = np.empty(nodes.shape, dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(offsets, nodes, out=index, mode='clip')
+            index += rows
+            np.take(values, index, out=value, mode='clip')
+            np.take(self.threshold, nodes, out=threshold, mode='clip')
+            np.greater(value, threshold, out=go_right)
+            np.take(self.children, nodes, out=following, mode='clip')
+            following += go_right
+            nodes, following = following, nodes
+        return nodes
+
+    def score_samples(self, X):
+        """
+        Same values as IsolationForest.score_samples (lower = more abnormal).
+
+        :param X: 2-D array of n_features columns.
+        """
+        # The trees were fitted on float32 values: compare the same rounded values
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features)
+        if self.model is not None and len(X) >= SKLEARN_MIN_ROWS:
+            return self.model.score_samples(X)
+        depths = np.zeros(len(X))
+        for start in range(0, len(X), LEAVES_CHUNK_ROWS):
+            chunk = depths[start:start + LEAVES_CHUNK_ROWS]
+            # Add the trees one after the other like sklearn (a numpy sum may pair them differently)
+            for tree_values in self.leaf_value[self.leaves(X[start:start + LEAVES_CHUNK_ROWS])]:
+                chunk += tree_values
+        if self.normalizer == 0:
+            return -np.full(len(X), 0.5)
+        return -(2.0 ** (-depths / self.normalizer))
+
+    def score(self, X):
+        # (scores, flags) like scoring_service.score_batch
+        scores = self.score_samples(X)
+        return scores, (scores - self.offset_ < 0).astype(np.int8)
+
+    def predict(self, X):
+        # 1 for inliers, -1 for anomalies, like IsolationForest.predict
+        return np.where(self.score_samples(X) - self.offset_ < 0, -1, 1)
+
+    def save(self, file_path):
+        # Compact .npz holding only numeric arrays (no pickle); the sklearn model is not saved
+        arrays = {name: getattr(self, name) for name in self.FIELDS}
+        arrays['feature'] = arrays['feature'].astype(np.int32)
+        arrays['children'] = arrays['children'].astype(np.int32)
+        # np.savez appends the extension when it is missing: return the name actually written
+        file_path = os.fspath(file_path)
+        if not file_path.endswith('.npz'):
+            file_path += '.npz'
+        np.savez(file_path, **arrays,
+                 meta=np.array([self.normalizer, self.offset_, self.max_depth, self.n_features]))
+        return file_path
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as arrays:
+            normalizer, offset, max_depth, n_features = arrays['meta']
+            return cls(*(arrays[name] for name in cls.FIELDS), normalizer, offset, max_depth, n_features)
@@ -1,9 +1,19 @@
 # src/generate_report.py
 
 from fpdf import FPDF
+from PIL import Image
 
 import pandas as pd
+import hashlib
+import logging
 import os 
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils import worker_logging
+
+logger = logging.getLogger(__name__)
 
 metrics_image: str = 'plots/metrics_scatter.png'  # Annoncer explicitement le type comme str
 distribution_image: str = 'plots/distribution_views.png'  # Annoncer explicitement le type comme str
@@ -23,9 +33,105 @@ class PDF(FPDF):
         self.set_font('Arial', 'I', 8)
         self.cell(0, 10, f'Page {self.page_no()}  © 2025 GeeksterLab', 0, 0, 'C')
 
+# Images are embedded at this resolution over the printable page width (210 mm - 2 x 10 mm)
+REPORT_IMAGE_DPI = 150
+REPORT_IMAGE_WIDTH_MM = 190
+
+# Prepared images not used for IMAGE_CACHE_MAX_AGE_S are removed from the cache
+# directory, so a scheduled job does not fill the disk with old plots; a cache
+# hit refreshes the file's mtime (at most once per IMAGE_CACHE_TOUCH_S, so the
+# parsed data cached below stays valid within a run)
+IMAGE_CACHE_MAX_AGE_S = 7 * 24 * 3600
+IMAGE_CACHE_TOUCH_S = 24 * 3600
+
+# Parsed PNG data (fpdf image info) by (prepared image path, mtime), reused by every report of
+# the process; the least recently used entries are evicted beyond PARSED_IMAGES_MAX
+PARSED_IMAGES_MAX = 32
+_parsed_images = OrderedDict()
+
+def prepare_report_image(image_path, cache_dir, dpi=REPORT_IMAGE_DPI, width_mm=REPORT_IMAGE_WIDTH_MM):
+    """
+    Returns a copy of the image ready to embed, cached by content hash.
+
+    The copy is flattened to RGB (fpdf 1.7 splits alpha channels row by row,
+    which is very slow on matplotlib's RGBA PNGs) and downscaled to the
+    target DPI for the printed width. Unchanged images are found in the cache
+    on later runs and not processed again. Adding an image to the cache
+    removes the entries unused for IMAGE_CACHE_MAX_AGE_S.
+
+    :param image_path: Source PNG/JPEG.
+    :param cache_dir: Directory of the prepared images.
+    :return: Path of the prepared PNG.
+    """
+    with open(image_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:20]
+    width_px = round(width_mm / 25.4 * dpi)
+    cached = os.path.join(cache_dir, f'{digest}_{width_px}.png')
+    try:
+        if time.time() - os.path.getmtime(cached) > IMAGE_CACHE_TOUCH_S:
+            os.utime(cached)
+        return cached
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(cache_dir, exist_ok=True)
+    _prune_image_cache(cache_dir)
+    with Image.open(image_path) as image:
+        image = image.convert('RGBA')
+        flat = Image.new('RGB', image.size, 'white')
+        flat.paste(image, mask=image.getchannel('A'))
+        if flat.width > width_px:
+            flat = flat.resize((width_px, round(flat.height * width_px / flat.width)), Image.LANCZOS)
+        # Write then rename, so concurrent report workers never read a partial file
+        tmp = f'{cached}.{os.getpid()}.tmp'
+        flat.save(tmp, format='PNG')
+    os.replace(tmp, cached)
+    return cached
+
+def _prune_image_cache(cache_dir, max_age=IMAGE_CACHE_MAX_AGE_S):
+    # Remove the prepared images (and leftover temporary files) not used for max_age seconds
+    limit = time.time() - max_age
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass  # already removed by another report worker
+
+def _parsed_png(pdf, path):
+    key = (path, os.path.getmtime(path))
+    info = _parsed_images.pop(key, None)
+    if info is None:
+        info = pdf._parsepng(path)
+    _parsed_images[key] = info
+    while len(_parsed_images) > PARSED_IMAGES_MAX:
+        _parsed_images.popitem(last=False)
+    return info
+
+def _add_image(pdf, image_path, cache_dir):
+    # Embed an image through the prepared-image caches; fall back to fpdf's own loading
+    try:
+        prepared = prepare_report_image(image_path, cache_dir)
+        # Registering parsed data relies on fpdf 1.7 internals (images dict, _parsepng):
+        # other versions just load the prepared image themselves
+        if hasattr(pdf, '_parsepng') and isinstance(getattr(pdf, 'images', None), dict) \
+                and prepared not in pdf.images:
+            # fpdf drops the data of its own dict after writing: give it a copy
+            pdf.images[prepared] = dict(_parsed_png(pdf, prepared), i=len(pdf.images) + 1)
+    except (OSError, ValueError, RuntimeError) as e:
+        # Unreadable image (PIL) or PNG rejected by fpdf (RuntimeError 'FPDF error')
+        logger.warning("Image %s embedded without preparation: %s", image_path, e)
+        prepared = image_path
+    pdf.image(prepared, w=pdf.w - 20)
+
 def generate_report(total_views, total_likes, anomaly_count, ratio, 
                     metrics_image, distribution_image, metrics_explanation, 
-                    distribution_explanation, output_file='report/FakeMetrics_Report.pdf'):
+                    distribution_explanation, output_file='report/FakeMetrics_Report.pdf',
+                    image_cache_dir=None):
+    # image_cache_dir: where prepared images are cached (default: .image_cache next to the report)
+    if image_cache_dir is None:
+        image_cache_dir = os.path.join(os.path.dirname(output_file), '.image_cache')
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=12)
@@ -40,7 +146,7 @@ def generate_report(total_views, total_likes, anomaly_count, ratio,
     # Ajout de l'image du scatter plot
     pdf.cell(0, 10, "Scatter Plot of Views vs Likes (with anomalies):", ln=True)
     if os.path.exists(metrics_image):
-        pdf.image(metrics_image, w=pdf.w - 20)
+        _add_image(pdf, metrics_image, image_cache_dir)
     else:
         pdf.cell(0, 10, f"[Image non trouvée: {metrics_image}]", ln=True)
     pdf.ln(5)
@@ -50,7 +156,7 @@ def generate_report(total_views, total_likes, anomaly_count, ratio,
     # Ajout de l'image de distribution
     pdf.cell(0, 10, "Distribution of Views:", ln=True)
     if os.path.exists(distribution_image):
-        pdf.image(distribution_image, w=pdf.w - 20)
+        _add_image(pdf, distribution_image, image_cache_dir)
     else:
         pdf.cell(0, 10, f"[Image non trouvée: {distribution_image}]", ln=True)
     pdf.ln(5)
@@ -63,12 +169,29 @@ def generate_report(total_views, total_likes, anomaly_count, ratio,
     # Sauvegarder le rapport en PDF
     try:
         pdf.output(output_file)
-        print(f"Report generated: {output_file}")
+        logger.info("Report generated: %s", output_file)
         return output_file  # Retourner le chemin du fichier généré
     except Exception as e:
-        print(f"[ERROR] Erreur lors de la génération du rapport: {e}")  # Débogage
+        logger.error("Erreur lors de la génération du rapport: %s", e)  # Débogage
         return None  # Retourner None en cas d'erreur
 
+def _generate_report_job(job):
+    return generate_report(**job)
+
+def generate_reports(jobs, n_workers=None):
+    """
+    Generates several reports concurrently in a process pool.
+
+    :param jobs: List of dicts of generate_report keyword arguments (one per report).
+    :param n_workers: Worker processes (None = all cores, 1 = in-process).
+    :return: List of generated file paths (None for a failed report), in job order.
+    """
+    if n_workers == 1 or len(jobs) <= 1:
+        return [generate_report(**job) for job in jobs]
+    initializer, initargs = worker_logging()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=initializer, initargs=initargs) as pool:
+        return list(pool.map(_generate_report_job, jobs))
+
 
 if __name__ == "__main__":
     total_views = 1000
@@ -0,0 +1,129 @@
+# src/instrumentation.py
+
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+from src.profiling import profile_stage
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is reported as None
+    resource = None
+
+
+def peak_rss_mb():
+    # Peak resident set size of the current process since it started, in MB (None if unavailable)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _count_rows(obj):
+    # Row count of a stage result (DataFrame, array, list...), None if it has no length
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class RunMetrics:
+    """
+    Collects per-stage measurements (wall time, CPU time, memory, row count)
+    for one pipeline run.
+
+    The OS only keeps the peak RSS of the whole process, so a stage records
+    'process_peak_rss_mb' (that peak when the stage ends) and
+    'peak_rss_delta_mb', how much the stage raised it: 0 when the stage stayed
+    below the memory used by an earlier stage.
+
+    Each finished stage is emitted as a JSON record on the given logger
+    (typically obtained with utils.setup_logger) and kept in memory so a
+    summary table or a JSON dump can be produced at the end of the run.
+
+    :param logger: Logger receiving one structured record per stage (optional).
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None, threads=False):
+        """
+        Measures the enclosed block as the stage `name`.
+
+        The yielded record is a dict: set record['rows'] inside the block when
+        the row count is only known once the stage has run. When the stage is
+        selected for profiling (see src.profiling) the profile file path is
+        added to the record; threads=True when the stage works in other
+        threads (see profiling.profile_stage).
+        """
+        record = {'stage': name, 'rows': rows}
+        rss_start = peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            with profile_stage(name, threads=threads) as profile_file:
+                if profile_file is not None:
+                    record['profile'] = profile_file
+                yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+            rss_end = peak_rss_mb()
+            record['process_peak_rss_mb'] = rss_end
+            record['peak_rss_delta_mb'] = None if rss_end is None else rss_end - rss_start
+            self.records.append(record)
+            if self.logger is not None:
+                self.logger.info(json.dumps(record, sort_keys=True))
+
+    def track(self, name=None):
+        """
+        Decorator version of stage(): the row count is taken from the
+        return value of the decorated function when it has a length.
+        """
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name) as record:
+                    result = func(*args, **kwargs)
+                    record['rows'] = _count_rows(result)
+                return result
+            return wrapper
+        return decorator
+
+    def summary_table(self):
+        # Plain text table with one line per stage and a total line
+        header = (f"{'stage':<20}{'rows':>10}{'wall (s)':>12}{'cpu (s)':>12}"
+                  f"{'peak RSS +MB':>14}{'process peak (MB)':>19}")
+        lines = [header, '-' * len(header)]
+        for record in self.records:
+            rows = '' if record['rows'] is None else record['rows']
+            delta, peak = record['peak_rss_delta_mb'], record['process_peak_rss_mb']
+            delta = '' if delta is None else f"{delta:.1f}"
+            peak = '' if peak is None else f"{peak:.1f}"
+            lines.append(f"{record['stage']:<20}{rows:>10}{record['wall_s']:>12.3f}"
+                         f"{record['cpu_s']:>12.3f}{delta:>14}{peak:>19}")
+        total_wall = sum(r['wall_s'] for r in self.records)
+        total_cpu = sum(r['cpu_s'] for r in self.records)
+        lines.append('-' * len(header))
+        lines.append(f"{'total':<20}{'':>10}{total_wall:>12.3f}{total_cpu:>12.3f}{'':>14}{'':>19}")
+        return '\n'.join(lines)
+
+    def to_json(self):
+        return json.dumps({'stages': self.records}, indent=2, sort_keys=True)
+
+    def dump_json(self, file_path):
+        # Write all the stage records to a JSON file and return its path
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        return file_path
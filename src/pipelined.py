@@ -0,0 +1,271 @@
+# src/pipelined.py
+
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detection import FEATURES, reservoir_sample, score_features, train_isolation_forest
+from src.data_preparation import clean_data
+from src.results_store import new_run_id
+from src.rules import RULE_COLUMN, flag_rule_violations
+
+logger = logging.getLogger(__name__)
+
+# Pipelined executor for chunked runs.
+#
+# Each stage (read -> prepare -> score -> write) runs in its own thread and
+# hands its chunks to the next one through a bounded queue. While the writer
+# stores chunk n, the scorer works on chunk n + 1 and the reader parses chunk
+# n + 2: disk I/O and parsing (which release the GIL in pandas / pyarrow /
+# sqlite) overlap with sklearn's scoring, so the run goes at about the speed
+# of its slowest stage instead of the sum of all stages. The bounded queues
+# keep at most queue_size chunks in flight between two stages, so memory
+# stays flat whatever the input size, and a slow writer holds back the reader.
+
+_DONE = object()
+_POLL_S = 0.1
+
+# Rows buffered by ChunkedDetector before it fits its model (when not fitted beforehand with fit_sample)
+TRAIN_ROWS = 10_000
+
+
+def _put(q, item, failed):
+    # Blocking put that gives up when another stage failed (nobody may ever read again)
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, failed):
+    while not failed.is_set():
+        try:
+            return q.get(timeout=_POLL_S)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def run_pipeline(source, stages, queue_size=4):
+    """
+    Streams the items of `source` through `stages`, one thread per stage.
+
+    :param source: Iterable of chunks (iterated in the reader thread; a generator
+                   is closed when the run stops, even early).
+    :param stages: List of (name, function) or (name, function, flush) tuples;
+                   each function takes the output of the previous one and may
+                   return None to pass nothing on (e.g. while it buffers).
+                   flush() is called once the input is exhausted and its
+                   result, unless None, is passed on as a last item. The
+                   return value of the last stage is discarded.
+    :param queue_size: Maximum number of chunks waiting between two stages.
+    :return: Dict stage name -> {'items', 'busy_s'} (busy_s = time spent in the stage itself).
+             The first exception raised by a stage is re-raised once every thread stopped.
+    """
+    if queue_size < 1:
+        raise ValueError("queue_size must be at least 1")
+    stages = [tuple(stage) + (None,) * (3 - len(stage)) for stage in stages]
+    names = ['read'] + [name for name, _, _ in stages]
+    stats = {name: {'items': 0, 'busy_s': 0.0} for name in names}
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    failed = threading.Event()
+    errors = []
+
+    def reader():
+        items = None
+        try:
+            items = iter(source)
+            while True:
+                start = time.perf_counter()
+                item = next(items, _DONE)
+                stats['read']['busy_s'] += time.perf_counter() - start
+                if item is _DONE or not _put(queues[0], item, failed):
+                    break
+                stats['read']['items'] += 1
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            # A generator source (e.g. sql_source.read_sql_chunks) releases its resources now
+            # when another stage failed, instead of whenever it is garbage collected
+            if hasattr(items, 'close'):
+                items.close()
+            _put(queues[0], _DONE, failed)
+
+    def worker(index, name, func, flush):
+        out = queues[index + 1] if index + 1 < len(queues) else None
+        try:
+            while True:
+                item = _get(queues[index], failed)
+                if item is _DONE:
+                    if flush is not None and not failed.is_set():
+                        start = time.perf_counter()
+                        result = flush()
+                        stats[name]['busy_s'] += time.perf_counter() - start
+                        if out is not None and result is not None:
+                            _put(out, result, failed)
+                    break
+                start = time.perf_counter()
+                result = func(item)
+                stats[name]['busy_s'] += time.perf_counter() - start
+                stats[name]['items'] += 1
+                if out is not None and result is not None and not _put(out, result, failed):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            if out is not None:
+                _put(out, _DONE, failed)
+
+    threads = [threading.Thread(target=reader, name='pipeline-read', daemon=True)]
+    threads += [threading.Thread(target=worker, args=(i, name, func, flush), name=f'pipeline-{name}', daemon=True)
+                for i, (name, func, flush) in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return stats
+
+
+class ChunkedDetector:
+    """
+    Prepare / score / write steps of a chunked IsolationForest run.
+
+    One model scores every chunk, so all the chunks share one decision
+    threshold. It is fitted on the first `train_rows` rows of the input
+    (buffered until they have all arrived, whatever the chunk size), or
+    beforehand with fit_sample on a uniform sample of the whole input, which
+    costs a first pass but does not favor the oldest rows of a time-ordered
+    input. Features are the raw counts: the per-frame z-score of
+    normalize_features would differ from chunk to chunk, and IsolationForest
+    does not need scaled features. LOF compares each row with its neighbors in
+    the whole dataset and has no chunked equivalent.
+
+    :param store: ResultsStore receiving the scored chunks (None = only count them).
+    :param run_id: Run partition of the store (default: new_run_id(), shared by all the chunks).
+    :param contamination: The expected ratio of anomalies.
+    :param rules: Run the rule checks (src.rules) and keep violations out of the model.
+    :param max_ratio: With rules, upper bound of likes/views.
+    :param n_jobs: Parallel jobs of the IsolationForest.
+    :param train_rows: Rows buffered to fit the model on when fit_sample was not called.
+    """
+
+    def __init__(self, store=None, run_id=None, contamination=0.05, rules=False, max_ratio=None, n_jobs=None,
+                 train_rows=TRAIN_ROWS):
+        if train_rows < 1:
+            raise ValueError("train_rows must be at least 1")
+        self.store = store
+        self.run_id = run_id or new_run_id()
+        self.contamination = contamination
+        self.rules = rules
+        self.max_ratio = max_ratio
+        self.n_jobs = n_jobs
+        self.train_rows = train_rows
+        self.model = None
+        self._pending = []
+        self._pending_rows = 0
+        self.rows = 0
+        self.anomalies = 0
+
+    def prepare(self, chunk):
+        chunk = clean_data(chunk).reset_index(drop=True)
+        if self.rules:
+            chunk = flag_rule_violations(chunk, max_ratio=self.max_ratio)
+        views = chunk['views'].to_numpy(dtype=np.float64)
+        likes = chunk['likes'].to_numpy(dtype=np.float64)
+        chunk['like_view_ratio'] = np.divide(likes, views, out=np.zeros(len(chunk)), where=views > 0)
+        return chunk
+
+    @staticmethod
+    def _features(chunk):
+        # Raw count features and rule violation mask of a prepared chunk
+        features = chunk[FEATURES].to_numpy(dtype=np.float64)
+        violations = np.zeros(len(chunk), dtype=bool)
+        if RULE_COLUMN in chunk.columns:
+            violations = chunk[RULE_COLUMN].to_numpy() != 0
+        return features, violations
+
+    def _fit(self, train):
+        if len(train) == 0:
+            raise ValueError("No row to fit the model on")
+        self.model = train_isolation_forest(None, contamination=self.contamination, n_jobs=self.n_jobs,
+                                            features=train)
+
+    def fit_sample(self, chunks, sample_size):
+        """
+        Fits the model on a uniform sample (reservoir_sample) of the rows of a
+        first pass over the input; rule violations are left out.
+
+        :param chunks: Iterable of raw DataFrame chunks (the same input as run).
+        :param sample_size: Maximum number of training rows.
+        """
+        def train_chunks():
+            for chunk in chunks:
+                features, violations = self._features(self.prepare(chunk))
+                yield features[~violations]
+        self._fit(reservoir_sample(train_chunks(), sample_size))
+        return self
+
+    def score(self, chunk):
+        if self.model is not None:
+            return self._score(chunk)
+        # Not fitted yet: wait for the first train_rows rows
+        self._pending.append(chunk)
+        self._pending_rows += len(chunk)
+        if self._pending_rows < self.train_rows:
+            return None
+        return self._fit_pending()
+
+    def flush(self):
+        # End of the input: an input shorter than train_rows is fitted on all its rows
+        return self._fit_pending() if self._pending else None
+
+    def _fit_pending(self):
+        chunk = pd.concat(self._pending, ignore_index=True)
+        self._pending, self._pending_rows = [], 0
+        if not len(chunk):
+            return self._score(chunk)
+        features, violations = self._features(chunk)
+        train = features[:self.train_rows][~violations[:self.train_rows]]
+        self._fit(train)
+        return self._score(chunk)
+
+    def _score(self, chunk):
+        if not len(chunk):
+            return chunk.assign(anomaly=np.zeros(0, int), anomaly_score=np.zeros(0))
+        features, violations = self._features(chunk)
+        scores, flags = score_features(self.model, features)
+        scores[violations] = np.nan
+        flags[violations] = 1
+        chunk['anomaly'] = flags.astype(int)
+        chunk['anomaly_score'] = scores
+        return chunk
+
+    def write(self, chunk):
+        if self.store is not None and len(chunk):
+            self.store.append(chunk, run_id=self.run_id)
+        self.rows += len(chunk)
+        self.anomalies += int(chunk['anomaly'].sum())
+        return len(chunk)
+
+    def run(self, chunks, queue_size=4):
+        """
+        Runs the pipeline over an iterable of raw DataFrame chunks.
+
+        :return: Per-stage statistics of run_pipeline.
+        """
+        stats = run_pipeline(chunks, [('prepare', self.prepare), ('score', self.score, self.flush),
+                                      ('write', self.write)],
+                             queue_size=queue_size)
+        logger.info("Number of anomalies detected: %d (in %d rows)", self.anomalies, self.rows)
+        return stats
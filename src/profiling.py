@@ -0,0 +1,184 @@
+# src/profiling.py
+
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Opt-in profiling is driven by environment variables so a slow production run
+# can be diagnosed without touching the code:
+#   FAKE_METRICS_PROFILE=detection,report   (stage names, or "all")
+#   FAKE_METRICS_PROFILER=cprofile|sampling (default: cprofile)
+#   FAKE_METRICS_PROFILE_DIR=profiles       (where the per-stage files go)
+PROFILE_ENV = 'FAKE_METRICS_PROFILE'
+PROFILER_ENV = 'FAKE_METRICS_PROFILER'
+PROFILE_DIR_ENV = 'FAKE_METRICS_PROFILE_DIR'
+DEFAULT_PROFILE_DIR = 'profiles'
+PROFILERS = ('cprofile', 'sampling')
+
+# Values set with configure_profiling() take precedence over the environment
+_settings = {}
+
+
+def configure_profiling(stages=None, profiler=None, output_dir=None):
+    """
+    Overrides the environment configuration (used by the command line).
+
+    :param stages: Iterable of stage names to profile, or "all". None keeps the env value.
+    :param profiler: "cprofile" or "sampling".
+    :param output_dir: Directory receiving the profile files.
+    """
+    if profiler is not None and profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected one of {PROFILERS}")
+    if stages is not None:
+        _settings['stages'] = stages if isinstance(stages, str) else ','.join(stages)
+    if profiler is not None:
+        _settings['profiler'] = profiler
+    if output_dir is not None:
+        _settings['output_dir'] = output_dir
+
+
+def reset_profiling():
+    # Forget the values set with configure_profiling()
+    _settings.clear()
+
+
+def _setting(key, env_name, default):
+    value = _settings.get(key, os.environ.get(env_name))
+    return value if value else default
+
+
+def profiled_stages():
+    # Set of the stage names to profile ("all" matches every stage)
+    raw = _setting('stages', PROFILE_ENV, '')
+    return {s.strip() for s in raw.split(',') if s.strip()}
+
+
+def is_profiled(stage):
+    stages = profiled_stages()
+    return 'all' in stages or stage in stages
+
+
+def selected_profiler():
+    # Profiler name; a typo in the environment is an error rather than a silent fallback
+    profiler = _setting('profiler', PROFILER_ENV, 'cprofile')
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}' in {PROFILER_ENV}, expected one of {PROFILERS}")
+    return profiler
+
+
+def profile_path(stage):
+    # File written for a profiled stage: <dir>/<stage>.prof (cProfile) or .collapsed (sampling)
+    extension = 'prof' if selected_profiler() == 'cprofile' else 'collapsed'
+    return os.path.join(_setting('output_dir', PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR), f'{stage}.{extension}')
+
+
+class StackSampler:
+    """
+    Minimal sampling profiler: a background thread periodically captures the
+    stack of the profiled thread and counts identical stacks.
+
+    The result is written in the "folded stacks" format (one
+    `frame;frame;frame count` line per stack) understood by flamegraph.pl,
+    speedscope and inferno.
+
+    :param interval: Seconds between two samples.
+    :param all_threads: Sample every thread (except the sampler), each stack
+                        starting with the thread name, instead of only the
+                        thread that called start().
+    """
+
+    def __init__(self, interval=0.005, all_threads=False):
+        self.interval = interval
+        self.all_threads = all_threads
+        self.samples = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.all_threads:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                selected = [(names.get(ident, str(ident)), frame) for ident, frame in frames.items() if ident != own]
+            else:
+                selected = [(None, frames.get(self._target))]
+            for thread_name, frame in selected:
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if thread_name is not None:
+                    stack.append(thread_name)
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_stage(stage, threads=False):
+    """
+    Profiles the enclosed block if `stage` is selected, otherwise does nothing.
+
+    Yields the path of the profile file that will be written, or None when
+    the stage is not profiled. cProfile output (.prof) can be opened with
+    pstats, snakeviz or flameprof; sampling output (.collapsed) feeds any
+    flamegraph tool directly.
+
+    cProfile only records the thread that enters the block. For a stage whose
+    work runs in other threads (threads=True, e.g. the pipelined detection),
+    the sampling profiler records every thread; cProfile logs a warning.
+    """
+    if not is_profiled(stage):
+        yield None
+        return
+
+    file_path = profile_path(stage)
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+
+    if file_path.endswith('.prof'):
+        if threads:
+            logger.warning("cProfile only records the calling thread of stage '%s', not its worker threads: "
+                           "use the sampling profiler to see them", stage)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield file_path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(file_path)
+            logger.info("Profile of stage '%s' saved to %s", stage, file_path)
+    else:
+        sampler = StackSampler(all_threads=threads)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield file_path
+        finally:
+            sampler.stop()
+            sampler.dump(file_path)
+            logger.info("Profile of stage '%s' (%.2fs sampled) saved to %s", stage, time.perf_counter() - start, file_path)
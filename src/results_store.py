@@ -0,0 +1,227 @@
+# src/results_store.py
+
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import date as date_type, datetime
+
+import pandas as pd
+
+from src.sql_source import OPERATORS
+from src.utils import write_frame
+
+logger = logging.getLogger(__name__)
+
+# Append-only store of the scored rows, partitioned by day and run:
+#
+#   <root>/date=2024-05-01/run=20240501T020000-1a2b3c/part-<time>-<id>.parquet
+#
+# A run only ever adds new files, so writers never rewrite (or lock) what is
+# already stored, and each file is written atomically (see utils.write_frame).
+# Parquet keeps min/max statistics of every column in the file footer; a query
+# first keeps the partitions of the requested days / runs from the directory
+# names, then skips the files whose statistics cannot match its filters, and
+# only reads the remaining files.
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Columns written by the detection stage, in this order when present
+SCORED_COLUMNS = ['views', 'likes', 'like_view_ratio', 'anomaly', 'anomaly_score', 'anomaly_lof', 'lof_score']
+
+_PARTITION = re.compile(r'^(date|run)=(.+)$')
+_RUN_ID = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def new_run_id():
+    # Sortable by start time, unique across concurrent runs
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _day(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date_type, pd.Timestamp)):
+        return value.strftime(DATE_FORMAT)
+    return datetime.strptime(str(value), DATE_FORMAT).strftime(DATE_FORMAT)
+
+
+def _condition(condition):
+    # (operator, value) of a filter, with the conventions of sql_source.build_query
+    if isinstance(condition, tuple) and len(condition) == 2 and condition[0] in OPERATORS:
+        return condition
+    if isinstance(condition, (list, tuple, set)):
+        return 'IN', list(condition)
+    return '=', condition
+
+
+def _may_match(statistics, condition):
+    # False when the [min, max] range of a file proves no row can satisfy the condition
+    if statistics is None:
+        return True
+    low, high = statistics
+    op, value = _condition(condition)
+    if op == 'IN':
+        return any(low <= v <= high for v in value)
+    if op == '=':
+        return low <= value <= high
+    if op == '>':
+        return high > value
+    if op == '>=':
+        return high >= value
+    if op == '<':
+        return low < value
+    if op == '<=':
+        return low <= value
+    if op == 'BETWEEN':
+        return high >= value[0] and low <= value[1]
+    return True  # '!=' and LIKE: no pruning
+
+
+def _like_mask(column, pattern):
+    # SQL LIKE as SQLite applies it: % = any run of characters, _ = one character, ASCII case-insensitive
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern)
+    return column.notna() & column.astype(str).str.fullmatch(regex, case=False)
+
+
+def _row_mask(column, condition):
+    op, value = _condition(condition)
+    if op == 'IN':
+        return column.isin(value)
+    if op == 'BETWEEN':
+        return column.between(*value)
+    if op == 'LIKE':
+        return _like_mask(column, value)
+    masks = {'=': column.__eq__, '!=': column.__ne__, '<': column.__lt__, '<=': column.__le__,
+             '>': column.__gt__, '>=': column.__ge__}
+    if op not in masks:
+        raise ValueError(f"Unsupported filter operator '{op}'")
+    return masks[op](value)
+
+
+class ResultsStore:
+    """
+    Partitioned Parquet store of scored metrics.
+
+    :param root: Directory of the store (created on the first append).
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def append(self, data, run_id=None, date=None, columns=None):
+        """
+        Adds the scored rows of one run as a new file.
+
+        :param data: Scored DataFrame (e.g. after detect_anomalies / detect_anomalies_lof).
+        :param run_id: Run identifier (default: new_run_id()).
+        :param date: Day partition (date, datetime or 'YYYY-MM-DD'; default: today).
+        :param columns: Columns to store (default: the SCORED_COLUMNS present, then the other columns).
+        :return: Path of the written file.
+        """
+        run_id = run_id or new_run_id()
+        if not _RUN_ID.match(run_id):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        day = _day(date or datetime.now())
+        if columns is None:
+            columns = [c for c in SCORED_COLUMNS if c in data.columns]
+            columns += [c for c in data.columns if c not in columns]
+        directory = os.path.join(self.root, f'date={day}', f'run={run_id}')
+        os.makedirs(directory, exist_ok=True)
+        # Names sort in append order, so a query returns the rows of a run in the order they were stored
+        path = os.path.join(directory, f'part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet')
+        write_frame(data[columns].reset_index(drop=True), path, file_format='parquet')
+        logger.info("Scored rows stored: %d -> %s", len(data), path)
+        return path
+
+    def partitions(self, start=None, end=None, run_id=None):
+        """
+        Lists the (date, run_id, directory) partitions of the store, oldest first.
+
+        :param start: First day included (None = no lower bound).
+        :param end: Last day included (None = no upper bound).
+        :param run_id: Only this run.
+        """
+        start, end = _day(start), _day(end)
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for date_dir in sorted(os.listdir(self.root)):
+            match = _PARTITION.match(date_dir)
+            if not match or match.group(1) != 'date':
+                continue
+            day = match.group(2)
+            if (start and day < start) or (end and day > end):
+                continue
+            for run_dir in sorted(os.listdir(os.path.join(self.root, date_dir))):
+                match = _PARTITION.match(run_dir)
+                if not match or match.group(1) != 'run' or (run_id and match.group(2) != run_id):
+                    continue
+                found.append((day, match.group(2), os.path.join(self.root, date_dir, run_dir)))
+        return found
+
+    def files(self, start=None, end=None, run_id=None, filters=None):
+        """
+        Data files of the selected partitions whose statistics may match the filters.
+
+        :param filters: Dict column -> value (equality), list (IN) or (operator, value)
+                        as in sql_source.build_query.
+        :return: List of (date, run_id, path).
+        """
+        import pyarrow.parquet as pq
+
+        selected = []
+        for day, run, directory in self.partitions(start, end, run_id):
+            for name in sorted(os.listdir(directory)):
+                if name.startswith('.') or not name.endswith('.parquet'):
+                    continue  # temporary files of writes in progress
+                path = os.path.join(directory, name)
+                if filters:
+                    statistics = _file_statistics(pq.read_metadata(path))
+                    if not all(column in statistics and _may_match(statistics[column], condition)
+                               for column, condition in filters.items()):
+                        continue
+                selected.append((day, run, path))
+        return selected
+
+    def query(self, start=None, end=None, run_id=None, filters=None, columns=None):
+        """
+        Reads the stored rows of the selected days / run that match the filters.
+
+        :param columns: Columns to read (None = all); 'date' and 'run_id' are always added.
+        :return: DataFrame (empty when nothing matches).
+        """
+        import pyarrow.parquet as pq
+
+        frames = []
+        read = None if columns is None else list(dict.fromkeys(list(columns) + list(filters or {})))
+        for day, run, path in self.files(start, end, run_id, filters):
+            # ParquetFile reads the file alone: read_table would add the date= / run= directories as columns
+            frame = pq.ParquetFile(path).read(columns=read).to_pandas()
+            for column, condition in (filters or {}).items():
+                frame = frame[_row_mask(frame[column], condition)]
+            if columns is not None:
+                frame = frame[list(columns)]
+            frames.append(frame.assign(date=day, run_id=run))
+        if not frames:
+            return pd.DataFrame(columns=list(columns or []) + ['date', 'run_id'])
+        return pd.concat(frames, ignore_index=True)
+
+
+def _file_statistics(metadata):
+    # Column -> (min, max) over all row groups (None when a row group has no statistics)
+    statistics = {}
+    schema = metadata.schema
+    for i in range(metadata.num_columns):
+        name = schema.column(i).name
+        low = high = None
+        for g in range(metadata.num_row_groups):
+            stats = metadata.row_group(g).column(i).statistics
+            if stats is None or not stats.has_min_max:
+                low = high = None
+                break
+            low = stats.min if low is None else min(low, stats.min)
+            high = stats.max if high is None else max(high, stats.max)
+        statistics[name] = None if low is None else (low, high)
+    return statistics
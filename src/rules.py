@@ -0,0 +1,59 @@
+# src/rules.py
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Deterministic checks run on the raw counts before the ML detectors.
+# Each violated rule sets one bit of the 'rule_violation' code (0 = no violation).
+RULE_LIKES_ABOVE_VIEWS = 1
+RULE_NEGATIVE_COUNT = 2
+RULE_RATIO_ABOVE_MAX = 4
+
+RULE_NAMES = {
+    RULE_LIKES_ABOVE_VIEWS: 'likes > views',
+    RULE_NEGATIVE_COUNT: 'negative count',
+    RULE_RATIO_ABOVE_MAX: 'likes/views ratio above max_ratio',
+}
+
+RULE_COLUMN = 'rule_violation'
+
+
+def check_rules(views, likes, max_ratio=None):
+    """
+    Evaluates every rule on whole arrays at once.
+
+    :param views: Array of raw view counts.
+    :param likes: Array of raw like counts.
+    :param max_ratio: Optional upper bound of likes/views (e.g. 0.9).
+    :return: int8 array of rule codes, one per row (bitwise OR of the violated rules).
+    """
+    views = np.asarray(views)
+    likes = np.asarray(likes)
+    codes = (likes > views).astype(np.int8) * RULE_LIKES_ABOVE_VIEWS
+    codes |= ((views < 0) | (likes < 0)).astype(np.int8) * RULE_NEGATIVE_COUNT
+    if max_ratio is not None:
+        # likes > max_ratio * views is the ratio check without a division (views may be 0)
+        codes |= (likes > max_ratio * views).astype(np.int8) * RULE_RATIO_ABOVE_MAX
+    return codes
+
+
+def flag_rule_violations(data, max_ratio=None):
+    """
+    Adds the 'rule_violation' column to a DataFrame of raw (not normalized) counts.
+
+    :param data: DataFrame with 'views' and 'likes' counts.
+    :param max_ratio: Optional upper bound of likes/views.
+    :return: The DataFrame with a 'rule_violation' code column (0 = passes every rule).
+    """
+    data[RULE_COLUMN] = check_rules(data['views'].to_numpy(), data['likes'].to_numpy(), max_ratio=max_ratio)
+    logger.info("Number of rule violations: %d", int((data[RULE_COLUMN] != 0).sum()))
+    return data
+
+
+def describe_violations(codes):
+    # Count of rows violating each rule (a row may violate several)
+    codes = np.asarray(codes)
+    return {name: int(np.count_nonzero(codes & bit)) for bit, name in RULE_NAMES.items()}
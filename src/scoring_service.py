@@ -0,0 +1,352 @@
+# src/scoring_service.py
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.anomaly_detection import FEATURES, load_model, save_model, score_features, train_isolation_forest
+from src.compiled_scorer import CompiledScorer
+from src.flat_forest import FlatForest
+from src.data_preparation import load_data
+from src.utils import setup_queue_logging
+
+logger = logging.getLogger(__name__)
+
+# Local HTTP service scoring (views, likes) events with a persisted IsolationForest:
+#   POST /score  {"events": [{"views": 120, "likes": 30}, ...]}  (or a single event object)
+#     -> {"scores": [...], "anomaly": [0, 1, ...]}
+#   GET /stats   latency percentiles and throughput counters
+#   GET /health
+# Incoming events from all connections are coalesced into micro-batches
+# (flushed when max_batch_size events are waiting or after max_wait seconds)
+# and scored in a thread pool, so the event loop never blocks on the model.
+
+
+def score_batch(model, features):
+    """
+    Scores a 2-D array of (views, likes) rows with a fitted IsolationForest.
+
+    :return: (scores, flags) — raw score_samples values (lower = more abnormal)
+             and 1/0 anomaly flags, identical to model.predict.
+    """
+    return score_features(model, features)
+
+
+class LatencyStats:
+    """
+    Latency and throughput counters of the service.
+
+    Latencies are kept for the last `window` events only, so percentiles
+    reflect recent behaviour and memory stays bounded.
+    """
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.events = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def record_batch(self, latencies):
+        self.latencies.extend(latencies)
+        self.events += len(latencies)
+        self.batches += 1
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=float), [50, 99]) * 1000
+        else:
+            p50 = p99 = 0.0
+        return {
+            'events': self.events,
+            'batches': self.batches,
+            'mean_batch_size': self.events / self.batches if self.batches else 0.0,
+            'p50_ms': float(p50),
+            'p99_ms': float(p99),
+            'throughput_eps': self.events / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces scoring requests into micro-batches.
+
+    :param score_fn: Function (features array) -> (scores, flags), run in the executor.
+    :param executor: Executor running score_fn.
+    :param max_batch_size: Flush as soon as this many events are waiting.
+    :param max_wait: Flush at the latest this many seconds after the first waiting event.
+    :param stats: LatencyStats updated after each batch.
+    """
+
+    def __init__(self, score_fn, executor, max_batch_size=256, max_wait=0.005, stats=None):
+        self.score_fn = score_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = stats if stats is not None else LatencyStats()
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, features):
+        # Score an array of rows; resolves once the batch containing them is scored
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+        self._pending_rows += len(features)
+        if self._pending_rows >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        task = asyncio.get_running_loop().create_task(self._score(batch))
+        # Keep a reference until done so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        features = np.concatenate([rows for rows, _, _ in batch])
+        try:
+            scores, flags = await loop.run_in_executor(self.executor, self.score_fn, features)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        latencies = []
+        start = 0
+        for rows, future, submitted in batch:
+            stop = start + len(rows)
+            if not future.done():
+                future.set_result((scores[start:stop], flags[start:stop]))
+            latencies.extend([done - submitted] * len(rows))
+            start = stop
+        self.stats.record_batch(latencies)
+        # Lazy %-formatting: free when DEBUG is off; otherwise only a queue put (see setup_queue_logging)
+        logger.debug("Scored a batch of %d events from %d requests", len(features), len(batch))
+
+
+def _parse_events(payload):
+    # Accept {"events": [...]}, a list of events or a single event; return an (n, 2) float array
+    events = payload.get('events', payload) if isinstance(payload, dict) else payload
+    if isinstance(events, dict):
+        events = [events]
+    if not isinstance(events, list) or not events:
+        raise ValueError("expected a non-empty list of events")
+    features = np.array([[float(event[name]) for name in FEATURES] for event in events], dtype=float)
+    # NaN / inf would be scored without error (and share a micro-batch with other clients' events)
+    if not np.isfinite(features).all():
+        raise ValueError("views and likes must be finite numbers")
+    return features
+
+
+class ScoringService:
+    """
+    asyncio HTTP/1.1 scoring service (TCP or Unix socket).
+
+    :param model: Fitted IsolationForest (see anomaly_detection.train_isolation_forest)
+                  or its FlatForest export.
+    :param workers: Threads of the scoring pool.
+    :param max_batch_size: Micro-batch size limit.
+    :param max_wait: Micro-batch time window in seconds.
+    :param compiled: Score by table lookup (see src.compiled_scorer) instead of walking the trees.
+    """
+
+    def __init__(self, model, workers=2, max_batch_size=256, max_wait=0.005, compiled=False):
+        self.model = model
+        self.scorer = CompiledScorer(model) if compiled else None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(self._score, self.executor, max_batch_size=max_batch_size,
+                                    max_wait=max_wait, stats=self.stats)
+        self.server = None
+
+    def _score(self, features):
+        if self.scorer is not None:
+            return self.scorer.score(features)
+        return score_batch(self.model, features)
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        # Listen on a Unix socket if `path` is given, on host:port otherwise (port 0 = any free port)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        # One connection; requests are served until the client closes it (keep-alive)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = headers.get('content-length', '0')
+                if len(parts) != 3 or not length.isdigit():
+                    # The body cannot be delimited: answer, then drop the connection
+                    await self._respond(writer, '400 Bad Request', {'error': "malformed request"})
+                    break
+                body = await reader.readexactly(int(length))
+
+                method, target, _ = parts
+                status, payload = await self._route(method, target, body)
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def _route(self, method, target, body):
+        if method == 'GET' and target == '/health':
+            return '200 OK', {'status': 'ok'}
+        if method == 'GET' and target == '/stats':
+            return '200 OK', self.stats.snapshot()
+        if method == 'POST' and target == '/score':
+            try:
+                features = _parse_events(json.loads(body or b'null'))
+            except (ValueError, KeyError, TypeError) as e:
+                return '400 Bad Request', {'error': f"invalid events: {e}"}
+            try:
+                scores, flags = await self.batcher.submit(features)
+            except Exception as e:
+                # The model failed on the batch (in the scoring pool): report it, keep the connection
+                logger.exception("Scoring failed")
+                return '500 Internal Server Error', {'error': f"scoring failed: {e}"}
+            return '200 OK', {'scores': scores.tolist(), 'anomaly': flags.tolist()}
+        return '404 Not Found', {'error': f"unknown endpoint {method} {target}"}
+
+
+async def request(method, path, payload=None, host='127.0.0.1', port=None, unix_path=None):
+    """
+    Minimal client for the service (one request per connection).
+
+    :return: (status code, decoded JSON body)
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    data = await reader.readexactly(length)
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1]), json.loads(data)
+
+
+def load_scorer(file_path):
+    # A FlatForest export (.npz) or a joblib model saved by save_model
+    if file_path.endswith('.npz'):
+        return FlatForest.load(file_path)
+    return load_model(file_path)
+
+
+async def serve(model_path, host='127.0.0.1', port=8000, unix_path=None, workers=2,
+                max_batch_size=256, max_wait=0.005, compiled=False):
+    # Run the service until cancelled (Ctrl+C)
+    service = ScoringService(load_scorer(model_path), workers=workers,
+                             max_batch_size=max_batch_size, max_wait=max_wait, compiled=compiled)
+    server = await service.start(host=host, port=port, path=unix_path)
+    logger.info("Scoring service listening on %s", unix_path or f'{host}:{service.port}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.scoring_service',
+                                     description="Train or serve the streaming anomaly scorer.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help="fit an IsolationForest on a CSV of raw counts and save it")
+    train.add_argument('--data', required=True)
+    train.add_argument('--model', required=True)
+    train.add_argument('--contamination', type=float, default=0.05)
+
+    export = commands.add_parser('export', help="export a saved model to the flat array format (.npz)")
+    export.add_argument('--model', required=True)
+    export.add_argument('--output', required=True)
+
+    run = commands.add_parser('serve', help="serve a saved model (joblib or .npz export)")
+    run.add_argument('--model', required=True)
+    run.add_argument('--host', default='127.0.0.1')
+    run.add_argument('--port', type=int, default=8000)
+    run.add_argument('--unix-socket', default=None)
+    run.add_argument('--workers', type=int, default=2)
+    run.add_argument('--max-batch-size', type=int, default=256)
+    run.add_argument('--max-wait-ms', type=float, default=5.0)
+    run.add_argument('--compiled', action='store_true', help="score by lookup in a precomputed score grid")
+
+    args = parser.parse_args(argv)
+    if args.command == 'train':
+        model = train_isolation_forest(load_data(args.data), contamination=args.contamination)
+        print(f"Model saved to {save_model(model, args.model)}")
+    elif args.command == 'export':
+        print(f"Flat model saved to {FlatForest.from_model(load_model(args.model)).save(args.output)}")
+    else:
+        setup_queue_logging()
+        asyncio.run(serve(args.model, host=args.host, port=args.port, unix_path=args.unix_socket,
+                          workers=args.workers, max_batch_size=args.max_batch_size,
+                          max_wait=args.max_wait_ms / 1000, compiled=args.compiled))
+
+
+if __name__ == '__main__':
+    main()
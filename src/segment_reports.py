@@ -0,0 +1,127 @@
+# src/segment_reports.py
+
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.generate_report import generate_report
+from src.utils import init_worker_logging, worker_logging
+from src.visualization import plot_distribution, plot_metrics
+
+logger = logging.getLogger(__name__)
+
+# Batch mode of the report stage: the scored data is grouped once, the
+# totals of every segment come from a single groupby aggregation, and each
+# segment's plots + PDF are produced by one job of a process pool. N segment
+# reports therefore cost one pass over the data plus N small plotting jobs,
+# instead of N full pipeline runs. Rows without a segment value form their
+# own segment (reported as 'missing') rather than being dropped.
+
+
+def _segment_slug(segment):
+    # File-system safe name of a segment value. A value that had to be changed
+    # gets a short hash of the original, so 'a b' and 'a_b' keep distinct files.
+    text = str(segment)
+    if pd.isna(segment):
+        slug = 'missing'
+    else:
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', text).strip('_.') or 'segment'
+    if slug != text:
+        slug += '-' + hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+    return slug
+
+
+def segment_totals(data, key):
+    """
+    Totals of every segment in one groupby pass.
+
+    :param data: Scored DataFrame with 'views', 'likes' and 'anomaly'.
+    :param key: Segment column (e.g. 'account').
+    :return: DataFrame indexed by segment with rows, views, likes, anomalies and ratio.
+    """
+    return _aggregate(data.groupby(key, sort=True, dropna=False))
+
+
+def _aggregate(grouped):
+    totals = grouped.agg(rows=('views', 'size'), views=('views', 'sum'),
+                         likes=('likes', 'sum'), anomalies=('anomaly', 'sum'))
+    totals['anomalies'] = totals['anomalies'].astype(int)
+    views = totals['views'].where(totals['views'] != 0)
+    totals['ratio'] = (totals['likes'] / views).fillna(0.0)
+    return totals
+
+
+def _segment_report_job(job):
+    # Plot one segment then write its PDF (runs in a worker process)
+    job = dict(job)
+    frame = job.pop('frame')
+    column = job.pop('column')
+    plot_metrics(frame, save_path=job['metrics_image'], show=False)
+    plot_distribution(frame, column=column, save_path=job['distribution_image'], show=False)
+    return generate_report(**job)
+
+
+def _init_worker(*log_args):
+    init_worker_logging(*log_args)
+    # Workers only save figures
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+
+def generate_segment_reports(data, key, output_dir='reports', plots_dir='plots', column='views',
+                             metrics_explanation='', distribution_explanation='', n_workers=None):
+    """
+    Generates one PDF report per segment of the scored data.
+
+    :param data: Scored DataFrame with 'views', 'likes' and 'anomaly'.
+    :param key: Segment column; one report per distinct value.
+    :param output_dir: Directory of the PDFs (FakeMetrics_Report_<segment>.pdf).
+    :param plots_dir: Root directory of the per-segment plots (<plots_dir>/<segment>/).
+    :param column: Column of the distribution plot.
+    :param n_workers: Worker processes (None = all cores, 1 = in-process).
+    :return: Dict segment -> generated PDF path (None for a failed report).
+    """
+    if key not in data.columns:
+        raise KeyError(f"Segment column '{key}' not found in the data")
+    grouped = data.groupby(key, sort=True, dropna=False)
+    totals = _aggregate(grouped)
+    slugs = {segment: _segment_slug(segment) for segment in grouped.indices}
+    if len(set(slugs.values())) < len(slugs):
+        raise ValueError(f"Segments of '{key}' map to the same report file names: {sorted(map(str, slugs))}")
+
+    # Each job only carries the columns its plots need
+    plotted = data[list(dict.fromkeys(['views', 'likes', 'anomaly', column]))]
+    segments, jobs = [], []
+    for segment, rows in grouped.indices.items():
+        slug = slugs[segment]
+        row = totals.loc[segment]
+        segments.append(segment)
+        jobs.append({
+            'frame': plotted.iloc[rows],
+            'column': column,
+            'total_views': row['views'],
+            'total_likes': row['likes'],
+            'anomaly_count': int(row['anomalies']),
+            'ratio': float(row['ratio']),
+            'metrics_image': os.path.join(plots_dir, slug, 'metrics_scatter.png'),
+            'distribution_image': os.path.join(plots_dir, slug, f'distribution_{column}.png'),
+            'metrics_explanation': metrics_explanation,
+            'distribution_explanation': distribution_explanation,
+            'output_file': os.path.join(output_dir, f'FakeMetrics_Report_{slug}.pdf'),
+            'image_cache_dir': os.path.join(output_dir, '.image_cache'),
+        })
+
+    if n_workers is None or n_workers < 1:
+        n_workers = os.cpu_count()
+    if n_workers == 1 or len(jobs) <= 1:
+        results = [_segment_report_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs)),
+                                 initializer=_init_worker, initargs=worker_logging()[1]) as pool:
+            results = list(pool.map(_segment_report_job, jobs))
+    logger.info("Segment reports generated: %d/%d", sum(r is not None for r in results), len(jobs))
+    return dict(zip(segments, results))
@@ -0,0 +1,165 @@
+# src/spatial_index.py
+
+import numpy as np
+
+# 2-D grid index over (views, likes) for the dashboard selections.
+#
+# The plane is cut into cells by quantiles of each axis, so every cell holds
+# about the same number of rows whatever the skew of the data. Rows are
+# sorted by cell once (CSR layout: `order` lists the rows cell after cell and
+# `offsets[c]:offsets[c + 1]` is the bucket of cell c). Cells are numbered
+# column by column, so the cells of a box within one views column form a
+# single slice of `order`: a box query reads one slice per column it spans and
+# tests only the rows of those cells, instead of every row of the dataset.
+
+
+def _axis_edges(values, cells):
+    # Quantile cell edges of one axis (at least one cell)
+    if len(values) == 0:
+        return np.array([0.0, 1.0])
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, cells + 1)))
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0] + 1.0])
+    return edges
+
+
+def _inside_polygon(px, py, vx, vy):
+    # Even-odd rule (ray casting towards +x) for many points against one polygon
+    inside = np.zeros(len(px), dtype=bool)
+    j = len(vx) - 1
+    for i in range(len(vx)):
+        crosses = (vy[i] > py) != (vy[j] > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = vx[i] + (py - vy[i]) * (vx[j] - vx[i]) / (vy[j] - vy[i])
+        inside ^= crosses & (px < x_cross)
+        j = i
+    return inside
+
+
+class GridIndex:
+    """
+    Bucketed grid over two coordinates answering box and polygon selections.
+
+    :param x: First coordinate of every row (e.g. views).
+    :param y: Second coordinate of every row (e.g. likes).
+    :param cells_per_axis: Grid resolution (default: about bucket_size rows per cell).
+    :param bucket_size: Target number of rows per cell when cells_per_axis is not given.
+    """
+
+    def __init__(self, x, y, cells_per_axis=None, bucket_size=32):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if x.shape != y.shape or x.ndim != 1:
+            raise ValueError("x and y must be 1-D arrays of the same length")
+        if cells_per_axis is None:
+            cells_per_axis = max(1, int(np.ceil(np.sqrt(len(x) / bucket_size))))
+        self.x_edges = _axis_edges(x, cells_per_axis)
+        self.y_edges = _axis_edges(y, cells_per_axis)
+        nx, ny = len(self.x_edges) - 1, len(self.y_edges) - 1
+        self.shape = (nx, ny)
+
+        cells = self._column(x) * ny + self._row(y)
+        self.order = np.argsort(cells, kind='stable')
+        self.offsets = np.zeros(nx * ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=nx * ny), out=self.offsets[1:])
+        # Coordinates in bucket order, so the rows of a cell are contiguous in memory
+        self.xs = x[self.order]
+        self.ys = y[self.order]
+        self._cells = cells[self.order]
+
+    @classmethod
+    def from_frame(cls, data, x='views', y='likes', **kwargs):
+        return cls(data[x].to_numpy(), data[y].to_numpy(), **kwargs)
+
+    def __len__(self):
+        return len(self.order)
+
+    def _column(self, x):
+        return np.clip(np.searchsorted(self.x_edges, x, side='right') - 1, 0, self.shape[0] - 1)
+
+    def _row(self, y):
+        return np.clip(np.searchsorted(self.y_edges, y, side='right') - 1, 0, self.shape[1] - 1)
+
+    def _candidates(self, x_min, x_max, y_min, y_max):
+        # Positions (in bucket order) of the rows of the cells overlapping the box
+        if x_min > x_max or y_min > y_max or not len(self):
+            return np.empty(0, dtype=np.int64)
+        ny = self.shape[1]
+        i0, i1 = self._column(x_min), self._column(x_max)
+        j0, j1 = self._row(y_min), self._row(y_max)
+        slices = [np.arange(self.offsets[i * ny + j0], self.offsets[i * ny + j1 + 1]) for i in range(i0, i1 + 1)]
+        return np.concatenate(slices)
+
+    def query_box(self, x_range, y_range):
+        """
+        Rows with x_range[0] <= x <= x_range[1] and y_range[0] <= y <= y_range[1].
+
+        :return: Sorted array of row positions (use with data.iloc / numpy indexing).
+        """
+        (x_min, x_max), (y_min, y_max) = x_range, y_range
+        positions = self._candidates(x_min, x_max, y_min, y_max)
+        xs, ys = self.xs[positions], self.ys[positions]
+        keep = (xs >= x_min) & (xs <= x_max) & (ys >= y_min) & (ys <= y_max)
+        return np.sort(self.order[positions[keep]])
+
+    def query_polygon(self, vertices):
+        """
+        Rows inside a polygon (e.g. a lasso selection), even-odd rule.
+
+        :param vertices: Sequence of (x, y) vertices; the polygon is closed automatically.
+        :return: Sorted array of row positions.
+        """
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        if len(vertices) < 3:
+            return np.empty(0, dtype=np.int64)
+        vx, vy = vertices[:, 0], vertices[:, 1]
+        positions = self._candidates(vx.min(), vx.max(), vy.min(), vy.max())
+        keep = _inside_polygon(self.xs[positions], self.ys[positions], vx, vy)
+        return np.sort(self.order[positions[keep]])
+
+    def thin(self, max_points):
+        """
+        At most max_points rows spread over the whole grid, for plotting.
+
+        Every cell keeps the same number k of its rows (all of them when it has
+        fewer), with k as large as the budget allows: crowded cells are thinned
+        while the sparse ones, at the edges of the cloud, are kept whole.
+
+        :return: Sorted array of row positions.
+        """
+        if max_points >= len(self):
+            return np.arange(len(self))
+        if max_points < 1:
+            return np.empty(0, dtype=np.int64)
+        counts = np.diff(self.offsets)
+        # Largest k with sum(min(counts, k)) <= max_points (binary search, the sum grows with k)
+        low, high = 0, int(counts.max())
+        while low < high:
+            k = (low + high + 1) // 2
+            if np.minimum(counts, k).sum() <= max_points:
+                low = k
+            else:
+                high = k - 1
+        rank = np.arange(len(self)) - self.offsets[self._cells]
+        rows = np.sort(self.order[rank < max(low, 1)])
+        if len(rows) > max_points:
+            # More non-empty cells than points allowed: one row per cell, evenly subsampled
+            rows = rows[np.linspace(0, len(rows) - 1, max_points).astype(np.int64)]
+        return rows
+
+
+def selection_rows(index, selection):
+    """
+    Rows of a Plotly box / lasso selection, as returned by Streamlit's
+    st.plotly_chart(..., on_select="rerun").selection.
+
+    The selected area is queried on the index, so points that were not sent
+    to the browser (see GridIndex.thin) are selected too.
+
+    :return: Sorted array of row positions, or None when nothing is selected.
+    """
+    rows = [index.query_box(sorted(box['x']), sorted(box['y'])) for box in selection.get('box', [])]
+    rows += [index.query_polygon(list(zip(lasso['x'], lasso['y']))) for lasso in selection.get('lasso', [])]
+    if not rows:
+        return None
+    return np.unique(np.concatenate(rows))
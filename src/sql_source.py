@@ -0,0 +1,230 @@
+# src/sql_source.py
+
+import logging
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Database source of the ingestion layer (SQLite here; any DB-API driver with
+# the '?' paramstyle fits the same code).
+#
+# Rows are streamed with cursor.fetchmany into chunked DataFrames, so a table
+# never has to be materialized as Python tuples all at once. The projection
+# and the filters are part of the SQL statement (values are bound parameters),
+# so the database only returns the rows and columns the analyzer needs.
+# Connections come from a small per-database pool and are reused across calls.
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Filter operators accepted in (operator, value) filters
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'LIKE', 'IN', 'BETWEEN')
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _quote(name):
+    # Identifiers cannot be bound parameters: only plain names are accepted
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _connect_read_only(database):
+    # mode=ro: a missing file is an error instead of a new empty database
+    return sqlite3.connect(f'file:{pathname2url(database)}?mode=ro', uri=True, check_same_thread=False)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of connections to one database.
+
+    :param database: SQLite file path (or any target of connect).
+    :param size: Maximum number of open connections.
+    :param connect: Connection factory, called as connect(database)
+                    (default: read-only SQLite connection, the file must exist).
+    """
+
+    def __init__(self, database, size=4, connect=None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database = database
+        self.size = size
+        self._connect = connect or _connect_read_only
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect(self.database)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        # Every connection is in use: wait for one to come back
+        return self._idle.get(timeout=timeout)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Borrows a connection; it goes back to the pool when the block exits.
+        """
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    @property
+    def opened(self):
+        return self._opened
+
+    def close(self):
+        # Closes the idle connections
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, size=None):
+    # Shared pool of a database, created on first use (size None = the existing size, else 4)
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = _pools[database] = ConnectionPool(database, size=size or 4)
+        elif size is not None and size != pool.size:
+            raise ValueError(f"The pool of {database} already has {pool.size} connections (requested: {size})")
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def build_query(table, columns=None, filters=None, order_by=None):
+    """
+    Builds a parametrized SELECT.
+
+    :param table: Table (or view) name.
+    :param columns: Columns to return (None = all).
+    :param filters: Dict column -> value (equality), list/tuple/set (IN) or (operator, value)
+                    with an operator of OPERATORS; BETWEEN takes a (low, high) value.
+    :param order_by: Column (or list of columns) to sort by.
+    :return: (sql, params)
+    """
+    projection = ', '.join(_quote(c) for c in columns) if columns else '*'
+    sql = f"SELECT {projection} FROM {_quote(table)}"
+    clauses, params = [], []
+    for column, condition in (filters or {}).items():
+        is_operator = isinstance(condition, tuple) and len(condition) == 2 and condition[0] in OPERATORS
+        if isinstance(condition, (list, tuple, set)) and not is_operator:
+            condition = ('IN', condition)
+        elif not is_operator:
+            condition = ('=', condition)
+        op, value = condition
+        if op == 'IN':
+            value = list(value)
+            if not value:
+                clauses.append('0 = 1')  # IN () matches nothing
+                continue
+            clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(value))})")
+            params += value
+        elif op == 'BETWEEN':
+            clauses.append(f"{_quote(column)} BETWEEN ? AND ?")
+            params += list(value)
+        elif value is None and op in ('=', '!='):
+            clauses.append(f"{_quote(column)} IS {'NOT ' if op == '!=' else ''}NULL")
+        else:
+            clauses.append(f"{_quote(column)} {op} ?")
+            params.append(value)
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    if order_by:
+        order_by = [order_by] if isinstance(order_by, str) else order_by
+        sql += ' ORDER BY ' + ', '.join(_quote(c) for c in order_by)
+    return sql, params
+
+
+def read_sql_chunks(database, table, columns=None, filters=None, order_by=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, pool=None):
+    """
+    Streams a table as DataFrames of at most chunk_size rows.
+
+    The connection stays borrowed until the generator is exhausted or closed:
+    a caller that stops early must close it (generator.close(), or
+    contextlib.closing) so the connection goes back to the pool right away
+    rather than when the generator is garbage collected.
+
+    :param database: Database path (a shared pool is used) — ignored when pool is given.
+    :param pool: ConnectionPool to borrow the connection from.
+    :return: Generator of DataFrames (no frame for an empty result).
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    sql, params = build_query(table, columns, filters, order_by)
+    pool = pool or get_pool(database)
+    with pool.connection() as conn:
+        cursor = conn.execute(sql, params)
+        try:
+            names = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=names)
+        finally:
+            # Also runs on close(): the cursor is closed and the connection released
+            cursor.close()
+
+
+def read_sql(database, table, columns=None, filters=None, order_by=None,
+             chunk_size=DEFAULT_CHUNK_SIZE, pool=None):
+    """
+    Reads a table (projection and filters applied in SQL) into one DataFrame.
+
+    :return: DataFrame, or None if the query fails (like data_preparation.load_data).
+    """
+    try:
+        chunks = list(read_sql_chunks(database, table, columns, filters, order_by, chunk_size, pool))
+        if chunks:
+            data = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        else:
+            # Keep the columns of an empty result
+            sql, params = build_query(table, columns, filters)
+            with (pool or get_pool(database)).connection() as conn:
+                cursor = conn.execute(sql + ' LIMIT 0', params)
+                data = pd.DataFrame(columns=[d[0] for d in cursor.description])
+                cursor.close()
+        logger.info("Dataset chargé depuis : %s (%s, %d lignes)", database, table, len(data))
+        return data
+    except (sqlite3.Error, ValueError) as e:
+        logger.error("Erreur lors du chargement des données: %s", e)
+        return None
@@ -0,0 +1,101 @@
+# src/sweep.py
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+
+from src.anomaly_detection import FEATURES
+from src.data_preparation import get_clean_data, normalize_features
+
+# contamination does not change how IsolationForest builds its trees nor how
+# LOF computes its factors: it only sets the decision threshold (a percentile
+# of the raw scores). A sweep therefore fits each distinct model once and
+# derives the flags of every contamination value from the same scores.
+
+
+def raw_scores(model, param, features):
+    """
+    Fits one detector and returns its raw scores (lower = more abnormal).
+
+    :param model: "isolation_forest" (param = n_estimators) or "lof" (param = n_neighbors).
+    """
+    if model == 'isolation_forest':
+        forest = IsolationForest(n_estimators=param, random_state=42).fit(features)
+        return forest.score_samples(features)
+    if model == 'lof':
+        return LocalOutlierFactor(n_neighbors=param).fit(features).negative_outlier_factor_
+    raise ValueError(f"Unknown model '{model}'")
+
+
+def flags_for_contamination(scores, contamination):
+    # Same rule as predict/fit_predict: anomaly when the score is below the contamination percentile
+    return (scores < np.percentile(scores, 100.0 * contamination)).astype(np.int8)
+
+
+def sweep_detectors(data, contaminations, n_estimators=(100,), n_neighbors=(20,), n_workers=None):
+    """
+    Evaluates a grid of detector settings with one fit per distinct model.
+
+    :param data: DataFrame with 'views' and 'likes'.
+    :param contaminations: Contamination values to evaluate for every model.
+    :param n_estimators: IsolationForest sizes to fit (empty to skip IsolationForest).
+    :param n_neighbors: LOF neighborhood sizes to fit (empty to skip LOF).
+    :param n_workers: Processes fitting the models in parallel (None = all cores, 1 = in-process).
+    :return: DataFrame with one row per (model, param, contamination): anomaly_count,
+             anomaly_rate and the 'flags' array (1 = anomaly) of that setting.
+    """
+    features = data[FEATURES].to_numpy()
+    fits = [('isolation_forest', p) for p in n_estimators] + [('lof', p) for p in n_neighbors]
+
+    if n_workers is None or n_workers < 1:
+        n_workers = os.cpu_count()
+    if n_workers == 1 or len(fits) <= 1:
+        all_scores = [raw_scores(model, param, features) for model, param in fits]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(fits))) as pool:
+            all_scores = list(pool.map(raw_scores, *zip(*fits), [features] * len(fits)))
+
+    rows = []
+    for (model, param), scores in zip(fits, all_scores):
+        for contamination in contaminations:
+            flags = flags_for_contamination(scores, contamination)
+            rows.append({
+                'model': model,
+                'param': 'n_estimators' if model == 'isolation_forest' else 'n_neighbors',
+                'value': param,
+                'contamination': contamination,
+                'anomaly_count': int(flags.sum()),
+                'anomaly_rate': float(flags.mean()),
+                'flags': flags,
+            })
+    return pd.DataFrame(rows)
+
+
+def _numbers(cast):
+    return lambda value: [cast(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.sweep',
+                                     description="Sweep contamination / n_estimators / n_neighbors in one pass.")
+    parser.add_argument('--contamination', type=_numbers(float), default=[0.01, 0.02, 0.05, 0.1])
+    parser.add_argument('--n-estimators', type=_numbers(int), default=[100])
+    parser.add_argument('--n-neighbors', type=_numbers(int), default=[20])
+    parser.add_argument('--n-samples', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    data = normalize_features(get_clean_data(n_samples=args.n_samples, save_if_generated=True))
+    results = sweep_detectors(data, args.contamination, n_estimators=args.n_estimators,
+                              n_neighbors=args.n_neighbors, n_workers=args.workers)
+    print(results.drop(columns='flags').to_string(index=False))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,26 @@
 # src/utils.py
 
+import atexit
+import bz2
+import gzip
+import io
 import logging
+import lzma
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
 import pandas as pd
 
+from src.column_stats import summarize_columns
+
+logger = logging.getLogger(__name__)
+
 def setup_logger(name, log_file, level=logging.INFO):
     # Configues the logger to record messages in a file
 
@@ -17,36 +35,269 @@ def setup_logger(name, log_file, level=logging.INFO):
         
     return logger
 
-def save_to_csv(data: pd.DataFrame, file_path: str) -> bool:
+# Non-blocking logging. The diagnostics of the src modules go to module
+# loggers (logging.getLogger(__name__)); setup_queue_logging gives them a
+# QueueHandler, so a log call on the hot path only formats the message and
+# puts it on a queue. A QueueListener thread does the I/O: console lines as
+# print used to show them, and an optional file flushed by batches.
+_queue_listeners = {}
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    FileHandler flushing every `batch_size` records or `flush_interval` seconds
+    instead of after every record (and on close).
+
+    A background thread flushes the pending records once they are
+    `flush_interval` seconds old, so a quiet period does not keep them unwritten.
+    """
+
+    def __init__(self, filename, batch_size=100, flush_interval=1.0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        if flush_interval:
+            threading.Thread(target=self._flush_periodically, name='log-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self.lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self._closed.set()
+        super().close()
+
+class _ConsoleHandler(logging.StreamHandler):
+    # Writes to the current sys.stdout (it may be replaced after the setup, e.g. by a test runner)
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+def setup_queue_logging(name='src', level=logging.INFO, log_file=None, console=True,
+                        batch_size=100, flush_interval=1.0):
+    """
+    Routes the records of logger `name` (default: every src module) through a queue.
+
+    Calling it again for the same logger keeps the running setup.
+
+    :param name: Logger to configure.
+    :param level: Minimum level of the records.
+    :param log_file: Optional file receiving the records, flushed by batches.
+    :param console: Also write the messages to stdout.
+    :param batch_size: Records written to log_file between two flushes.
+    :param flush_interval: Seconds after which pending file records are flushed anyway.
+    :return: The QueueListener (stop_queue_logging stops it and flushes everything).
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if name in _queue_listeners:
+        return _queue_listeners[name]
+
+    handlers = []
+    if console:
+        handler = _ConsoleHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handlers.append(handler)
+    if log_file:
+        handler = BatchedFileHandler(log_file, batch_size=batch_size, flush_interval=flush_interval)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        handlers.append(handler)
+
+    log_queue = multiprocessing.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _queue_listeners[name] = listener
+    return listener
+
+def stop_queue_logging(name=None):
+    # Drain the queue, flush and close the handlers of one (or every) queue logger
+    for logger_name in ([name] if name is not None else list(_queue_listeners)):
+        listener = _queue_listeners.pop(logger_name, None)
+        if listener is None:
+            continue
+        logger = logging.getLogger(logger_name)
+        for handler in [h for h in logger.handlers if isinstance(h, QueueHandler) and h.queue is listener.queue]:
+            logger.removeHandler(handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener.queue.close()
+        listener.queue.join_thread()
+
+atexit.register(stop_queue_logging)
+
+def init_worker_logging(name, log_queue, level):
+    # Pool initializer: the records of the worker go to the queue of the parent's listener
+    if log_queue is None:
+        return
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    # A forked worker inherits the parent's QueueHandler: replace it rather than log twice
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+
+def worker_logging(name='src'):
+    """
+    Initializer and arguments of a process pool whose workers log through the
+    queue logging of the parent (a no-op when setup_queue_logging was not called).
+
+    :return: (initializer, initargs), e.g.
+             ProcessPoolExecutor(initializer=initializer, initargs=initargs).
+    """
+    listener = _queue_listeners.get(name)
+    log_queue = listener.queue if listener is not None else None
+    return init_worker_logging, (name, log_queue, logging.getLogger(name).level)
+
+# Outputs are written to a temporary file of the same directory then renamed
+# over the target (os.replace is atomic): readers such as the dashboard see the
+# old file or the complete new one, never a partial write, and a crashed run
+# leaves no truncated cache behind.
+WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB
+
+COMPRESSIONS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+FILE_FORMATS = ('csv', 'parquet', 'json')
+
+def _replaced_mode(file_path):
+    try:
+        return os.stat(file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+@contextmanager
+def atomic_open(file_path, buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Opens a buffered binary file that replaces `file_path` only once fully written.
+
+    :param file_path: Final path; its directory must exist.
+    :param buffer_size: Size of the write buffer in bytes.
+    :return: Context manager yielding the file object. On error the temporary
+             file is removed and `file_path` is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb', buffering=buffer_size) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file with mode 0600: give it the mode of the file it
+        # replaces, or the one open() would have given a new file
+        os.chmod(tmp, _replaced_mode(file_path))
+        os.replace(tmp, file_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _infer_output(file_path, file_format, compression):
+    # Format / compression from the arguments, else from the extension (e.g. .csv.gz)
+    root, ext = os.path.splitext(file_path.lower())
+    if compression == 'infer':
+        compression = COMPRESSION_SUFFIXES.get(ext)
+    if ext in COMPRESSION_SUFFIXES:
+        root, ext = os.path.splitext(root)
+    if file_format is None:
+        file_format = ext.lstrip('.') if ext.lstrip('.') in FILE_FORMATS else 'csv'
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown format '{file_format}' (expected one of {', '.join(FILE_FORMATS)})")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}' (expected one of {', '.join(COMPRESSIONS)})")
+    if compression is not None and file_format == 'parquet':
+        raise ValueError("Parquet files are compressed internally; use compression=None")
+    return file_format, compression
+
+def write_frame(data, file_path, file_format=None, compression='infer', buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Writes a DataFrame atomically with large buffered writes.
+
+    :param data: DataFrame to write.
+    :param file_path: Output path.
+    :param file_format: 'csv', 'parquet' or 'json' (JSON lines); None = from the extension, default csv.
+    :param compression: 'gzip', 'bz2', 'xz', None, or 'infer' (from a .gz/.bz2/.xz extension).
+    :param buffer_size: Size of the write buffer in bytes.
+    :return: file_path
+    """
+    file_format, compression = _infer_output(file_path, file_format, compression)
+    with atomic_open(file_path, buffer_size=buffer_size) as raw:
+        if file_format == 'parquet':
+            data.to_parquet(raw, index=False)
+            return file_path
+        stream = COMPRESSIONS[compression](raw, 'wb') if compression else raw
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        try:
+            if file_format == 'csv':
+                data.to_csv(text, index=False)
+            else:
+                data.to_json(text, orient='records', lines=True)
+            text.flush()
+        finally:
+            # Keep `raw` open: atomic_open still has to fsync and rename it
+            text.detach()
+        if stream is not raw:
+            stream.close()  # writes the compression trailer, leaves `raw` open
+    return file_path
+
+def save_to_csv(data: pd.DataFrame, file_path: str, compression='infer', file_format=None) -> bool:
     """
     Sauvegarde un DataFrame dans un fichier CSV.
     
+    L'écriture est atomique (fichier temporaire puis renommage, voir write_frame) :
+    un lecteur ne voit jamais de fichier à moitié écrit.
+
     :param data: DataFrame à sauvegarder
     :param file_path: Chemin du fichier de sortie
+    :param compression: 'gzip', 'bz2', 'xz', None ou 'infer' (d'après l'extension)
+    :param file_format: 'csv' (défaut), 'parquet' ou 'json'
     :return: True si la sauvegarde a réussi, False sinon
     """
     try:
-        data.to_csv(file_path, index=False)
+        write_frame(data, file_path, file_format=file_format, compression=compression)
         return True
     except Exception as e:
-        print(f"Erreur lors de la sauvegarde du fichier CSV : {e}")
+        logger.error("Erreur lors de la sauvegarde du fichier CSV : %s", e)
         return False
 
 def get_column_summary(data: pd.DataFrame, column_name: str) -> dict:
     """
     Renvoie un résumé statistique de la colonne spécifiée.
     
+    Calculé par quelques réductions NumPy vectorisées, sans esquisse de quantiles
+    (voir src.column_stats.summarize_columns).
+
     :param data: DataFrame contenant les données
     :param column_name: Le nom de la colonne dont on veut le résumé
     :return: Un dictionnaire avec les statistiques de base (moyenne, écart-type, min, max)
     """
+    stats = summarize_columns(data, [column_name])[column_name]
     summary = {
-        'mean': data[column_name].mean(),
-        'std': data[column_name].std(),
-        'min': data[column_name].min(),
-        'max': data[column_name].max()
+        'mean': stats.mean,
+        'std': stats.std(),
+        'min': stats.min,
+        'max': stats.max
     }
     return summary
-
-
-
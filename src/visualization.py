@@ -4,12 +4,19 @@ import matplotlib.pyplot as plt
 import seaborn as sns 
 import plotly.express as px
 import os 
+import logging
+import numpy as np
 import pandas as pd
 
-def plot_metrics(data, save_path='plots/metrics_scatter.png'):
+from src.column_stats import Histogram
+
+logger = logging.getLogger(__name__)
+
+def plot_metrics(data, save_path='plots/metrics_scatter.png', show=True):
     # Creates a scatter plot comparing 'views' and 'likes', highlighting anomalies
     # A constant name when the path is always the same (in plot_metrics)
     # A dynamic name based on a variable (in plot_distribution)
+    # show=False only saves the figure (headless / batch runs)
 
     # Ensure the directory exists
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
@@ -22,12 +29,14 @@ def plot_metrics(data, save_path='plots/metrics_scatter.png'):
 
     # Save the figure before displaying it
     plt.savefig(save_path)
-    plt.show()
-    print(f"Scratter saved to {save_path}")
+    if show:
+        plt.show()
+    logger.info("Scratter saved to %s", save_path)
     plt.close()
 
-def plot_distribution(data, column, save_path=None):
+def plot_distribution(data, column, save_path=None, show=True):
     # Displays the distribution of a given column with a histogram
+    # show=False only saves the figure (headless / batch runs)
 
     # Defines a saved path by default if it is not provided
     if save_path is None:
@@ -44,8 +53,9 @@ def plot_distribution(data, column, save_path=None):
 
     # Save the figure before displaying it
     plt.savefig(save_path)
-    print(f"Figure saved to {save_path}")
-    plt.show()
+    logger.info("Figure saved to %s", save_path)
+    if show:
+        plt.show()
     plt.close()
 
 def interactive_plot_metrics(data, output_file='plots/metrics_scatter_interactive.html'):
@@ -67,7 +77,7 @@ def interactive_plot_metrics(data, output_file='plots/metrics_scatter_interactiv
     
     # If 'anomaly' is not present, we create a new column 'status' with all values set to 'Normal'
     if 'anomaly' not in df.columns:
-        print("Warning: the 'anomaly' column is not present; all points will be marked 'Normal'.")
+        logger.warning("The 'anomaly' column is not present; all points will be marked 'Normal'.")
         # On crée une colonne status tout à 'Normal'
         df['status'] = 'Normal'
     else:
@@ -85,7 +95,7 @@ def interactive_plot_metrics(data, output_file='plots/metrics_scatter_interactiv
     
     # Save in HTML
     fig.write_html(output_file)
-    print(f"Interactive plot saved as {output_file}")
+    logger.info("Interactive plot saved as %s", output_file)
     return fig
 
 # Create a sample DataFrame
@@ -98,29 +108,65 @@ data = pd.DataFrame({
 # Call the function
 fig = interactive_plot_metrics(data)
 
-def interactive_plot_distribution(data, column, output_file=None):
-    # Create a interactif histogram with Plotly and save it
-        # param data: DataFrame containing the data.
-        # param column: The column for which to generate the histogram.
-        # param output_file: File path for saving the output HTML file.
-        # Defaults to 'plots/distribution_<column>_interactive.html'
-        # return: The Plotly figure.
+def plot_distribution_from_histogram(histogram, column, save_path=None, show=True):
+    # Same figure as plot_distribution, drawn from a precomputed src.column_stats.Histogram
+    # (built chunk by chunk, so the column never has to be loaded in memory)
+
+    if save_path is None:
+        save_path = f'plots/distribution_{column}.png'
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
+    plt.figure(figsize=(8,5))
+    plt.stairs(histogram.counts, histogram.edges, fill=True, alpha=0.6)
+    plt.title(f"Distribution de {column}")
+    plt.xlabel(column)
+    plt.ylabel("Fréquence")
+
+    plt.savefig(save_path)
+    logger.info("Figure saved to %s", save_path)
+    if show:
+        plt.show()
+    plt.close()
 
+def interactive_plot_distribution_from_histogram(histogram, column, output_file=None):
+    """
+    Interactive histogram (Plotly) drawn from a precomputed src.column_stats.Histogram.
+
+    :param histogram: Histogram of the column.
+    :param column: Column name, used for the title and the default file name.
+    :param output_file: File path for the output HTML file.
+    :return: The Plotly figure.
+    """
     if output_file is None:
         output_file = f'plots/distribution_{column}_interactive.html'
-
-    # Ensure the file exists
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-    # Create a interactif histogram 
-    fig = px.histogram(data, x=column, nbins=30,
-                        title=f"Histograme interactif de {column}",
-                        labels={column: column.capitalize()})
-    
+    centers = (histogram.edges[:-1] + histogram.edges[1:]) / 2
+    fig = px.bar(x=centers, y=histogram.counts,
+                 title=f"Histograme interactif de {column}",
+                 labels={'x': column.capitalize(), 'y': 'count'})
+    fig.update_traces(width=histogram.edges[1] - histogram.edges[0])
+
     fig.write_html(output_file)
-    print(f"Interactive distribution plot saved as {output_file}")
+    logger.info("Interactive distribution plot saved as %s", output_file)
     return fig
 
+def interactive_plot_distribution(data, column, output_file=None, nbins=30):
+    # Create a interactif histogram with Plotly and save it
+        # param data: DataFrame containing the data.
+        # param column: The column for which to generate the histogram.
+        # param output_file: File path for saving the output HTML file.
+        # Defaults to 'plots/distribution_<column>_interactive.html'
+        # param nbins: Number of bins of the histogram.
+        # return: The Plotly figure.
+    # The column is binned here (src.column_stats.Histogram): the figure, its HTML file and
+    # the dashboard only carry nbins counts instead of every value of the column
+
+    values = data[column].to_numpy(dtype=float)
+    values = values[~np.isnan(values)]
+    low, high = (values.min(), values.max()) if len(values) else (0.0, 0.0)
+    histogram = Histogram(low, high, bins=nbins).update(values)
+    return interactive_plot_distribution_from_histogram(histogram, column, output_file=output_file)
+
 # Call the function
 fig = interactive_plot_distribution(data, column='views')
-    
\ No newline at end of file
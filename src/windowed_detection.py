@@ -0,0 +1,147 @@
+# src/windowed_detection.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from src.anomaly_detection import FEATURES
+from src.compiled_scorer import CompiledScorer
+
+
+class SlidingWindowDetector:
+    """
+    Incremental IsolationForest for time-ordered (views, likes) feeds.
+
+    The last `window_size` points form a rolling reference window kept in a
+    ring buffer. New points are scored against the current model, then added
+    to the window. The model is refitted on a snapshot of the window in a
+    background thread when either:
+
+    - `max_age` points arrived since the last fit (window age), or
+    - the window mean drifted more than `drift_threshold` reference standard
+      deviations away from the mean of the data the model was fitted on.
+
+    Scoring keeps using the previous model until the new one is swapped in,
+    so updates never wait on training and the cost per point only depends on
+    the window size, not on the length of the feed.
+
+    :param window_size: Number of recent points used to train the model.
+    :param contamination: The expected ratio of anomalies.
+    :param min_samples: Points needed before the first model is trained.
+    :param max_age: Points after which the model is refitted.
+    :param drift_threshold: Mean shift (in reference std units) triggering a refit.
+    :param background: Fit in a background thread (False fits synchronously).
+    :param compiled: Also tabulate each new model (src.compiled_scorer) and score by lookup.
+    """
+
+    def __init__(self, window_size=1000, contamination=0.05, min_samples=100, max_age=500,
+                 drift_threshold=3.0, background=True, compiled=False):
+        if min_samples > window_size:
+            raise ValueError("min_samples cannot be larger than window_size")
+        self.window_size = window_size
+        self.contamination = contamination
+        self.min_samples = min_samples
+        self.max_age = max_age
+        self.drift_threshold = drift_threshold
+        self.background = background
+        self.compiled = compiled
+
+        self._window = np.empty((window_size, len(FEATURES)))
+        self._window_sum = np.zeros(len(FEATURES))
+        self._count = 0
+        self._pos = 0
+        self._since_fit = 0
+        self._model = None
+        self._scorer = None
+        self._reference = None  # (mean, std) of the data the current model was fitted on
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='window-retrain') if background else None
+        self._pending = None
+        self.fits = 0
+
+    @property
+    def model(self):
+        return self._model
+
+    def score(self, points):
+        """
+        Scores points against the current model without updating the window.
+
+        :return: (scores, flags) — NaN scores and 0 flags while no model is trained yet.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, len(FEATURES))
+        model, scorer = self._model, self._scorer  # snapshot: a concurrent retrain only swaps the references
+        if model is None:
+            return np.full(len(points), np.nan), np.zeros(len(points), dtype=np.int8)
+        if scorer is not None:
+            return scorer.score(points)
+        scores = model.score_samples(points)
+        return scores, (scores - model.offset_ < 0).astype(np.int8)
+
+    def update(self, points):
+        # Score new points, append them to the window and trigger a retrain if needed
+        points = np.asarray(points, dtype=float).reshape(-1, len(FEATURES))
+        result = self.score(points)
+        with self._lock:
+            # Vectorized ring-buffer insert; only the last window_size points can survive
+            new = points[-self.window_size:]
+            idx = (self._pos + np.arange(len(new))) % self.window_size
+            overwritten = idx[np.arange(len(new)) >= self.window_size - self._count]
+            self._window_sum -= self._window[overwritten].sum(axis=0)
+            self._window[idx] = new
+            self._window_sum += new.sum(axis=0)
+            self._count = min(self.window_size, self._count + len(new))
+            self._pos = (self._pos + len(new)) % self.window_size
+            self._since_fit += len(points)
+            if self._needs_retrain():
+                self._start_retrain()
+        return result
+
+    def drift(self):
+        # Largest standardized mean shift between the window and the model's training data
+        if self._reference is None or self._count == 0:
+            return 0.0
+        mean, std = self._reference
+        window_mean = self._window_sum / self._count
+        return float(np.max(np.abs(window_mean - mean) / std))
+
+    def _needs_retrain(self):
+        if self._pending is not None and not self._pending.done():
+            return False
+        if self._count < self.min_samples:
+            return False
+        if self._model is None or self._since_fit >= self.max_age:
+            return True
+        return self.drift() > self.drift_threshold
+
+    def _start_retrain(self):
+        # Called with the lock held: snapshot the window so the fit does not see later updates
+        snapshot = self._window[:self._count].copy()
+        self._since_fit = 0
+        if self._executor is None:
+            self._fit(snapshot)
+        else:
+            self._pending = self._executor.submit(self._fit, snapshot)
+
+    def _fit(self, snapshot):
+        model = IsolationForest(contamination=self.contamination, random_state=42)
+        model.fit(snapshot)
+        scorer = CompiledScorer(model) if self.compiled else None
+        std = snapshot.std(axis=0)
+        std[std == 0] = 1.0
+        # Swap model, scorer and reference together
+        with self._lock:
+            self._model, self._scorer, self._reference = model, scorer, (snapshot.mean(axis=0), std)
+            self.fits += 1
+
+    def wait(self):
+        # Block until a pending background retrain is done
+        pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
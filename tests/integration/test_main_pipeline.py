@@ -28,6 +28,7 @@ def test_main_generates_all_outputs(tmp_path, monkeypatch):
     assert (tmp_path / 'plots' / 'metrics_scatter_interactive.html').exists()
     assert (tmp_path / 'plots' / 'distribution_views_interactive.html').exists()
     assert (tmp_path / 'FakeMetrics_Report.pdf').exists()
+    assert (tmp_path / 'pipeline.log').exists()
 
 @pytest.mark.integration
 def test_main_entry_point_runs_main(tmp_path, monkeypatch):
@@ -44,11 +45,202 @@ def test_main_entry_point_runs_main(tmp_path, monkeypatch):
     import src.generate_report as gr
     monkeypatch.setattr(gr.FPDF, 'image', lambda self, name, **kwargs: None)
 
-    # 3) Vide le module pour forcer la ré-exécution
+    # 3) Vide le module pour forcer la ré-exécution (sans les arguments de pytest)
     sys.modules.pop('main', None)
+    monkeypatch.setattr(sys, 'argv', ['main.py'])
 
     # 4) Lance main.py comme un script
     runpy.run_module('main', run_name="__main__", alter_sys=True)
 
     # 5) Vérifie que le rapport a bien été généré
-    assert (tmp_path / 'FakeMetrics_Report.pdf').exists()
\ No newline at end of file
+    assert (tmp_path / 'FakeMetrics_Report.pdf').exists()
+
+@pytest.mark.integration
+def test_main_headless_selected_stages_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    # A headless run must never try to display a figure
+    import matplotlib.pyplot as plt
+    def fail_show(*args, **kwargs):
+        raise AssertionError("plt.show() called in headless mode")
+    monkeypatch.setattr(plt, 'show', fail_show)
+
+    metrics = main_module.main([
+        '--headless', '--stages', 'detect,plots',
+        '--raw-path', 'in/raw.csv', '--clean-path', 'in/clean.csv',
+        '--n-samples', '200', '--contamination', '0.1', '--n-neighbors', '10',
+        '--workers', '2', '--plots-dir', 'out', '--metrics-json', 'metrics.json',
+        '--rules', '--max-ratio', '0.95',
+    ])
+
+    assert [r['stage'] for r in metrics.records] == ['data_preparation', 'detection', 'plotting']
+    assert metrics.records[0]['rows'] == 200
+    assert (tmp_path / 'out' / 'metrics_scatter.png').exists()
+    assert (tmp_path / 'out' / 'distribution_views.png').exists()
+    # Stages not requested produce nothing
+    assert not (tmp_path / 'out' / 'metrics_scatter_interactive.html').exists()
+    assert not (tmp_path / 'FakeMetrics_Report.pdf').exists()
+    assert (tmp_path / 'metrics.json').exists()
+
+
+@pytest.mark.integration
+def test_main_segment_reports(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from src.data_preparation import simulate_data
+    (tmp_path / 'in').mkdir()
+    simulate_data(300, n_accounts=3).to_csv(tmp_path / 'in' / 'raw.csv', index=False)
+
+    main_module.main([
+        '--headless', '--stages', 'detect,plots,report',
+        '--raw-path', 'in/raw.csv', '--clean-path', 'in/clean.csv',
+        '--segment-by', 'account', '--segment-dir', 'segments', '--workers', '2', '--dedup',
+    ])
+
+    assert (tmp_path / 'FakeMetrics_Report.pdf').exists()
+    for account in ('account_0', 'account_1', 'account_2'):
+        assert (tmp_path / 'segments' / f'FakeMetrics_Report_{account}.pdf').exists()
+        assert (tmp_path / 'plots' / 'segments' / account / 'metrics_scatter.png').exists()
+
+
+@pytest.mark.parametrize('argv', [
+    ['--stages', 'report'],          # report needs detect
+    ['--stages', 'detect,report'],   # ... and the plots it embeds
+    ['--workers', '0'],
+    ['--stages', 'detect,unknown'],
+    ['--contamination', '0.9'],
+])
+def test_parse_args_rejects_invalid_runs(argv):
+    with pytest.raises(SystemExit):
+        main_module.parse_args(argv)
+
+
+def test_parse_args_defaults_run_everything():
+    args = main_module.parse_args([])
+    assert args.stages == list(main_module.STAGES)
+    assert not args.headless
+    assert main_module.parse_args(['--stages', 'all']).stages == list(main_module.STAGES)
+    # One default for every parallel stage
+    assert args.workers == 1
+
+
+@pytest.mark.integration
+def test_main_reads_a_sql_source(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import sqlite3
+    from src.data_preparation import simulate_data
+    with sqlite3.connect(tmp_path / 'metrics.db') as conn:
+        simulate_data(150, n_accounts=2).to_sql('daily', conn, index=False)
+
+    metrics = main_module.main(['--headless', '--stages', 'detect', '--source-db', 'metrics.db',
+                                '--source-table', 'daily', '--clean-path', 'unused.csv'])
+
+    assert metrics.records[0]['rows'] == 150
+    assert not (tmp_path / 'unused.csv').exists()
+
+
+@pytest.mark.integration
+def test_main_appends_to_the_results_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from src.results_store import ResultsStore
+    argv = ['--headless', '--stages', 'detect', '--raw-path', 'in/raw.csv', '--clean-path', 'in/clean.csv',
+            '--n-samples', '120', '--results-store', 'results']
+    main_module.main(argv + ['--run-id', 'first'])
+    metrics = main_module.main(argv + ['--run-id', 'second'])
+
+    assert [r['stage'] for r in metrics.records] == ['data_preparation', 'detection', 'store']
+    stored = ResultsStore('results').query()
+    assert sorted(set(stored['run_id'])) == ['first', 'second']
+    assert len(stored) == 240 and stored['lof_score'].notna().all()
+    # Raw counts (as in the chunked runs), and only the partition columns added by query()
+    import pandas as pd
+    raw = pd.read_csv('in/clean.csv')
+    assert stored['views'].tolist() == raw['views'].tolist() * 2
+    assert 'run' not in stored.columns and list(stored.columns).count('date') == 1
+
+
+@pytest.mark.integration
+def test_main_grouped_detection_with_rules_and_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from src.data_preparation import simulate_data
+    from src.results_store import ResultsStore
+    (tmp_path / 'in').mkdir()
+    simulate_data(300, n_accounts=3).to_csv(tmp_path / 'in' / 'raw.csv', index=False)
+    main_module.main(['--headless', '--stages', 'detect', '--raw-path', 'in/raw.csv', '--clean-path', 'in/clean.csv',
+                      '--group-by', 'account', '--min-group-size', '20', '--rules',
+                      '--results-store', 'results', '--run-id', 'grouped'])
+    stored = ResultsStore('results').query(run_id='grouped')
+    assert len(stored) == 300
+    # Rule violations are flagged without a model score
+    violations = stored['rule_violation'] != 0
+    assert (stored.loc[violations, 'anomaly'] == 1).all()
+    assert (stored['anomaly_score'].isna() == violations).all()
+
+
+def test_parse_args_results_store_needs_detector_scores():
+    with pytest.raises(SystemExit):
+        main_module.parse_args(['--results-store', 'results', '--train-sample-size', '100'])
+    assert main_module.parse_args(['--results-store', 'results', '--group-by', 'account']).group_by == 'account'
+
+
+def test_parse_args_sampled_training_options():
+    args = main_module.parse_args(['--train-sample-size', '100', '--max-samples', '0.5', '--report-agreement'])
+    assert args.max_samples == 0.5 and args.report_agreement
+    assert main_module.parse_args(['--train-sample-size', '100', '--max-samples', '64']).max_samples == 64
+    for argv in (['--train-sample-size', '100', '--dedup'], ['--report-agreement'], ['--max-samples', '64'],
+                 ['--train-sample-size', '100', '--max-samples', '1.5']):
+        with pytest.raises(SystemExit):
+            main_module.parse_args(argv)
+
+
+@pytest.mark.integration
+def test_main_sampled_training_honors_rules(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    metrics = main_module.main(['--headless', '--stages', 'detect', '--raw-path', 'in/raw.csv',
+                                '--n-samples', '500', '--train-sample-size', '200', '--rules', '--float32',
+                                '--max-samples', '128', '--report-agreement'])
+    report = metrics.records[1]['sampling_agreement']
+    assert report['rows'] == 500 - 25  # the 25 simulated likes > views rows are rule violations
+    assert 0.9 < report['agreement'] <= 1
+    assert "Sampling agreement with full training" in capsys.readouterr().out
+
+
+@pytest.mark.integration
+def test_main_chunked_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from src.results_store import ResultsStore
+    metrics = main_module.main(['--headless', '--stages', 'detect', '--raw-path', 'in/raw.csv',
+                                '--n-samples', '500', '--chunk-size', '100', '--rules',
+                                '--results-store', 'results', '--run-id', 'chunked'])
+
+    record = metrics.records[0]
+    assert record['stage'] == 'pipelined_detection' and record['rows'] == 500
+    assert record['pipeline']['score']['items'] == 5
+    stored = ResultsStore('results').query(run_id='chunked')
+    assert len(stored) == 500
+    assert (stored.loc[stored['rule_violation'] != 0, 'anomaly'] == 1).all()
+
+    # A model fitted on a sample of the whole input flags about the contamination ratio
+    main_module.main(['--headless', '--stages', 'detect', '--raw-path', 'in/raw.csv', '--chunk-size', '20',
+                      '--train-sample-size', '200', '--results-store', 'results', '--run-id', 'sampled'])
+    sampled = ResultsStore('results').query(run_id='sampled')
+    assert len(sampled) == 500 and sampled['anomaly'].mean() < 0.1
+
+
+def test_parse_args_chunked_run_needs_a_store():
+    with pytest.raises(SystemExit):
+        main_module.parse_args(['--chunk-size', '100'])
+    with pytest.raises(SystemExit):
+        main_module.parse_args(['--chunk-size', '100', '--stages', 'detect,plots', '--results-store', 'r'])
+
+
+def test_parse_args_profile_names(monkeypatch):
+    monkeypatch.delenv('FAKE_METRICS_PROFILE', raising=False)
+    assert main_module.parse_args(['--profile', 'detect,report']).profile == ['detection', 'report']
+    assert main_module.parse_args(['--profile', 'all']).profile == ['all']
+    with pytest.raises(SystemExit):
+        main_module.parse_args(['--profile', 'detections'])
+    monkeypatch.setenv('FAKE_METRICS_PROFILE', 'plots')
+    assert main_module.parse_args([]).profile == ['plotting']
+    monkeypatch.setenv('FAKE_METRICS_PROFILE', 'nope')
+    with pytest.raises(SystemExit):
+        main_module.parse_args([])
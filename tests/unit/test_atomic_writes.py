@@ -0,0 +1,90 @@
+# tests/unit/test_atomic_writes.py
+
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+from src.utils import atomic_open, save_to_csv, write_frame
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'views': [100, 250, 3], 'likes': [10, 20, 1]})
+
+
+@pytest.mark.parametrize('name, reader', [
+    ('out.csv', pd.read_csv),
+    ('out.csv.gz', pd.read_csv),
+    ('out.csv.bz2', pd.read_csv),
+    ('out.csv.xz', pd.read_csv),
+    ('out.parquet', pd.read_parquet),
+    ('out.json', lambda path: pd.read_json(path, lines=True)),
+    ('out.json.gz', lambda path: pd.read_json(path, lines=True)),
+])
+def test_write_frame_formats_round_trip(tmp_path, frame, name, reader):
+    path = str(tmp_path / name)
+    assert write_frame(frame, path) == path
+    pd.testing.assert_frame_equal(reader(path), frame)
+    # Only the final file is left in the directory
+    assert os.listdir(tmp_path) == [name]
+
+
+def test_explicit_format_and_compression(tmp_path, frame):
+    path = str(tmp_path / 'export.dat')
+    write_frame(frame, path, file_format='csv', compression='gzip')
+    with open(path, 'rb') as f:
+        assert f.read(2) == b'\x1f\x8b'
+    pd.testing.assert_frame_equal(pd.read_csv(path, compression='gzip'), frame)
+
+    with pytest.raises(ValueError):
+        write_frame(frame, str(tmp_path / 'x.csv'), compression='zip')
+    with pytest.raises(ValueError):
+        write_frame(frame, str(tmp_path / 'x.parquet'), compression='gzip')
+    with pytest.raises(ValueError):
+        write_frame(frame, str(tmp_path / 'x.csv'), file_format='xlsx')
+
+
+def test_failed_write_keeps_previous_file(tmp_path, frame):
+    path = tmp_path / 'cache.csv'
+    path.write_text('views,likes\n1,2\n')
+
+    class BrokenDF(pd.DataFrame):
+        def to_csv(self, handle, *args, **kwargs):
+            handle.write('views,likes\n')  # partial output, then a crash
+            raise IOError("disk full")
+
+    assert save_to_csv(BrokenDF(frame), str(path)) is False
+    assert path.read_text() == 'views,likes\n1,2\n'
+    assert os.listdir(tmp_path) == ['cache.csv']
+
+
+def test_atomic_open_replaces_only_on_success(tmp_path):
+    path = tmp_path / 'blob.bin'
+    with atomic_open(str(path)) as f:
+        f.write(b'abc')
+        assert not path.exists()
+    assert path.read_bytes() == b'abc'
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(str(path)) as f:
+            f.write(b'partial')
+            raise RuntimeError("crash")
+    assert path.read_bytes() == b'abc'
+
+
+def test_atomic_open_keeps_regular_file_permissions(tmp_path):
+    path = tmp_path / 'report.csv'
+    umask = os.umask(0o022)
+    try:
+        with atomic_open(str(path)) as f:
+            f.write(b'a')
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+        os.chmod(path, 0o640)
+        with atomic_open(str(path)) as f:
+            f.write(b'b')
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    finally:
+        os.umask(umask)
@@ -0,0 +1,76 @@
+# tests/unit/test_column_stats.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.column_stats import (ColumnStats, QuantileSketch, describe_columns, merge_summaries,
+                              summarize_columns)
+from src.data_preparation import simulate_data
+
+
+def test_describe_columns_matches_pandas_on_small_data():
+    data = simulate_data(300)
+    data.loc[3, 'likes'] = np.nan
+    expected = data.describe()
+    table = describe_columns(data)
+    assert list(table.index) == list(expected.index)
+    pd.testing.assert_frame_equal(table.astype(float), expected, check_exact=False, rtol=1e-12)
+
+
+def test_chunked_summaries_merge_to_the_full_result():
+    data = pd.DataFrame({'views': np.arange(1000.0), 'likes': np.arange(1000.0) ** 0.5})
+    chunks = [summarize_columns(data.iloc[i:i + 137], quantiles=True) for i in range(0, 1000, 137)]
+    merged = merge_summaries(*chunks)
+    full = summarize_columns(data, quantiles=True)
+    for column in ('views', 'likes'):
+        assert merged[column].count == 1000
+        assert merged[column].sum == pytest.approx(full[column].sum)
+        assert merged[column].std() == pytest.approx(data[column].std(), rel=1e-12)
+        assert merged[column].min == data[column].min()
+        assert merged[column].max == data[column].max()
+
+
+def test_quantile_sketch_is_accurate_and_bounded():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=200_000)
+    sketch = QuantileSketch(k=256)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    assert len(sketch) == len(values)
+    assert sum(len(level) for level in sketch.levels) < 2000
+    for q in (0.1, 0.5, 0.9, 0.99):
+        # rank error of the estimate
+        rank = np.mean(values <= sketch.quantile(q))
+        assert abs(rank - q) < 0.02
+
+
+def test_sketch_merge_and_empty_cases():
+    a = QuantileSketch(k=64).update(np.arange(500))
+    b = QuantileSketch(k=64).update(np.arange(500, 1000))
+    assert abs(a.merge(b).quantile(0.5) - 500) < 50
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    assert np.isnan(QuantileSketch().quantile([0.5])).all()
+
+
+def test_column_stats_update_ignores_nan():
+    stats = ColumnStats().update([1.0, np.nan, 3.0]).update([5.0])
+    assert stats.count == 3
+    assert stats.mean == 3.0
+    assert stats.variance() == pytest.approx(4.0)
+    assert np.isnan(ColumnStats().variance())
+
+
+def test_quantile_sketch_is_opt_in():
+    data = pd.DataFrame({'views': np.arange(100.0)})
+    summary = summarize_columns(data)
+    assert summary['views'].sketch is None
+    assert summary['views'].sum == data['views'].sum()
+    with pytest.raises(ValueError):
+        summary['views'].quantile(0.5)
+    assert '50%' not in describe_columns(summary).index
+
+    # Merging with a chunk without sketch drops the quantiles instead of giving wrong ones
+    merged = merge_summaries(summarize_columns(data, quantiles=True), summary)
+    assert merged['views'].count == 200 and merged['views'].sketch is None
+    assert summarize_columns(data, quantiles=True)['views'].quantile(0.5) == pytest.approx(49.5, abs=1)
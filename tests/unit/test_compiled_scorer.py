@@ -0,0 +1,98 @@
+# tests/unit/test_compiled_scorer.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.anomaly_detection import FEATURES, train_isolation_forest
+from src.compiled_scorer import CompiledScorer
+from src.data_preparation import simulate_data
+from src.scoring_service import ScoringService, request, score_batch
+
+
+@pytest.fixture(scope='module')
+def model_and_points():
+    model = train_isolation_forest(simulate_data(2000), contamination=0.05)
+    return model, simulate_data(5000)[FEATURES].to_numpy(dtype=float)
+
+
+def test_compiled_scores_agree_with_the_model(model_and_points):
+    model, X = model_and_points
+    scorer = CompiledScorer(model, grid_size=128)
+    scores, flags = scorer.score(X)
+    exact_scores, exact_flags = score_batch(model, X)
+
+    assert flags.dtype == np.int8
+    # Table flags only come from cells whose whole score range is on one side of the threshold
+    np.testing.assert_array_equal(flags, exact_flags)
+    assert np.abs(scores - exact_scores).max() < 0.05
+    # Most rows are answered from the table
+    assert scorer.rows == len(X)
+    assert scorer.exact_rows < len(X) / 4
+    assert 0 < scorer.uncertain_fraction < 0.5
+
+
+def test_flags_are_exact_anywhere_in_the_grid(model_and_points):
+    model, _ = model_and_points
+    scorer = CompiledScorer(model, grid_size=32)
+    (ex, ey), rng = scorer.edges, np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(ex[0], ex[-1], 50_000), rng.uniform(ey[0], ey[-1], 50_000)])
+    # Grid lines too, where a point belongs to two cells
+    X = np.vstack([X, np.array(np.meshgrid(ex, ey)).reshape(2, -1).T])
+    np.testing.assert_array_equal(scorer.score(X)[1], score_batch(model, X)[1])
+
+
+def test_points_outside_the_grid_are_scored_exactly(model_and_points):
+    model, _ = model_and_points
+    scorer = CompiledScorer(model, grid_size=32)
+    far = np.array([[scorer.edges[0][-1] * 10, 1.0], [-5.0, -5.0]])
+    scores, flags = scorer.score(far)
+    np.testing.assert_allclose(scores, model.score_samples(far))
+    np.testing.assert_array_equal(flags, (model.predict(far) == -1).astype(np.int8))
+    assert scorer.exact_rows == 2
+
+
+def test_small_fallback_batches_do_not_call_sklearn(model_and_points, monkeypatch):
+    model, X = model_and_points
+    scorer = CompiledScorer(model, grid_size=32)
+    expected = score_batch(model, X[:64])
+    # The few exact rows of a streaming batch are scored on the FlatForest arrays
+    monkeypatch.setattr(scorer.flat, 'model', None)
+    scores, flags = scorer.score(X[:64])
+    np.testing.assert_array_equal(flags, expected[1])
+    assert scorer.exact_rows > 0
+
+
+def test_row_counters_are_thread_safe(model_and_points):
+    from concurrent.futures import ThreadPoolExecutor
+    model, X = model_and_points
+    scorer = CompiledScorer(model, grid_size=32)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(scorer.score, [X[i:i + 8] for i in range(0, 4000, 8)]))
+    assert scorer.rows == 4000
+
+
+def test_rejects_models_on_other_features():
+    from sklearn.ensemble import IsolationForest
+    model = IsolationForest(random_state=0).fit(np.random.default_rng(0).normal(size=(50, 3)))
+    with pytest.raises(ValueError):
+        CompiledScorer(model)
+
+
+def test_service_with_compiled_scorer(model_and_points):
+    model, X = model_and_points
+
+    async def scenario():
+        service = ScoringService(model, compiled=True)
+        await service.start(port=0)
+        try:
+            events = [{'views': float(v), 'likes': float(l)} for v, l in X[:20]]
+            return await request('POST', '/score', {'events': events}, port=service.port), service.scorer
+        finally:
+            await service.stop()
+
+    (status, body), scorer = asyncio.run(scenario())
+    assert status == 200
+    assert len(body['anomaly']) == 20
+    assert scorer.rows == 20
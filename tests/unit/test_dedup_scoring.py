@@ -0,0 +1,83 @@
+# tests/unit/test_dedup_scoring.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.neighbors import LocalOutlierFactor
+
+from src.anomaly_detection import (_lof_dedup, _unique_rows, _weighted_percentile,
+                                   detect_anomalies, detect_anomalies_lof)
+
+
+@pytest.fixture
+def repeated_counts():
+    # Integer counts with many repeated (views, likes) pairs
+    rng = np.random.default_rng(0)
+    views = rng.integers(0, 60, 3000)
+    likes = (views * rng.uniform(0, 0.5, 3000)).astype(int)
+    return pd.DataFrame({'views': views, 'likes': likes})
+
+
+def test_unique_rows_round_trip(repeated_counts):
+    X = repeated_counts.to_numpy()
+    unique, inverse, counts = _unique_rows(X)
+    assert len(unique) < len(X) / 2
+    np.testing.assert_array_equal(unique[inverse], X)
+    assert counts.sum() == len(X)
+
+
+@pytest.mark.parametrize('q', [0.0, 1.0, 5.0, 37.5, 100.0])
+def test_weighted_percentile_matches_expanded(q):
+    rng = np.random.default_rng(1)
+    values, counts = rng.normal(size=40), rng.integers(1, 8, 40)
+    assert _weighted_percentile(values, counts, q) == pytest.approx(np.percentile(np.repeat(values, counts), q))
+
+
+def test_isolation_forest_dedup_gives_the_same_flags(repeated_counts):
+    expected = detect_anomalies(repeated_counts.copy(), contamination=0.05)['anomaly']
+    result = detect_anomalies(repeated_counts.copy(), contamination=0.05, dedup=True)['anomaly']
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_lof_dedup_matches_sklearn_on_duplicated_points():
+    # Duplicated points without distance ties: weighted neighborhoods give LOF's exact factors
+    rng = np.random.default_rng(2)
+    X = np.repeat(rng.normal(size=(200, 2)), rng.integers(1, 5, 200), axis=0)
+    lof = LocalOutlierFactor(n_neighbors=15, contamination=0.05)
+    expected = lof.fit_predict(X) == -1
+
+    flags, factors = _lof_dedup(X, n_neighbors=15, contamination=0.05)
+    np.testing.assert_allclose(factors, lof.negative_outlier_factor_)
+    np.testing.assert_array_equal(flags, expected)
+
+    data = pd.DataFrame(X, columns=['views', 'likes'])
+    result = detect_anomalies_lof(data, n_neighbors=15, contamination=0.05, dedup=True)
+    np.testing.assert_array_equal(result['anomaly_lof'].to_numpy(), expected.astype(int))
+
+
+def test_lof_dedup_with_fewer_rows_than_neighbors():
+    X = np.array([[0.0, 0.0], [0.0, 0.0], [1.0, 1.0], [5.0, 5.0]])
+    lof = LocalOutlierFactor(n_neighbors=2, contamination=0.25).fit(X)
+    _, factors = _lof_dedup(X, n_neighbors=2, contamination=0.25)
+    np.testing.assert_allclose(factors, lof.negative_outlier_factor_, rtol=1e-6)
+
+
+def test_lof_dedup_differs_from_sklearn_on_tied_counts(repeated_counts):
+    # Integer counts: ties at the k-th neighbor distance make LOF ill-defined, so
+    # dedup is a different (deterministic) choice of neighbors, not sklearn's result
+    X = repeated_counts.to_numpy(dtype=np.float64)
+    lof = LocalOutlierFactor(n_neighbors=20, contamination=0.05)
+    with pytest.warns(UserWarning, match='Duplicate values'):
+        expected = lof.fit_predict(X) == -1
+
+    flags, factors = _lof_dedup(X, n_neighbors=20, contamination=0.05)
+    assert (flags != expected).sum() > len(X) * 0.02
+    # Copies of a pair share their factor, and the threshold still follows the contamination
+    _, inverse, _ = _unique_rows(X)
+    assert (pd.Series(factors).groupby(inverse).nunique() == 1).all()
+    assert abs(flags.mean() - 0.05) < 0.01
+
+    # The plain path (what --dedup keeps for LOF) is sklearn's
+    with pytest.warns(UserWarning, match='Duplicate values'):
+        plain = detect_anomalies_lof(repeated_counts.copy(), n_neighbors=20, contamination=0.05)
+    np.testing.assert_array_equal(plain['anomaly_lof'].to_numpy(), expected.astype(int))
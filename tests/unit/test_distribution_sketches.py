@@ -0,0 +1,68 @@
+# tests/unit/test_distribution_sketches.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.column_stats import (Histogram, describe_columns, load_summary, save_summary,
+                              summarize_columns, summarize_csv)
+from src.data_preparation import simulate_data
+from src.visualization import (plot_distribution_from_histogram,
+                               interactive_plot_distribution_from_histogram)
+
+
+def test_histogram_matches_numpy_and_merges():
+    values = np.random.default_rng(0).normal(size=5000)
+    full = Histogram(values.min(), values.max(), bins=20).update(values)
+    expected, _ = np.histogram(values, bins=20, range=(values.min(), values.max()))
+    assert np.abs(full.counts - expected).sum() <= 2  # float rounding at bin edges only
+    assert full.counts.sum() == 5000
+
+    left = Histogram(values.min(), values.max(), bins=20).update(values[:2000])
+    right = Histogram(values.min(), values.max(), bins=20).update(values[2000:])
+    np.testing.assert_array_equal(left.merge(right).counts, full.counts)
+
+    clipped = Histogram(0, 1, bins=4).update([-1, 0, 0.5, 1, 2, np.nan])
+    assert (clipped.underflow, clipped.overflow, clipped.counts.sum()) == (1, 1, 3)
+    with pytest.raises(ValueError):
+        full.merge(Histogram(0, 1, bins=20))
+
+
+def test_summarize_csv_chunks_and_persist(tmp_path):
+    data = simulate_data(3000)
+    csv = tmp_path / 'raw.csv'
+    data.to_csv(csv, index=False)
+
+    summary, histograms = summarize_csv(str(csv), ['views', 'likes'], chunksize=400, bins=25)
+    assert summary['views'].count == 3000
+    assert summary['views'].sum == data['views'].sum()
+    assert histograms['likes'].counts.sum() == 3000
+
+    path = save_summary(str(tmp_path / 'summary.json'), summary, histograms)
+    loaded, loaded_histograms = load_summary(path)
+    pd.testing.assert_frame_equal(describe_columns(loaded), describe_columns(summary))
+    np.testing.assert_array_equal(loaded_histograms['views'].counts, histograms['views'].counts)
+
+    # Quantiles from the merged sketches stay close to the exact ones
+    table = describe_columns(loaded)
+    assert abs(table.loc['50%', 'views'] - data['views'].median()) < 0.02 * data['views'].max()
+
+
+def test_empty_column_state_round_trip(tmp_path):
+    summary = summarize_columns(pd.DataFrame({'views': [np.nan]}))
+    loaded, histograms = load_summary(save_summary(str(tmp_path / 's.json'), summary))
+    assert loaded['views'].count == 0 and histograms == {}
+    assert Histogram(3, 3).edges[-1] == 4
+
+
+def test_plots_from_histogram(tmp_path, monkeypatch):
+    import matplotlib.pyplot as plt
+    monkeypatch.setattr(plt, 'show', lambda: None)
+    monkeypatch.chdir(tmp_path)
+    histogram = Histogram(0, 10, bins=5).update(np.arange(11))
+
+    plot_distribution_from_histogram(histogram, 'views')
+    assert (tmp_path / 'plots' / 'distribution_views.png').exists()
+    fig = interactive_plot_distribution_from_histogram(histogram, 'views')
+    assert (tmp_path / 'plots' / 'distribution_views_interactive.html').exists()
+    assert list(fig.data[0].y) == histogram.counts.tolist()
@@ -9,7 +9,8 @@ import pytest
 # 1) Tests for src/data_preparation.py
 from src.data_preparation import get_data, get_clean_data
 
-def test_get_data_save_exception(tmp_path, monkeypatch, capsys):
+def test_get_data_save_exception(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
     # Simulate a DataFrame whose to_csv raises an IOError
     fake = tmp_path / 'fake.csv'
     class BrokenDF(pd.DataFrame):
@@ -23,13 +24,14 @@ def test_get_data_save_exception(tmp_path, monkeypatch, capsys):
     monkeypatch.setattr('src.data_preparation.simulate_data', fake_simulate_data)
 
     df = get_data(str(fake), n_samples=1, save_if_generated=True)
-    captured = capsys.readouterr()
+    captured = caplog.text
     # Ensure the save error is printed and we still get a DataFrame back
-    assert "Erreur lors de la sauvegarde du dataset" in captured.out
+    assert "Erreur lors de la sauvegarde du dataset" in captured
     assert isinstance(df, pd.DataFrame)
     assert not fake.exists()
 
-def test_get_clean_data_save_exception(tmp_path, monkeypatch, capsys):
+def test_get_clean_data_save_exception(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
     # Prepare an existing raw file
     raw = tmp_path / 'raw.csv'
     pd.DataFrame({'views': [1], 'likes': [2]}).to_csv(raw, index=False)
@@ -47,9 +49,9 @@ def test_get_clean_data_save_exception(tmp_path, monkeypatch, capsys):
                         clean_filepath=str(out_clean),
                         n_samples=1,
                         save_if_generated=True)
-    captured = capsys.readouterr()
+    captured = caplog.text
     # Ensure the clean-save error is printed and we still get a DataFrame back
-    assert "Erreur lors de la sauvegarde du dataset nettoyé" in captured.out
+    assert "Erreur lors de la sauvegarde du dataset nettoyé" in captured
     assert isinstance(df, pd.DataFrame)
     assert not out_clean.exists()
 
@@ -93,7 +95,8 @@ def test_setup_logger_success(tmp_path):
 from src.visualization import plot_distribution, interactive_plot_distribution
 import matplotlib.pyplot as plt
 
-def test_plot_distribution_default(tmp_path, monkeypatch, capsys):
+def test_plot_distribution_default(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
     # Change working directory to isolate output
     monkeypatch.chdir(tmp_path)
     # Disable interactive display
@@ -105,7 +108,7 @@ def test_plot_distribution_default(tmp_path, monkeypatch, capsys):
     output_file = tmp_path / 'plots' / 'distribution_views.png'
     # Verify that the file was created and message was printed
     assert output_file.exists()
-    assert "Figure saved to" in capsys.readouterr().out
+    assert "Figure saved to" in caplog.text
 
 def test_interactive_plot_distribution_default(tmp_path):
     # Change working directory to isolate output
@@ -122,11 +125,18 @@ def test_interactive_plot_distribution_default(tmp_path):
 
     monkeypatch.undo()
 
+def test_interactive_plot_distribution_bins(tmp_path):
+    df = pd.DataFrame({'views': range(100)})
+    fig = interactive_plot_distribution(df, column='views', output_file=str(tmp_path / 'h.html'), nbins=12)
+    # Binned before plotting: the figure only holds the 12 counts
+    assert len(fig.data[0].y) == 12 and sum(fig.data[0].y) == 100
+
 
 # 4) Tests for src/generate_report.py (PDF generation and header/footer)
 from src.generate_report import generate_report, PDF
 
-def test_pdf_header_footer_and_generate_report_with_images(tmp_path, capsys, monkeypatch):
+def test_pdf_header_footer_and_generate_report_with_images(tmp_path, caplog, monkeypatch):
+    caplog.set_level(logging.INFO)
     pdf = PDF()
     pdf.add_page()
     pdf.header()
@@ -153,9 +163,9 @@ def test_pdf_header_footer_and_generate_report_with_images(tmp_path, capsys, mon
     )
     # …
 
-    captured = capsys.readouterr()
+    captured = caplog.text
     # Verify PDF was generated successfully
-    assert "Report generated" in captured.out
+    assert "Report generated" in captured
     assert out_pdf.exists()
     assert result == str(out_pdf)
 
@@ -189,7 +199,8 @@ def test_internal_module_test_handle_missing_data():
 import src.generate_report as gr
 import pytest
 
-def test_generate_report_with_existing_images(tmp_path, capsys):
+def test_generate_report_with_existing_images(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
     # Create two minimal valid 1×1 PNG files
     png_bytes = (
         b'\x89PNG\r\n\x1a\n'
@@ -221,7 +232,7 @@ def test_generate_report_with_existing_images(tmp_path, capsys):
         distribution_explanation="dist_explain",
         output_file=str(out_pdf)
     )
-    out = capsys.readouterr().out
+    out = caplog.text
 
     # Check that the image‐exists path was taken and the report generated
     assert "Report generated" in out
@@ -0,0 +1,80 @@
+# tests/unit/test_flat_forest.py
+
+import numpy as np
+import pytest
+
+from src.anomaly_detection import FEATURES, load_model, save_model, train_isolation_forest
+from src.compiled_scorer import CompiledScorer
+from src.data_preparation import simulate_data
+from src.flat_forest import FlatForest
+from src.scoring_service import load_scorer, main as service_main, score_batch
+
+
+@pytest.fixture(scope='module')
+def model_and_points():
+    model = train_isolation_forest(simulate_data(1000), contamination=0.05)
+    return model, simulate_data(3000)[FEATURES].to_numpy(dtype=float)
+
+
+def test_flat_forest_scores_are_identical(model_and_points):
+    model, X = model_and_points
+    flat = FlatForest.from_model(model)
+    assert flat.n_estimators == len(model.estimators_)
+    np.testing.assert_array_equal(flat.score_samples(X), model.score_samples(X))
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+    # Single rows and the scoring service's (scores, flags) contract
+    np.testing.assert_array_equal(flat.score_samples(X[0]), model.score_samples(X[:1]))
+    for got, expected in zip(score_batch(flat, X[:50]), score_batch(model, X[:50])):
+        np.testing.assert_array_equal(got, expected)
+
+
+def test_breadth_first_layout(model_and_points):
+    model, _ = model_and_points
+    flat = FlatForest.from_model(model)
+    internal = np.isfinite(flat.threshold)
+    # Children are adjacent pairs after their parent; leaves point to themselves
+    assert (flat.children[internal] > np.flatnonzero(internal)).all()
+    np.testing.assert_array_equal(flat.children[~internal], np.flatnonzero(~internal))
+    assert flat.max_depth == max(tree.get_depth() for tree in model.estimators_)
+
+
+def test_save_and_load(tmp_path, model_and_points):
+    model, X = model_and_points
+    path = FlatForest.from_model(model).save(str(tmp_path / 'forest.npz'))
+    loaded = load_scorer(path)
+    assert isinstance(loaded, FlatForest)
+    np.testing.assert_array_equal(loaded.score_samples(X), model.score_samples(X))
+    assert loaded.offset_ == model.offset_
+    # The compiled grid can be built from the export as well
+    scores, _ = CompiledScorer(loaded, grid_size=32).score(X[:10])
+    assert len(scores) == 10
+
+
+def test_export_command(tmp_path, model_and_points, capsys):
+    model, X = model_and_points
+    joblib_path = save_model(model, str(tmp_path / 'model.joblib'))
+    service_main(['export', '--model', joblib_path, '--output', str(tmp_path / 'model.npz')])
+    assert "Flat model saved to" in capsys.readouterr().out
+    np.testing.assert_array_equal(load_scorer(str(tmp_path / 'model.npz')).score_samples(X),
+                                  load_model(joblib_path).score_samples(X))
+
+
+def test_large_batches_chunks_and_sklearn_fallback(monkeypatch, model_and_points):
+    import src.flat_forest as flat_forest
+
+    model, X = model_and_points
+    flat = FlatForest.from_model(model)
+    monkeypatch.setattr(flat_forest, 'LEAVES_CHUNK_ROWS', 7)
+    np.testing.assert_array_equal(flat.score_samples(X[:100]), model.score_samples(X[:100]))
+
+    # Batches from SKLEARN_MIN_ROWS rows are scored by the fitted model itself
+    monkeypatch.setattr(flat_forest, 'SKLEARN_MIN_ROWS', 10)
+    monkeypatch.setattr(flat, 'leaves', lambda X: pytest.fail("flat arrays used for a large batch"))
+    np.testing.assert_array_equal(flat.score_samples(X[:100]), model.score_samples(X[:100]))
+
+
+def test_save_returns_the_written_file(tmp_path, model_and_points):
+    model, _ = model_and_points
+    path = FlatForest.from_model(model).save(str(tmp_path / 'forest'))
+    assert path == str(tmp_path / 'forest.npz')
+    assert FlatForest.load(path).model is None
@@ -0,0 +1,40 @@
+# tests/unit/test_float32_features.py
+
+import numpy as np
+from sklearn.utils import check_array
+
+from src.anomaly_detection import detect_anomalies, detect_anomalies_lof, prepare_features
+from src.data_preparation import simulate_data, normalize_features
+
+
+def test_prepare_features_is_contiguous_float32():
+    data = normalize_features(simulate_data(100))
+    features = prepare_features(data)
+    assert features.dtype == np.float32
+    assert features.flags['C_CONTIGUOUS']
+    assert features.shape == (100, 2)
+    assert features.nbytes == data[['views', 'likes']].to_numpy().nbytes // 2
+    # sklearn's input validation accepts it without converting (no extra copy)
+    assert check_array(features, dtype=np.float32) is features
+
+
+def test_float32_flags_match_default_path():
+    data = normalize_features(simulate_data(500))
+    features = prepare_features(data)
+
+    default = detect_anomalies_lof(detect_anomalies(data.copy()), contamination=0.05, keep_scores=True)
+    fast = detect_anomalies(data.copy(), features=features)
+    fast = detect_anomalies_lof(fast, contamination=0.05, features=features, keep_scores=True)
+
+    # IsolationForest already works in float32 internally: identical flags
+    np.testing.assert_array_equal(fast['anomaly'], default['anomaly'])
+
+    # LOF distances lose precision in float32; the largest score error comes from
+    # nearly tied neighbor distances
+    error = np.abs(fast['lof_score'] - default['lof_score'])
+    assert np.median(error) < 1e-3 and error.max() < 0.02
+    # A flag can only change for a row whose score is within the error of the threshold
+    threshold = np.percentile(default['lof_score'], 5)
+    clear = np.abs(default['lof_score'] - threshold) > 2 * error.max()
+    assert clear.mean() > 0.9
+    np.testing.assert_array_equal(fast['anomaly_lof'][clear], default['anomaly_lof'][clear])
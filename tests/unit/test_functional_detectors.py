@@ -0,0 +1,58 @@
+# tests/unit/test_functional_detectors.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detection import (detect_anomalies, detect_anomalies_lof, isolation_forest_scores,
+                                   lof_scores, prepare_features, score_features, train_isolation_forest)
+from src.data_preparation import simulate_data
+
+
+def _read_only_features(n=400):
+    features = prepare_features(simulate_data(n))
+    features.setflags(write=False)  # any in-place write would raise
+    return features
+
+
+def test_functions_do_not_mutate_or_print(capsys):
+    data = simulate_data(300)
+    before = data.copy()
+    features = _read_only_features(300)
+    capsys.readouterr()
+
+    scores, flags = isolation_forest_scores(features, contamination=0.05)
+    factors, lof_flags = lof_scores(features, n_neighbors=10, contamination=0.05)
+
+    assert scores.shape == factors.shape == (300,)
+    assert flags.dtype == lof_flags.dtype == np.int8
+    assert capsys.readouterr().out == ''
+    pd.testing.assert_frame_equal(data, before)
+
+
+def test_wrappers_match_the_functions():
+    data = simulate_data(300)
+    features = data[['views', 'likes']].to_numpy()
+    _, flags = isolation_forest_scores(features, contamination=0.05)
+    _, lof_flags = lof_scores(features, n_neighbors=10, contamination=0.05)
+
+    result = detect_anomalies_lof(detect_anomalies(data.copy(), contamination=0.05),
+                                  n_neighbors=10, contamination=0.05)
+    np.testing.assert_array_equal(result['anomaly'].to_numpy(), flags)
+    np.testing.assert_array_equal(result['anomaly_lof'].to_numpy(), lof_flags)
+
+
+def test_threads_share_one_model_and_one_array():
+    features = _read_only_features()
+    model = train_isolation_forest(None, contamination=0.05, features=features)
+    expected = score_features(model, features)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: score_features(model, features), range(8)))
+        detections = list(pool.map(lambda _: isolation_forest_scores(features, contamination=0.05), range(4)))
+
+    for scores, flags in results + detections:
+        np.testing.assert_array_equal(scores, expected[0])
+        np.testing.assert_array_equal(flags, expected[1])
+    np.testing.assert_array_equal(expected[1], (model.predict(features) == -1).astype(np.int8))
@@ -0,0 +1,73 @@
+# tests/unit/test_group_detection.py
+
+import logging
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detection import detect_anomalies, detect_anomalies_by, prepare_features
+from src.data_preparation import simulate_data
+from src.rules import RULE_COLUMN
+
+
+def test_simulate_data_account_column():
+    data = simulate_data(100, n_accounts=3)
+    assert set(data['account']) <= {'account_0', 'account_1', 'account_2'}
+    # Views/likes are unchanged by the extra column
+    pd.testing.assert_frame_equal(data[['views', 'likes']], simulate_data(100))
+
+
+def test_each_large_group_gets_its_own_model():
+    data = simulate_data(400, n_accounts=2)
+    result = detect_anomalies_by(data.copy(), key='account', contamination=0.05,
+                                 min_group_size=10, n_workers=1)
+
+    for _, group in data.groupby('account'):
+        expected = detect_anomalies(group[['views', 'likes']].copy(), contamination=0.05)['anomaly']
+        np.testing.assert_array_equal(result.loc[group.index, 'anomaly'], expected)
+
+
+def test_small_groups_share_a_pooled_model():
+    data = simulate_data(300, n_accounts=2)
+    data.loc[data.index[:20], 'account'] = ['tiny_a'] * 10 + ['tiny_b'] * 10
+    result = detect_anomalies_by(data.copy(), key='account', min_group_size=50, n_workers=1)
+
+    pooled = data[data['account'].isin(['tiny_a', 'tiny_b'])]
+    expected = detect_anomalies(pooled[['views', 'likes']].copy(), contamination=0.05)['anomaly']
+    np.testing.assert_array_equal(result.loc[pooled.index, 'anomaly'], expected)
+
+
+def test_process_pool_matches_in_process_run(caplog):
+    caplog.set_level(logging.INFO)
+    data = simulate_data(600, n_accounts=4)
+    data.loc[data.index[:15], 'account'] = 'tiny'
+    serial = detect_anomalies_by(data.copy(), min_group_size=30, n_workers=1)
+    parallel = detect_anomalies_by(data.copy(), min_group_size=30, n_workers=2)
+    pd.testing.assert_series_equal(serial['anomaly'], parallel['anomaly'])
+    assert "4 group models, 1 groups pooled" in caplog.text
+
+
+def test_missing_keys_form_their_own_group():
+    data = simulate_data(300, n_accounts=2)
+    data.loc[data.index[:60], 'account'] = np.nan
+    result = detect_anomalies_by(data.copy(), key='account', min_group_size=50, n_workers=1)
+
+    missing = data[data['account'].isna()]
+    expected = detect_anomalies(missing[['views', 'likes']].copy(), contamination=0.05)['anomaly']
+    np.testing.assert_array_equal(result.loc[missing.index, 'anomaly'], expected)
+
+
+def test_grouped_path_forwards_the_detector_options():
+    data = simulate_data(400, n_accounts=2)
+    data[RULE_COLUMN] = 0
+    data.loc[data.index[:5], RULE_COLUMN] = 1
+    features = prepare_features(data)
+    result = detect_anomalies_by(data.copy(), key='account', min_group_size=10, n_workers=1,
+                                 exclude_rule_violations=True, features=features, dedup=True, keep_scores=True)
+
+    assert (result['anomaly'].iloc[:5] == 1).all() and result['anomaly_score'].iloc[:5].isna().all()
+    for account, group in data.iloc[5:].groupby('account'):
+        expected = detect_anomalies(group[['views', 'likes']].copy(), contamination=0.05,
+                                    features=features[5:][(data['account'].iloc[5:] == account).to_numpy()],
+                                    keep_scores=True)
+        np.testing.assert_array_equal(result.loc[group.index, 'anomaly'], expected['anomaly'])
+        np.testing.assert_allclose(result.loc[group.index, 'anomaly_score'], expected['anomaly_score'])
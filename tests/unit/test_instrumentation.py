@@ -0,0 +1,104 @@
+# tests/unit/test_instrumentation.py
+
+import json
+
+import pandas as pd
+import pytest
+
+import src.instrumentation as instrumentation
+from src.instrumentation import RunMetrics, peak_rss_mb
+from src.utils import setup_logger
+
+
+def test_stage_records_timings_rows_and_logs(tmp_path):
+    log_file = tmp_path / 'pipeline.log'
+    logger = setup_logger('test_instrumentation_stage', str(log_file))
+    metrics = RunMetrics(logger)
+
+    with metrics.stage('prepare') as record:
+        record['rows'] = 3
+    with metrics.stage('detect', rows=5):
+        sum(range(1000))
+
+    assert [r['stage'] for r in metrics.records] == ['prepare', 'detect']
+    first = metrics.records[0]
+    assert first['rows'] == 3
+    assert first['wall_s'] >= 0 and first['cpu_s'] >= 0
+    assert first['process_peak_rss_mb'] is None or first['process_peak_rss_mb'] > 0
+    assert first['peak_rss_delta_mb'] is None or first['peak_rss_delta_mb'] >= 0
+
+    # One structured JSON record per stage in the log file
+    for h in logger.handlers:
+        h.flush()
+    logged = [json.loads(line.split(' INFO ', 1)[1]) for line in log_file.read_text().splitlines()]
+    assert [r['stage'] for r in logged] == ['prepare', 'detect']
+    assert logged[1]['rows'] == 5
+
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+        h.close()
+
+
+def test_stage_is_recorded_even_when_it_fails():
+    metrics = RunMetrics()
+    with pytest.raises(ValueError):
+        with metrics.stage('broken'):
+            raise ValueError("boom")
+    assert metrics.records[0]['stage'] == 'broken'
+    assert 'wall_s' in metrics.records[0]
+
+
+def test_track_decorator_counts_rows():
+    metrics = RunMetrics()
+
+    @metrics.track()
+    def load():
+        return pd.DataFrame({'views': [1, 2, 3]})
+
+    @metrics.track('no_rows')
+    def nothing():
+        return 42
+
+    assert len(load()) == 3
+    assert nothing() == 42
+    assert metrics.records[0]['stage'] == 'load'
+    assert metrics.records[0]['rows'] == 3
+    assert metrics.records[1]['rows'] is None
+
+
+def test_summary_table_and_json_dump(tmp_path):
+    metrics = RunMetrics()
+    with metrics.stage('report', rows=10):
+        pass
+    table = metrics.summary_table()
+    assert 'report' in table and 'total' in table
+
+    out = metrics.dump_json(str(tmp_path / 'metrics.json'))
+    payload = json.loads(open(out).read())
+    assert payload['stages'][0]['stage'] == 'report'
+
+
+def test_peak_rss_without_resource(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'resource', None)
+    assert peak_rss_mb() is None
+    metrics = RunMetrics()
+    with metrics.stage('detect'):
+        pass
+    assert metrics.records[0]['peak_rss_delta_mb'] is None
+
+
+def test_stages_report_their_increase_of_the_process_peak(monkeypatch):
+    # Process peak read at the start and at the end of each stage
+    readings = iter([100.0, 250.0, 250.0, 250.0])
+    monkeypatch.setattr(instrumentation, 'peak_rss_mb', lambda: next(readings))
+    metrics = RunMetrics()
+    with metrics.stage('load'):
+        pass
+    with metrics.stage('detect'):
+        pass
+
+    load, detect = metrics.records
+    assert (load['peak_rss_delta_mb'], load['process_peak_rss_mb']) == (150.0, 250.0)
+    # The second stage stayed below the peak reached by the first one
+    assert (detect['peak_rss_delta_mb'], detect['process_peak_rss_mb']) == (0.0, 250.0)
+    assert 'peak RSS +MB' in metrics.summary_table()
@@ -0,0 +1,116 @@
+# tests/unit/test_pipelined.py
+
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomaly_detection import FEATURES, train_isolation_forest
+from src.data_preparation import simulate_data
+from src.pipelined import ChunkedDetector, run_pipeline
+from src.results_store import ResultsStore
+
+
+def test_stages_overlap_and_keep_the_order():
+    def slow(tag):
+        def step(item):
+            time.sleep(0.05)
+            return item + [tag]
+        return step
+
+    written = []
+    start = time.perf_counter()
+    stats = run_pipeline(([i] for i in range(12)),
+                         [('a', slow('a')), ('b', slow('b')), ('write', lambda item: written.append(item))])
+    elapsed = time.perf_counter() - start
+
+    assert written == [[i, 'a', 'b'] for i in range(12)]
+    assert stats['read']['items'] == stats['a']['items'] == stats['write']['items'] == 12
+    # Serially 12 * 2 * 0.05 = 1.2s; pipelined about (12 + 1) * 0.05
+    assert elapsed < 1.0
+
+
+def test_bounded_queues_hold_back_the_reader():
+    read, written = [], []
+
+    def source():
+        for i in range(50):
+            read.append(i)
+            yield i
+
+    def slow_write(item):
+        time.sleep(0.005)
+        written.append(item)
+        # reader queue + prepare queue + the items held by each thread
+        assert len(read) - len(written) <= 2 * 2 + 3
+
+    run_pipeline(source(), [('prepare', lambda i: i), ('write', slow_write)], queue_size=2)
+    assert written == list(range(50))
+
+
+def test_a_failing_stage_stops_the_pipeline():
+    def fail(item):
+        if item == 3:
+            raise ValueError("bad chunk")
+        return item
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        run_pipeline(itertools.count(), [('prepare', fail), ('write', lambda item: None)], queue_size=1)
+
+
+def test_a_generator_source_is_closed_when_the_pipeline_stops():
+    closed = []
+
+    def source():
+        try:
+            yield from itertools.count()
+        finally:
+            closed.append(True)
+
+    def fail(item):
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError):
+        run_pipeline(source(), [('write', fail)], queue_size=1)
+    assert closed == [True]
+
+
+def test_chunked_detector_scores_every_chunk_with_one_model(tmp_path):
+    data = simulate_data(1000)
+    chunks = [data.iloc[i:i + 250].copy() for i in range(0, 1000, 250)]
+    store = ResultsStore(str(tmp_path))
+    detector = ChunkedDetector(store=store, contamination=0.1, train_rows=250)
+    stats = detector.run(chunks, queue_size=2)
+
+    expected = train_isolation_forest(chunks[0], contamination=0.1).predict(data[FEATURES].to_numpy()) == -1
+    stored = store.query()
+    assert stats['write']['items'] == 4 and detector.rows == 1000
+    assert len(set(stored['run_id'])) == 1
+    np.testing.assert_array_equal(stored['anomaly'].to_numpy(), expected.astype(int))
+    assert detector.anomalies == int(expected.sum())
+
+
+@pytest.mark.parametrize('fit_sample', [False, True])
+def test_chunked_flags_do_not_depend_on_the_chunk_size(fit_sample):
+    data = simulate_data(500)
+    flags = {}
+    for chunk_size in (20, 500):
+        chunks = lambda: [data.iloc[i:i + chunk_size].copy() for i in range(0, len(data), chunk_size)]
+        detector = ChunkedDetector(contamination=0.05)
+        if fit_sample:
+            detector.fit_sample(chunks(), 200)
+        scored = []
+        run_pipeline(chunks(), [('prepare', detector.prepare), ('score', detector.score, detector.flush),
+                                ('write', scored.append)])
+        flags[chunk_size] = pd.concat(scored)['anomaly'].to_numpy()
+
+    np.testing.assert_array_equal(flags[20], flags[500])
+    assert abs(flags[20].mean() - 0.05) < 0.02
+
+
+def test_flush_passes_the_buffered_rows_on():
+    received = []
+    run_pipeline(range(5), [('buffer', lambda item: None, lambda: 'flushed'), ('write', received.append)])
+    assert received == ['flushed']
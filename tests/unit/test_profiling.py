@@ -0,0 +1,104 @@
+# tests/unit/test_profiling.py
+
+import pstats
+import time
+
+import pytest
+
+import src.profiling as profiling
+from src.instrumentation import RunMetrics
+from src.profiling import configure_profiling, profile_stage, is_profiled
+
+
+@pytest.fixture(autouse=True)
+def clean_profiling(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    monkeypatch.delenv(profiling.PROFILER_ENV, raising=False)
+    monkeypatch.delenv(profiling.PROFILE_DIR_ENV, raising=False)
+    profiling.reset_profiling()
+    yield
+    profiling.reset_profiling()
+
+
+def test_profiling_disabled_by_default():
+    assert not is_profiled('detection')
+    with profile_stage('detection') as path:
+        assert path is None
+
+
+def test_env_var_selects_stages_and_writes_cprofile(tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, 'detection, report')
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path))
+    assert is_profiled('report') and not is_profiled('plotting')
+
+    with profile_stage('detection') as path:
+        sorted(range(10000), key=lambda x: -x)
+
+    assert path == str(tmp_path / 'detection.prof')
+    stats = pstats.Stats(path)
+    assert stats.total_calls > 0
+
+
+def test_sampling_profiler_writes_folded_stacks(tmp_path):
+    configure_profiling(stages='all', profiler='sampling', output_dir=str(tmp_path))
+
+    def busy():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    with profile_stage('plotting') as path:
+        busy()
+
+    lines = open(path).read().splitlines()
+    assert path.endswith('plotting.collapsed')
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('busy' in line for line in lines)
+
+
+def test_unknown_profiler_is_rejected():
+    with pytest.raises(ValueError):
+        configure_profiling(profiler='perf')
+
+
+def test_run_metrics_stage_records_profile_file(tmp_path):
+    configure_profiling(stages=['report'], output_dir=str(tmp_path))
+    metrics = RunMetrics()
+    with metrics.stage('report'):
+        pass
+    with metrics.stage('detection'):
+        pass
+    assert metrics.records[0]['profile'] == str(tmp_path / 'report.prof')
+    assert 'profile' not in metrics.records[1]
+
+
+def test_unknown_profiler_in_env_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, 'detection')
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(profiling.PROFILER_ENV, 'sampler')
+
+    with pytest.raises(ValueError, match="Unknown profiler 'sampler' in FAKE_METRICS_PROFILER"):
+        with profile_stage('detection'):
+            pass
+    assert not list(tmp_path.iterdir())
+
+
+def test_sampling_profiler_sees_worker_threads(tmp_path):
+    import threading
+    configure_profiling(stages='all', profiler='sampling', output_dir=str(tmp_path))
+
+    def spin():
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            pass
+
+    with profile_stage('pipelined_detection', threads=True) as path:
+        worker = threading.Thread(target=spin, name='pipeline-score')
+        worker.start()
+        worker.join()
+
+    lines = open(path).read().splitlines()
+    assert any(line.startswith('pipeline-score;') and 'spin' in line for line in lines)
+    assert any(line.startswith('MainThread;') for line in lines)
@@ -0,0 +1,85 @@
+# tests/unit/test_queue_logging.py
+
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils import BatchedFileHandler, setup_queue_logging, stop_queue_logging, worker_logging
+
+
+def test_records_reach_console_and_file_through_the_queue(tmp_path, capsys):
+    log_file = tmp_path / 'diagnostics.log'
+    listener = setup_queue_logging('test_queue_logging.a', log_file=str(log_file))
+    # A second setup keeps the running listener
+    assert setup_queue_logging('test_queue_logging.a') is listener
+
+    logger = logging.getLogger('test_queue_logging.a')
+    logger.info("Number of anomalies detected: 3")
+    logger.debug("not shown at INFO")
+    logger.error("Erreur lors du chargement des données: boom")
+    stop_queue_logging('test_queue_logging.a')
+
+    assert capsys.readouterr().out.splitlines() == [
+        "Number of anomalies detected: 3", "Erreur lors du chargement des données: boom"]
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 2
+    assert ' ERROR test_queue_logging.a Erreur' in lines[1]
+    assert not logger.handlers
+
+
+def test_logging_call_does_not_wait_for_the_io(tmp_path):
+    release = threading.Event()
+
+    class SlowHandler(logging.Handler):
+        def emit(self, record):
+            release.wait(5)
+
+    listener = setup_queue_logging('test_queue_logging.b', console=False)
+    listener.handlers = (SlowHandler(),)
+    logger = logging.getLogger('test_queue_logging.b')
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info("event %d", i)
+    assert time.perf_counter() - start < 1.0
+    release.set()
+    stop_queue_logging('test_queue_logging.b')
+
+
+def test_batched_file_handler_flushes_by_batch(tmp_path):
+    log_file = tmp_path / 'batched.log'
+    handler = BatchedFileHandler(str(log_file), batch_size=3, flush_interval=3600)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    record = lambda msg: logging.LogRecord('x', logging.INFO, __file__, 1, msg, None, None)
+
+    handler.emit(record('one'))
+    handler.emit(record('two'))
+    assert log_file.read_text() == ''
+    handler.emit(record('three'))
+    assert log_file.read_text().splitlines() == ['one', 'two', 'three']
+    handler.emit(record('four'))
+    handler.close()
+    assert log_file.read_text().splitlines()[-1] == 'four'
+
+
+def test_worker_records_reach_the_parent_listener(capsys):
+    setup_queue_logging('test_queue_logging.c')
+    initializer, initargs = worker_logging('test_queue_logging.c')
+    worker_logger = logging.getLogger('test_queue_logging.c.worker')
+    with ProcessPoolExecutor(max_workers=2, initializer=initializer, initargs=initargs) as pool:
+        list(pool.map(worker_logger.warning, ["from worker %d" % i for i in range(4)]))
+    stop_queue_logging('test_queue_logging.c')
+
+    assert sorted(capsys.readouterr().out.splitlines()) == [f"from worker {i}" for i in range(4)]
+
+
+def test_batched_file_handler_flushes_after_the_interval_without_new_records(tmp_path):
+    log_file = tmp_path / 'quiet.log'
+    handler = BatchedFileHandler(str(log_file), batch_size=100, flush_interval=0.05)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.emit(logging.LogRecord('x', logging.INFO, __file__, 1, 'only record', None, None))
+    deadline = time.monotonic() + 5
+    while log_file.read_text() == '' and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert log_file.read_text() == 'only record\n'
+    handler.close()
@@ -0,0 +1,106 @@
+# tests/unit/test_report_images.py
+
+import importlib
+import os
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pytest
+from PIL import Image
+
+import src.generate_report as gr
+from src.generate_report import generate_report, prepare_report_image
+
+
+@pytest.fixture
+def rgba_plot(tmp_path):
+    # A matplotlib PNG (RGBA, 2000 px wide) like the ones produced by src.visualization
+    path = tmp_path / 'plot.png'
+    fig = plt.figure(figsize=(10, 5), dpi=200)
+    plt.plot([1, 2, 3], [3, 1, 2])
+    fig.savefig(path)
+    plt.close(fig)
+    return str(path)
+
+
+def test_prepare_report_image_flattens_resizes_and_caches(tmp_path, rgba_plot):
+    cache = str(tmp_path / 'cache')
+    prepared = prepare_report_image(rgba_plot, cache, dpi=100)
+    with Image.open(prepared) as image:
+        assert image.mode == 'RGB'
+        assert image.width == round(190 / 25.4 * 100)
+
+    mtime = os.path.getmtime(prepared)
+    assert prepare_report_image(rgba_plot, cache, dpi=100) == prepared
+    assert os.path.getmtime(prepared) == mtime
+    # A different target resolution is a different cache entry
+    assert prepare_report_image(rgba_plot, cache, dpi=72) != prepared
+
+
+def test_unused_cache_entries_are_pruned(tmp_path, rgba_plot):
+    cache = str(tmp_path / 'cache')
+    old = prepare_report_image(rgba_plot, cache, dpi=100)
+    kept = prepare_report_image(rgba_plot, cache, dpi=90)
+    stale = gr.time.time() - gr.IMAGE_CACHE_MAX_AGE_S - 60
+    os.utime(old, (stale, stale))
+    os.utime(kept, (stale, stale))
+
+    # A hit refreshes the entry; adding a new one removes the entries unused for too long
+    assert prepare_report_image(rgba_plot, cache, dpi=90) == kept
+    new = prepare_report_image(rgba_plot, cache, dpi=72)
+    assert sorted(os.listdir(cache)) == sorted(os.path.basename(p) for p in (kept, new))
+
+
+def test_parsed_images_are_reused_across_reports(tmp_path, rgba_plot, monkeypatch):
+    gr._parsed_images.clear()
+    calls = []
+    original = gr.FPDF._parsepng
+    monkeypatch.setattr(gr.FPDF, '_parsepng', lambda self, name: calls.append(name) or original(self, name))
+
+    for i in range(3):
+        out = tmp_path / f'report_{i}.pdf'
+        result = generate_report(10, 5, 1, 0.5, rgba_plot, rgba_plot, 'm', 'd', output_file=str(out))
+        assert result == str(out)
+        assert out.stat().st_size > 1000
+    # One parse for all the images of the three reports
+    assert len(calls) == 1
+    assert os.listdir(tmp_path / '.image_cache')
+
+
+def test_unreadable_image_falls_back_to_fpdf(tmp_path, monkeypatch):
+    broken = tmp_path / 'broken.png'
+    broken.write_bytes(b'')
+    seen = []
+    monkeypatch.setattr(gr.FPDF, 'image', lambda self, name, **kwargs: seen.append(name))
+    generate_report(1, 1, 0, 1.0, str(broken), str(broken), 'm', 'd', output_file=str(tmp_path / 'r.pdf'))
+    assert seen == [str(broken), str(broken)]
+
+
+def test_generate_reports_in_a_process_pool(tmp_path, rgba_plot):
+    # Workers pickle the job function by name: use the module currently registered in sys.modules
+    generate_reports = importlib.import_module('src.generate_report').generate_reports
+    jobs = [dict(total_views=100 * i, total_likes=10 * i, anomaly_count=i, ratio=0.1,
+                 metrics_image=rgba_plot, distribution_image=rgba_plot,
+                 metrics_explanation='m', distribution_explanation='d',
+                 output_file=str(tmp_path / f'segment_{i}.pdf'))
+            for i in range(1, 4)]
+    results = generate_reports(jobs, n_workers=2)
+    assert results == [job['output_file'] for job in jobs]
+    assert all(os.path.exists(path) for path in results)
+    assert generate_reports(jobs[:1], n_workers=2) == [jobs[0]['output_file']]
+
+
+def test_parsed_image_cache_is_bounded_and_tracks_modifications(tmp_path, rgba_plot, monkeypatch):
+    gr._parsed_images.clear()
+    monkeypatch.setattr(gr, 'PARSED_IMAGES_MAX', 2)
+    pdf = gr.FPDF()
+    prepared = prepare_report_image(rgba_plot, str(tmp_path / 'cache'))
+    gr._parsed_png(pdf, prepared)
+    # A rewritten file is parsed again instead of reusing stale data
+    os.utime(prepared, (1, 1))
+    gr._parsed_png(pdf, prepared)
+    assert len(gr._parsed_images) == 2
+    os.utime(prepared, (2, 2))
+    gr._parsed_png(pdf, prepared)
+    assert len(gr._parsed_images) == 2
+    assert list(gr._parsed_images) == [(prepared, 1.0), (prepared, 2.0)]
@@ -0,0 +1,79 @@
+# tests/unit/test_results_store.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
+from src.data_preparation import simulate_data
+from src.results_store import ResultsStore
+
+
+def _scored(n=200, seed=0):
+    data = simulate_data(n, n_accounts=2)
+    data['views'] += seed
+    data = detect_anomalies(data, contamination=0.1, keep_scores=True)
+    return detect_anomalies_lof(data, n_neighbors=10, contamination=0.1, keep_scores=True)
+
+
+def test_append_only_adds_partitioned_files(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results'))
+    first = store.append(_scored(), run_id='run-a', date='2024-05-01')
+    second = store.append(_scored(), run_id='run-a', date='2024-05-01')
+    store.append(_scored(), run_id='run-b', date='2024-05-02')
+
+    assert first != second
+    assert (tmp_path / 'results' / 'date=2024-05-01' / 'run=run-a').is_dir()
+    assert [(d, r) for d, r, _ in store.partitions()] == [('2024-05-01', 'run-a'), ('2024-05-02', 'run-b')]
+    assert len(store.query()) == 600
+
+    stored = store.query(run_id='run-b')
+    assert list(stored.columns[:7]) == ['views', 'likes', 'anomaly', 'anomaly_score',
+                                        'anomaly_lof', 'lof_score', 'account']
+    assert set(stored['date']) == {'2024-05-02'}
+    with pytest.raises(ValueError):
+        store.append(_scored(), run_id='../escape')
+
+
+def test_query_prunes_partitions_and_files_by_statistics(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append(_scored(seed=0), run_id='r1', date='2024-05-01')       # views in [50, 1000)
+    store.append(_scored(seed=5000), run_id='r2', date='2024-05-02')    # views in [5050, 6000)
+    store.append(_scored(seed=0), run_id='r3', date='2024-05-09')
+
+    assert [r for _, r, _ in store.files(start='2024-05-02')] == ['r2', 'r3']
+    assert [r for _, r, _ in store.files(filters={'views': ('>=', 5000)})] == ['r2']
+    assert [r for _, r, _ in store.files(filters={'views': ('BETWEEN', (1000, 5000))})] == []
+
+    week = store.query(start='2024-05-01', end='2024-05-07', filters={'anomaly': 1},
+                       columns=['views', 'anomaly_score'])
+    expected = pd.concat([_scored(seed=0), _scored(seed=5000)], ignore_index=True)
+    expected = expected[expected['anomaly'] == 1]
+    assert list(week.columns) == ['views', 'anomaly_score', 'date', 'run_id']
+    assert len(week) == len(expected)
+    np.testing.assert_allclose(np.sort(week['anomaly_score']), np.sort(expected['anomaly_score']))
+
+
+def test_like_filters_match_sqlite(tmp_path):
+    import sqlite3
+    data = pd.DataFrame({'account': ['account_1', 'account_12', 'Account_1x', 'acc.unt_1', None, 'account_2'],
+                         'views': range(6)})
+    store = ResultsStore(str(tmp_path))
+    store.append(data, run_id='r1', date='2024-05-01')
+    with sqlite3.connect(':memory:') as conn:
+        data.to_sql('metrics', conn, index=False)
+        for pattern in ('account_1%', 'account__', '%1_', 'acc.unt%', '%'):
+            expected = [v for (v,) in conn.execute('SELECT views FROM metrics WHERE account LIKE ?', (pattern,))]
+            assert store.query(filters={'account': ('LIKE', pattern)})['views'].tolist() == expected, pattern
+
+
+def test_query_of_an_empty_store(tmp_path):
+    result = ResultsStore(str(tmp_path / 'none')).query(columns=['views'])
+    assert result.empty and list(result.columns) == ['views', 'date', 'run_id']
+
+
+def test_keep_scores_matches_the_flags():
+    data = _scored()
+    assert ((data['anomaly_score'] < data['anomaly_score'].quantile(0.1)) == (data['anomaly'] == 1)).mean() > 0.99
+    assert data.loc[data['anomaly_lof'] == 1, 'lof_score'].max() < data.loc[data['anomaly_lof'] == 0, 'lof_score'].min()
+    assert 'anomaly_score' not in detect_anomalies(simulate_data(100)).columns
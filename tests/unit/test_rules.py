@@ -0,0 +1,62 @@
+# tests/unit/test_rules.py
+
+import logging
+import numpy as np
+import pandas as pd
+
+from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
+from src.data_preparation import simulate_data
+from src.rules import (RULE_COLUMN, RULE_LIKES_ABOVE_VIEWS, RULE_NEGATIVE_COUNT, RULE_RATIO_ABOVE_MAX,
+                       check_rules, describe_violations, flag_rule_violations)
+
+
+def test_check_rules_sets_one_bit_per_violated_rule():
+    views = np.array([100, 100, -5, 0, 100])
+    likes = np.array([50, 150, 1, 3, 95])
+    codes = check_rules(views, likes, max_ratio=0.9)
+    assert codes.tolist() == [
+        0,
+        RULE_LIKES_ABOVE_VIEWS | RULE_RATIO_ABOVE_MAX,
+        RULE_LIKES_ABOVE_VIEWS | RULE_NEGATIVE_COUNT | RULE_RATIO_ABOVE_MAX,
+        RULE_LIKES_ABOVE_VIEWS | RULE_RATIO_ABOVE_MAX,   # views == 0: no division error
+        RULE_RATIO_ABOVE_MAX,
+    ]
+    assert check_rules(views, likes)[4] == 0
+    counts = describe_violations(codes)
+    assert counts['likes > views'] == 3
+    assert counts['negative count'] == 1
+
+
+def test_flag_rule_violations_finds_injected_anomalies(caplog):
+    caplog.set_level(logging.INFO)
+    data = flag_rule_violations(simulate_data(200))
+    # simulate_data injects likes > views in 5% of the rows
+    assert (data[RULE_COLUMN] != 0).sum() == 10
+    assert "Number of rule violations: 10" in caplog.text
+
+
+def test_detectors_skip_rule_violations_when_asked():
+    data = flag_rule_violations(simulate_data(200))
+    violations = data[RULE_COLUMN] != 0
+
+    excluded = detect_anomalies(data.copy(), contamination=0.05, exclude_rule_violations=True)
+    excluded = detect_anomalies_lof(excluded, contamination=0.05, exclude_rule_violations=True)
+    # Violations are anomalies regardless of the models
+    assert excluded.loc[violations, 'anomaly'].eq(1).all()
+    assert excluded.loc[violations, 'anomaly_lof'].eq(1).all()
+    # contamination applies to the rows the models actually saw
+    assert excluded.loc[~violations, 'anomaly'].sum() == round(0.05 * (~violations).sum())
+
+    # Default behaviour ignores the rule column
+    default = detect_anomalies(data.copy(), contamination=0.05)
+    plain = detect_anomalies(data.drop(columns=RULE_COLUMN), contamination=0.05)
+    pd.testing.assert_series_equal(default['anomaly'], plain['anomaly'])
+
+
+def test_all_rows_violating_rules_skip_the_models():
+    data = pd.DataFrame({'views': [1, 2, 3], 'likes': [5, 6, 7]})
+    data = flag_rule_violations(data)
+    out = detect_anomalies(data, exclude_rule_violations=True)
+    out = detect_anomalies_lof(out, exclude_rule_violations=True)
+    assert out['anomaly'].tolist() == [1, 1, 1]
+    assert out['anomaly_lof'].tolist() == [1, 1, 1]
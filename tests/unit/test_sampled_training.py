@@ -0,0 +1,76 @@
+# tests/unit/test_sampled_training.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.anomaly_detection import (detect_anomalies, detect_anomalies_sampled, reservoir_sample,
+                                   sampling_agreement, stratified_sample)
+from src.data_preparation import simulate_data
+
+
+def test_reservoir_sample_is_bounded_and_uniform():
+    rows = np.arange(10000).reshape(-1, 1)
+    chunks = (rows[i:i + 999] for i in range(0, len(rows), 999))
+    sample = reservoir_sample(chunks, 500, random_state=0)
+    assert sample.shape == (500, 1)
+    assert len(np.unique(sample)) == 500
+    # Uniform over the stream: the sample mean is close to the population mean
+    assert abs(sample.mean() - rows.mean()) < 500
+
+    # Fewer rows than the reservoir: everything is kept
+    assert len(reservoir_sample([rows[:10]], 500)) == 10
+    assert reservoir_sample([], 5).shape == (0, 2)
+
+
+def test_stratified_sample_keeps_every_stratum():
+    features = np.arange(1000).reshape(-1, 1)
+    strata = np.array([0] * 990 + [1] * 10)
+    sample = stratified_sample(features, 100, strata)
+    assert len(sample) == 100
+    assert (sample >= 990).sum() == 1
+
+
+def test_sampled_training_scores_every_row():
+    data = simulate_data(2000)
+    result = detect_anomalies_sampled(data.copy(), contamination=0.05, sample_size=500, batch_size=300)
+    assert len(result) == 2000
+    assert result['anomaly'].isin([0, 1]).all()
+    assert 0.02 < result['anomaly'].mean() < 0.1
+
+    stratified = detect_anomalies_sampled(data.copy(), sample_size=500, strategy='stratified')
+    assert stratified['anomaly'].sum() > 0
+
+    with pytest.raises(ValueError):
+        detect_anomalies_sampled(data.copy(), strategy='random')
+
+
+def test_sample_covering_all_rows_matches_full_training():
+    data = simulate_data(300)
+    sampled = detect_anomalies_sampled(data.copy(), sample_size=300, batch_size=1000)
+    full = detect_anomalies(data.copy())
+    # Same rows in the same order (reservoir fill phase) -> same model
+    pd.testing.assert_series_equal(sampled['anomaly'], full['anomaly'])
+
+
+def test_sampled_training_with_rule_violations_and_float32():
+    from src.anomaly_detection import prepare_features
+    from src.rules import flag_rule_violations
+    data = flag_rule_violations(simulate_data(2000))
+    violations = data['rule_violation'] != 0
+    result = detect_anomalies_sampled(data.copy(), sample_size=500, exclude_rule_violations=True,
+                                      features=prepare_features(data))
+    # Violations are flagged directly; the contamination applies to the other rows
+    assert (result.loc[violations, 'anomaly'] == 1).all()
+    assert 0.02 < result.loc[~violations, 'anomaly'].mean() < 0.1
+
+    all_violations = data.assign(rule_violation=1)
+    assert (detect_anomalies_sampled(all_violations, exclude_rule_violations=True)['anomaly'] == 1).all()
+
+
+def test_sampling_agreement_report():
+    report = sampling_agreement(simulate_data(2000), sample_size=400)
+    assert report['rows'] == 2000
+    assert report['agreement'] > 0.9
+    assert 0 <= report['precision'] <= 1 and 0 <= report['recall'] <= 1
+    assert report['full_anomalies'] == 100
@@ -0,0 +1,148 @@
+# tests/unit/test_scoring_service.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.anomaly_detection import FEATURES, load_model, save_model, train_isolation_forest
+from src.data_preparation import simulate_data
+from src.scoring_service import (LatencyStats, MicroBatcher, ScoringService,
+                                 request, score_batch, main as service_main)
+
+
+@pytest.fixture(scope='module')
+def model_and_data():
+    data = simulate_data(300)
+    return train_isolation_forest(data, contamination=0.05), data
+
+
+def test_model_round_trip_and_score_batch(tmp_path, model_and_data):
+    model, data = model_and_data
+    path = save_model(model, str(tmp_path / 'model.joblib'))
+    loaded = load_model(path)
+    X = data[FEATURES].to_numpy()
+    scores, flags = score_batch(loaded, X)
+    expected = (model.predict(X) == -1).astype(int)
+    np.testing.assert_array_equal(flags, expected)
+    np.testing.assert_allclose(scores, model.score_samples(X))
+
+
+def test_service_scores_concurrent_events_in_micro_batches(model_and_data):
+    model, data = model_and_data
+    X = data[FEATURES].to_numpy()[:40]
+    expected = (model.predict(X) == -1).astype(int).tolist()
+
+    async def scenario():
+        service = ScoringService(model, workers=2, max_batch_size=64, max_wait=0.05)
+        await service.start(port=0)
+        try:
+            events = [{'views': float(v), 'likes': float(l)} for v, l in X]
+            responses = await asyncio.gather(*[
+                request('POST', '/score', event, port=service.port) for event in events])
+            status, stats = await request('GET', '/stats', port=service.port)
+            health = await request('GET', '/health', port=service.port)
+            bad = await request('POST', '/score', {'events': [{'views': 1}]}, port=service.port)
+            non_finite = [await request('POST', '/score', {'views': value, 'likes': 1}, port=service.port)
+                          for value in ('nan', 'NaN', 1e400, '-inf')]
+            missing = await request('GET', '/nope', port=service.port)
+        finally:
+            await service.stop()
+        return responses, stats, health, bad, non_finite, missing
+
+    responses, stats, health, bad, non_finite, missing = asyncio.run(scenario())
+    assert all(status == 200 for status, _ in responses)
+    assert [body['anomaly'][0] for _, body in responses] == expected
+    # 40 concurrent single-event requests are coalesced into fewer batches
+    assert stats['events'] == 40
+    assert stats['batches'] < 40
+    assert stats['p99_ms'] >= stats['p50_ms'] > 0
+    assert stats['throughput_eps'] > 0
+    assert health == (200, {'status': 'ok'})
+    assert bad[0] == 400
+    assert [status for status, _ in non_finite] == [400] * 4
+    assert missing[0] == 404
+
+
+def test_service_over_unix_socket(tmp_path, model_and_data):
+    model, data = model_and_data
+    socket_path = str(tmp_path / 'scoring.sock')
+
+    async def scenario():
+        service = ScoringService(model)
+        await service.start(path=socket_path)
+        try:
+            return await request('POST', '/score', {'events': data[FEATURES].head(5).to_dict('records')},
+                                 unix_path=socket_path)
+        finally:
+            await service.stop()
+
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    assert len(body['scores']) == 5
+
+
+def test_service_answers_malformed_requests_and_scoring_errors(model_and_data):
+    model, _ = model_and_data
+
+    class BrokenModel:
+        offset_ = model.offset_
+
+        def score_samples(self, features):
+            raise RuntimeError("model unavailable")
+
+    async def scenario():
+        service = ScoringService(BrokenModel())
+        await service.start(port=0)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', service.port)
+            writer.write(b"garbage\r\n\r\n")
+            await writer.drain()
+            malformed = await reader.read()
+            writer.close()
+            failed = await request('POST', '/score', {'views': 10, 'likes': 1}, port=service.port)
+        finally:
+            await service.stop()
+        return malformed, failed
+
+    malformed, failed = asyncio.run(scenario())
+    assert malformed.startswith(b"HTTP/1.1 400 Bad Request")
+    assert failed[0] == 500 and 'model unavailable' in failed[1]['error']
+
+
+def test_micro_batcher_flushes_on_size_and_propagates_errors():
+    calls = []
+
+    def score_fn(features):
+        calls.append(len(features))
+        if np.isnan(features).any():
+            raise ValueError("nan")
+        return features[:, 0], (features[:, 0] > 1).astype(int)
+
+    async def scenario():
+        with ThreadPoolExecutor(1) as pool:
+            batcher = MicroBatcher(score_fn, pool, max_batch_size=3, max_wait=10)
+            results = await asyncio.gather(*[batcher.submit(np.array([[float(i), 0.0]])) for i in range(3)])
+            with pytest.raises(ValueError):
+                await asyncio.gather(*[batcher.submit(np.array([[np.nan, 0.0]])) for _ in range(3)])
+        return results, batcher.stats
+
+    results, stats = asyncio.run(scenario())
+    # Size-triggered flush: one batch of 3 rows despite the long time window
+    assert calls[0] == 3
+    assert [flags[0] for _, flags in results] == [0, 0, 1]
+    assert stats.batches == 1
+
+
+def test_latency_stats_empty_snapshot():
+    snapshot = LatencyStats().snapshot()
+    assert snapshot['events'] == 0 and snapshot['p50_ms'] == 0.0
+
+
+def test_train_command_saves_model(tmp_path):
+    csv = tmp_path / 'raw.csv'
+    simulate_data(100).to_csv(csv, index=False)
+    model_path = tmp_path / 'model.joblib'
+    service_main(['train', '--data', str(csv), '--model', str(model_path)])
+    assert hasattr(load_model(str(model_path)), 'offset_')
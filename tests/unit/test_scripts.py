@@ -1,5 +1,7 @@
 # tests/unit/test_scripts.py
 
+import logging
+import os
 import pytest
 import pandas as pd
 import numpy as np
@@ -8,7 +10,8 @@ import src.utils
 from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
 from src.data_preparation import (
     preprocess_data, load_data, clean_data, simulate_data,
-    get_data, get_clean_data, normalize_features, add_features, standardize_data
+    get_data, get_clean_data, normalize_features, add_features, standardize_data,
+    clean_path_for, RAW_DATA_PATH, CLEAN_DATA_PATH
 )
 from src.generate_report import generate_report, handle_missing_data
 from src.visualization import (
@@ -16,13 +19,14 @@ from src.visualization import (
     interactive_plot_metrics, interactive_plot_distribution
 )
 
-def test_detect_anomalies_columns_and_output(capsys):
+def test_detect_anomalies_columns_and_output(caplog):
+    caplog.set_level(logging.INFO)
     df = pd.DataFrame({'views': [10, 20, 30], 'likes': [1, 2, 3]})
     result = detect_anomalies(df.copy(), contamination=0.1)
     assert 'anomaly' in result.columns
     assert result['anomaly'].isin([0, 1]).all()
-    captured = capsys.readouterr()
-    assert "Number of anomalies detected" in captured.out
+    captured = caplog.text
+    assert "Number of anomalies detected" in captured
 
 def test_detect_anomalies_lof_mapping():
     df = pd.DataFrame({'views': [10, 20, 30], 'likes': [1, 2, 3]})
@@ -59,28 +63,31 @@ def test_preprocess_data_pipeline(tmp_path):
     assert 'like_view_ratio' in processed.columns
     assert processed.isnull().sum().sum() == 0
 
-def test_load_data_success_and_failure(tmp_path, capsys):
+def test_load_data_success_and_failure(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
     # Success
     file = tmp_path / 'test.csv'
     df = pd.DataFrame({'a': [1, 2]})
     df.to_csv(file, index=False)
     data = load_data(str(file))
-    captured = capsys.readouterr()
-    assert "Dataset chargé depuis" in captured.out
+    captured = caplog.text
+    assert "Dataset chargé depuis" in captured
     pd.testing.assert_frame_equal(data, df)
 
     # Failure
     data_none = load_data(str(tmp_path / 'no.csv'))
-    captured = capsys.readouterr()
+    captured = caplog.text
     assert data_none is None
-    assert "Erreur lors du chargement des données" in captured.out
+    assert "Erreur lors du chargement des données" in captured
+    assert caplog.records[-1].levelno == logging.ERROR
 
-def test_simulate_data_and_print(capsys):
+def test_simulate_data_and_print(caplog):
+    caplog.set_level(logging.INFO)
     df = simulate_data(50)
     assert isinstance(df, pd.DataFrame)
     assert 'views' in df.columns and 'likes' in df.columns
-    captured = capsys.readouterr()
-    assert "Dataset simulé généré" in captured.out
+    captured = caplog.text
+    assert "Dataset simulé généré" in captured
 
 def test_get_data_branches(tmp_path):
     # File exists
@@ -102,14 +109,15 @@ def test_get_data_branches(tmp_path):
     assert isinstance(data3, pd.DataFrame)
     assert not file3.exists()
 
-def test_get_clean_data_branches(tmp_path, capsys):
+def test_get_clean_data_branches(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
     # Clean file exists
     clean = tmp_path / 'clean.csv'
     df = pd.DataFrame({'views': [1], 'likes': [2]})
     df.to_csv(clean, index=False)
     loaded = get_clean_data(clean_filepath=str(clean))
-    captured = capsys.readouterr()
-    assert "Clean dataset loaded from" in captured.out
+    captured = caplog.text
+    assert "Clean dataset loaded from" in captured
     pd.testing.assert_frame_equal(loaded, df)
 
     # Clean file does not exist
@@ -121,30 +129,53 @@ def test_get_clean_data_branches(tmp_path, capsys):
     assert isinstance(result, pd.DataFrame)
     assert out_clean.exists()
 
+    # Raw file modified after the cache: the cache is rebuilt from it
+    pd.DataFrame({'views': [7, 8], 'likes': [1, 2]}).to_csv(raw, index=False)
+    os.utime(raw, (os.path.getmtime(out_clean) + 10,) * 2)
+    result = get_clean_data(raw_filepath=str(raw), clean_filepath=str(out_clean), save_if_generated=True)
+    assert result['views'].tolist() == [7, 8]
+    assert pd.read_csv(out_clean)['views'].tolist() == [7, 8]
+
+def test_each_raw_file_has_its_own_clean_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert clean_path_for(RAW_DATA_PATH) == CLEAN_DATA_PATH
+    # Bare file names: saved in the current directory
+    pd.DataFrame({'views': [1, 2], 'likes': [1, 1]}).to_csv('old.csv', index=False)
+    get_clean_data(raw_filepath='old.csv', save_if_generated=True)
+    pd.DataFrame({'views': [5], 'likes': [1]}).to_csv('other.csv', index=False)
+    # The cache of old.csv is newer than other.csv but belongs to another file
+    os.utime('other.csv', (os.path.getmtime(clean_path_for('old.csv')) - 10,) * 2)
+    assert get_clean_data(raw_filepath='other.csv', save_if_generated=True)['views'].tolist() == [5]
+    assert clean_path_for('old.csv') != clean_path_for('other.csv')
+
+    generated = get_clean_data(raw_filepath='raw.csv', n_samples=5, save_if_generated=True)
+    assert len(generated) == 5 and os.path.exists('raw.csv')
+
 def test_handle_missing_data_function():
     df = pd.DataFrame({'x': [1, None], 'y': [2, 3]})
     cleaned = handle_missing_data(df)
     assert cleaned.isnull().sum().sum() == 0
 
-def test_generate_report_success_and_error(tmp_path, monkeypatch, capsys):
+def test_generate_report_success_and_error(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
     # Success path
     out_file = tmp_path / 'report.pdf'
     result = generate_report(10, 5, 2, 0.5,
                              'no_metrics.png', 'no_dist.png',
                              'explain', 'dist_explain',
                              output_file=str(out_file))
-    captured = capsys.readouterr()
+    captured = caplog.text
     assert result == str(out_file)
-    assert "Report generated" in captured.out
+    assert "Report generated" in captured
     assert out_file.exists()
 
     # Error path: simulate FPDF.output failing
     import src.generate_report as gr
     monkeypatch.setattr(gr.FPDF, 'output', lambda self, path: (_ for _ in ()).throw(Exception("fail")))
     err = generate_report(1, 1, 0, 1.0, 'x', 'y', 'e', 'd', output_file=str(tmp_path / 'err.pdf'))
-    captured = capsys.readouterr()
+    captured = caplog.text
     assert err is None
-    assert "[ERROR] Erreur lors de la génération du rapport" in captured.out
+    assert "Erreur lors de la génération du rapport" in captured
 
 
 # def test_setup_logger_raises_attribute_error():
@@ -177,7 +208,8 @@ def test_get_column_summary_values():
     assert summary['max'] == 4
 
 
-def test_plot_metrics_and_distribution_and_interactive(tmp_path, monkeypatch, capsys):
+def test_plot_metrics_and_distribution_and_interactive(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
     # Prepare data
     df = pd.DataFrame({'views': [1, 2], 'likes': [2, 3], 'anomaly': [0, 1]})
     save_metrics = tmp_path / 'metrics.png'
@@ -187,20 +219,20 @@ def test_plot_metrics_and_distribution_and_interactive(tmp_path, monkeypatch, ca
     monkeypatch.setattr(plot_metrics.__globals__['plt'], 'show', lambda: None)
 
     plot_metrics(df, save_path=str(save_metrics))
-    out = capsys.readouterr()
-    assert str(save_metrics) in out.out
+    out = caplog.text
+    assert str(save_metrics) in out
     assert save_metrics.exists()
 
     plot_distribution(df, 'views', save_path=str(save_dist))
-    out = capsys.readouterr()
-    assert str(save_dist) in out.out
+    out = caplog.text
+    assert str(save_dist) in out
     assert save_dist.exists()
 
     # Interactive metrics
     int_metrics = tmp_path / 'int_metrics.html'
     fig1 = interactive_plot_metrics(df, output_file=str(int_metrics))
-    out = capsys.readouterr()
-    assert str(int_metrics) in out.out
+    out = caplog.text
+    assert str(int_metrics) in out
     assert int_metrics.exists()
     assert hasattr(fig1, 'to_html')
 
@@ -208,15 +240,15 @@ def test_plot_metrics_and_distribution_and_interactive(tmp_path, monkeypatch, ca
     df2 = pd.DataFrame({'views': [1], 'likes': [2]})
     int_metrics2 = tmp_path / 'int2.html'
     fig2 = interactive_plot_metrics(df2, output_file=str(int_metrics2))
-    out = capsys.readouterr()
-    assert "Warning: the 'anomaly' column is not present; all points will be marked 'Normal'." in out.out
+    out = caplog.text
+    assert "The 'anomaly' column is not present; all points will be marked 'Normal'." in out
     assert int_metrics2.exists()
     assert hasattr(fig2, 'to_html')
 
     # Interactive distribution
     int_dist = tmp_path / 'int_dist.html'
     fig3 = interactive_plot_distribution(df, column='views', output_file=str(int_dist))
-    out = capsys.readouterr()
-    assert str(int_dist) in out.out
+    out = caplog.text
+    assert str(int_dist) in out
     assert int_dist.exists()
     assert hasattr(fig3, 'to_html')
@@ -0,0 +1,78 @@
+# tests/unit/test_segment_reports.py
+
+import logging
+import importlib
+
+import numpy as np
+
+import pandas as pd
+import pytest
+
+from src.segment_reports import _segment_slug, segment_totals
+
+
+@pytest.fixture
+def scored():
+    return pd.DataFrame({
+        'account': ['b', 'a', 'b', 'a', 'c/d', 'a'],
+        'views': [10.0, 20.0, 30.0, 0.0, 0.0, 5.0],
+        'likes': [1.0, 2.0, 3.0, 0.0, 0.0, 1.0],
+        'anomaly': [0, 1, 1, 0, 0, 1],
+    })
+
+
+def test_segment_totals_in_one_pass(scored):
+    totals = segment_totals(scored, 'account')
+    assert list(totals.index) == ['a', 'b', 'c/d']
+    assert totals.loc['a', 'rows'] == 3
+    assert totals.loc['a', 'views'] == 25.0
+    assert totals.loc['b', 'anomalies'] == 1
+    assert totals.loc['b', 'ratio'] == pytest.approx(0.1)
+    # No views: ratio 0 instead of a division by zero
+    assert totals.loc['c/d', 'ratio'] == 0.0
+
+
+def test_segment_slug():
+    assert _segment_slug('account_1') == 'account_1'
+    assert _segment_slug('c/d').startswith('c_d-')
+    assert _segment_slug('../').startswith('segment-')
+    # Values that sanitize to the same name keep distinct slugs
+    assert _segment_slug('a b') != _segment_slug('a_b') == 'a_b'
+    assert _segment_slug(np.nan).startswith('missing-')
+
+
+def test_missing_segment_values_are_kept(scored):
+    scored.loc[[1, 4], 'account'] = None
+    totals = segment_totals(scored, 'account')
+    assert totals['rows'].sum() == len(scored)
+    assert totals.loc[np.nan, 'rows'] == 2
+
+
+def test_colliding_segment_names_are_rejected(scored):
+    module = importlib.import_module('src.segment_reports')
+    scored['account'] = [1, '1', 1, '1', 1, 1]
+    with pytest.raises(ValueError):
+        module.generate_segment_reports(scored, 'account', n_workers=1)
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_one_report_per_segment(tmp_path, scored, n_workers, caplog):
+    caplog.set_level(logging.INFO)
+    # Workers pickle the job function by name: use the module currently registered in sys.modules
+    module = importlib.import_module('src.segment_reports')
+    reports = module.generate_segment_reports(scored, 'account', output_dir=str(tmp_path / 'reports'),
+                                              plots_dir=str(tmp_path / 'plots'), n_workers=n_workers)
+
+    assert list(reports) == ['a', 'b', 'c/d']
+    assert reports['c/d'] == str(tmp_path / 'reports' / f"FakeMetrics_Report_{_segment_slug('c/d')}.pdf")
+    for segment, path in reports.items():
+        assert (tmp_path / 'reports' / f'FakeMetrics_Report_{_segment_slug(segment)}.pdf').exists()
+        assert (tmp_path / 'plots' / _segment_slug(segment) / 'metrics_scatter.png').exists()
+        assert (tmp_path / 'plots' / _segment_slug(segment) / 'distribution_views.png').exists()
+    assert "Segment reports generated: 3/3" in caplog.text
+
+
+def test_unknown_segment_column(scored):
+    module = importlib.import_module('src.segment_reports')
+    with pytest.raises(KeyError):
+        module.generate_segment_reports(scored, 'country', n_workers=1)
@@ -0,0 +1,80 @@
+# tests/unit/test_spatial_index.py
+
+import numpy as np
+import pytest
+
+from src.data_preparation import simulate_data
+from src.spatial_index import GridIndex, selection_rows
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.lognormal(5, 1, 5000), [1e5, 2e5]])
+    y = x * rng.uniform(0.1, 0.9, len(x))
+    return x, y
+
+
+def test_box_queries_match_a_full_scan(points):
+    x, y = points
+    index = GridIndex(x, y)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        x0, x1 = np.sort(rng.uniform(0, 1000, 2))
+        y0, y1 = np.sort(rng.uniform(0, 600, 2))
+        expected = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+        np.testing.assert_array_equal(index.query_box((x0, x1), (y0, y1)), expected)
+    # Bounds are inclusive, and boxes outside the data are empty
+    np.testing.assert_array_equal(index.query_box((x[3], x[3]), (y[3], y[3])), [3])
+    assert len(index.query_box((-10, -1), (0, 1e9))) == 0
+    assert len(index.query_box((0, 1e9), (0, 1e9))) == len(x)
+
+
+def test_polygon_queries_match_a_full_scan(points):
+    x, y = points
+    index = GridIndex(x, y, cells_per_axis=20)
+    triangle = [(50, 10), (800, 100), (300, 500)]
+    a, b, c = np.array(triangle, dtype=float)
+
+    def side(p, q):
+        return (q[0] - p[0]) * (y - p[1]) - (q[1] - p[1]) * (x - p[0])
+
+    expected = np.flatnonzero((side(a, b) > 0) & (side(b, c) > 0) & (side(c, a) > 0))
+    np.testing.assert_array_equal(index.query_polygon(triangle), expected)
+    assert len(index.query_polygon([(0, 0), (1, 1)])) == 0
+
+
+def test_thin_keeps_isolated_points(points):
+    x, y = points
+    index = GridIndex(x, y)
+    rows = index.thin(1000)
+    assert 900 <= len(rows) <= 1000
+    assert len(np.unique(rows)) == len(rows)
+    # Each cell keeps min(size, k) rows: sparse cells are kept whole
+    counts = np.diff(index.offsets)
+    kept = np.bincount(index._column(x[rows]) * index.shape[1] + index._row(y[rows]), minlength=len(counts))
+    k = kept.max()
+    np.testing.assert_array_equal(kept, np.minimum(counts, k))
+    assert (counts < k).any()
+    np.testing.assert_array_equal(index.thin(10 ** 6), np.arange(len(x)))
+    assert len(index.thin(3)) == 3
+
+
+def test_from_frame_and_degenerate_data():
+    data = simulate_data(200)
+    index = GridIndex.from_frame(data)
+    assert len(index) == 200 and index.offsets[-1] == 200
+    constant = GridIndex(np.ones(10), np.ones(10))
+    np.testing.assert_array_equal(constant.query_box((1, 1), (0, 2)), np.arange(10))
+    assert len(GridIndex(np.empty(0), np.empty(0)).query_box((0, 1), (0, 1))) == 0
+
+
+def test_selection_rows_of_a_plotly_event(points):
+    x, y = points
+    index = GridIndex(x, y)
+    selection = {'points': [], 'box': [{'x': [400, 100], 'y': [50, 200]}],
+                 'lasso': [{'x': [0, 50, 50, 0], 'y': [0, 0, 40, 40]}]}
+    expected = np.flatnonzero(((x >= 100) & (x <= 400) & (y >= 50) & (y <= 200))
+                              | ((x > 0) & (x < 50) & (y > 0) & (y < 40)))
+    np.testing.assert_array_equal(selection_rows(index, selection), expected)
+    assert selection_rows(index, {'points': [], 'box': [], 'lasso': []}) is None
@@ -0,0 +1,102 @@
+# tests/unit/test_sql_source.py
+
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from src.data_preparation import simulate_data
+from src.sql_source import ConnectionPool, build_query, close_pools, get_pool, read_sql, read_sql_chunks
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'metrics.db')
+    with sqlite3.connect(path) as conn:
+        simulate_data(250, n_accounts=3).to_sql('metrics', conn, index_label='id')
+    return path
+
+
+def test_build_query_binds_every_value():
+    sql, params = build_query('metrics', columns=['views', 'likes'],
+                              filters={'account': ['a', 'b'], 'views': ('>=', 100),
+                                       'likes': ('BETWEEN', (1, 5)), 'day': None},
+                              order_by='views')
+    assert sql == ('SELECT "views", "likes" FROM "metrics" WHERE "account" IN (?, ?) AND "views" >= ? '
+                   'AND "likes" BETWEEN ? AND ? AND "day" IS NULL ORDER BY "views"')
+    assert params == ['a', 'b', 100, 1, 5]
+    with pytest.raises(ValueError):
+        build_query('metrics; DROP TABLE metrics')
+
+
+def test_chunks_stream_the_filtered_projection(database):
+    pool = ConnectionPool(database, size=1)
+    chunks = list(read_sql_chunks(None, 'metrics', columns=['views', 'likes'],
+                                  filters={'account': 'account_1', 'views': ('>', 500)},
+                                  order_by='id', chunk_size=20, pool=pool))
+    with sqlite3.connect(database) as conn:
+        expected = pd.read_sql("SELECT views, likes FROM metrics WHERE account = 'account_1' AND views > 500 "
+                               "ORDER BY id", conn)
+
+    assert all(len(c) <= 20 for c in chunks) and len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+    assert pool.opened == 1
+
+
+def test_read_sql_reuses_pooled_connections(database):
+    opened = []
+
+    def connect(db):
+        opened.append(db)
+        return sqlite3.connect(db, check_same_thread=False)
+
+    pool = ConnectionPool(database, size=2, connect=connect)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(len(read_sql(None, 'metrics', pool=pool))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [250] * 8
+    assert 1 <= len(opened) <= 2
+    pool.close()
+    assert pool.opened == 0
+
+
+def test_read_sql_empty_result_and_errors(database, caplog):
+    empty = read_sql(database, 'metrics', columns=['views', 'likes'], filters={'account': []})
+    assert empty.empty and list(empty.columns) == ['views', 'likes']
+
+    assert read_sql(database, 'missing_table') is None
+    assert "Erreur lors du chargement des données" in caplog.text
+
+
+def test_a_missing_database_is_not_created(tmp_path):
+    path = tmp_path / 'missing.db'
+    pool = ConnectionPool(str(path))
+    assert read_sql(None, 'metrics', pool=pool) is None
+    assert not path.exists()
+
+
+def test_shared_pool_size_must_match(database):
+    try:
+        assert get_pool(database, size=2) is get_pool(database)
+        assert get_pool(database, size=2).size == 2
+        with pytest.raises(ValueError, match="already has 2 connections"):
+            get_pool(database, size=3)
+    finally:
+        close_pools()
+
+
+def test_closing_the_generator_releases_the_connection(database):
+    pool = ConnectionPool(database, size=1)
+    chunks = read_sql_chunks(None, 'metrics', chunk_size=10, pool=pool)
+    next(chunks)
+    chunks.close()
+    # The only connection of the pool is available again
+    with pool.connection(timeout=1) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM metrics').fetchone() == (250,)
+    assert pool.opened == 1
@@ -0,0 +1,47 @@
+# tests/unit/test_sweep.py
+
+import numpy as np
+import pytest
+
+from src.anomaly_detection import detect_anomalies, detect_anomalies_lof
+from src.data_preparation import simulate_data, normalize_features
+from src.sweep import sweep_detectors, raw_scores, main as sweep_main
+
+
+@pytest.fixture(scope='module')
+def data():
+    return normalize_features(simulate_data(300))
+
+
+def test_sweep_flags_match_dedicated_runs(data):
+    grid = [0.02, 0.05, 0.1]
+    results = sweep_detectors(data, grid, n_estimators=[100], n_neighbors=[20], n_workers=1)
+    assert len(results) == 2 * len(grid)
+
+    for contamination in grid:
+        forest = results[(results.model == 'isolation_forest') & (results.contamination == contamination)].iloc[0]
+        lof = results[(results.model == 'lof') & (results.contamination == contamination)].iloc[0]
+        expected_if = detect_anomalies(data.copy(), contamination=contamination)['anomaly']
+        expected_lof = detect_anomalies_lof(data.copy(), n_neighbors=20, contamination=contamination)['anomaly_lof']
+        np.testing.assert_array_equal(forest['flags'], expected_if)
+        np.testing.assert_array_equal(lof['flags'], expected_lof)
+
+
+def test_parallel_sweep_matches_serial(data):
+    kwargs = dict(n_estimators=[50, 100], n_neighbors=[10])
+    serial = sweep_detectors(data, [0.05], n_workers=1, **kwargs)
+    parallel = sweep_detectors(data, [0.05], n_workers=2, **kwargs)
+    assert serial['anomaly_count'].tolist() == parallel['anomaly_count'].tolist()
+    assert serial['value'].tolist() == [50, 100, 10]
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError):
+        raw_scores('svm', 1, np.zeros((3, 2)))
+
+
+def test_sweep_command_line(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    results = sweep_main(['--contamination', '0.05,0.1', '--n-neighbors', '', '--n-samples', '100', '--workers', '1'])
+    assert results['contamination'].tolist() == [0.05, 0.1]
+    assert 'isolation_forest' in capsys.readouterr().out
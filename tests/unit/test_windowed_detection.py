@@ -0,0 +1,92 @@
+# tests/unit/test_windowed_detection.py
+
+import numpy as np
+import pytest
+
+from src.windowed_detection import SlidingWindowDetector
+
+
+def _feed(rng, n, views_mean=500.0):
+    views = rng.normal(views_mean, 50, n)
+    return np.column_stack([views, views * rng.uniform(0.1, 0.5, n)])
+
+
+def test_no_model_until_min_samples():
+    detector = SlidingWindowDetector(window_size=50, min_samples=20, background=False)
+    scores, flags = detector.update(np.ones((10, 2)))
+    assert np.isnan(scores).all() and not flags.any()
+    assert detector.model is None
+    detector.update(np.random.default_rng(0).normal(size=(10, 2)))
+    assert detector.model is not None
+    assert detector.fits == 1
+
+
+def test_window_keeps_only_the_most_recent_points():
+    detector = SlidingWindowDetector(window_size=5, min_samples=5, max_age=10**6, background=False)
+    for i in range(3):
+        detector.update(np.full((3, 2), float(i)))
+    # 9 points seen (0,0,0,1,1,1,2,2,2): the window holds the last 5
+    assert detector._count == 5
+    np.testing.assert_allclose(detector._window_sum, [2 * 1 + 3 * 2] * 2)
+    np.testing.assert_allclose(np.sort(detector._window[:, 0]), [1, 1, 2, 2, 2])
+
+
+def test_retrains_on_age_and_on_drift():
+    rng = np.random.default_rng(1)
+    detector = SlidingWindowDetector(window_size=200, min_samples=100, max_age=150,
+                                     drift_threshold=2.0, background=False)
+    detector.update(_feed(rng, 100))
+    assert detector.fits == 1
+
+    # Age: 150 new points since the last fit
+    detector.update(_feed(rng, 149))
+    assert detector.fits == 1
+    detector.update(_feed(rng, 1))
+    assert detector.fits == 2
+
+    # Drift: a shifted regime triggers a refit well before max_age
+    detector.update(_feed(rng, 60, views_mean=2000.0))
+    assert detector.fits == 3
+    assert detector.drift() < 2.0
+
+
+def test_background_retrain_does_not_block_scoring():
+    rng = np.random.default_rng(2)
+    detector = SlidingWindowDetector(window_size=300, min_samples=100, max_age=100, contamination=0.05)
+    try:
+        detector.update(_feed(rng, 100))
+        detector.wait()
+        first_model = detector.model
+        assert first_model is not None
+
+        normal = _feed(rng, 1)
+        outlier = np.array([[100.0, 5000.0]])
+        _, flags = detector.update(np.vstack([normal, outlier]))
+        assert flags.tolist() == [0, 1]
+
+        detector.update(_feed(rng, 100))
+        detector.wait()
+        assert detector.model is not first_model
+        assert detector.fits == 2
+    finally:
+        detector.close()
+
+
+def test_compiled_window_scores_by_lookup():
+    rng = np.random.default_rng(3)
+    detector = SlidingWindowDetector(window_size=300, min_samples=100, max_age=10**6, background=False,
+                                     compiled=True)
+    detector.update(_feed(rng, 200))
+    points = np.vstack([_feed(rng, 50), [[100.0, 5000.0]]])
+    _, flags = detector.score(points)
+    assert flags[-1] == 1
+    assert detector._scorer.rows == len(points)
+    # The table only answers cells whose whole score range is on one side of the threshold
+    np.testing.assert_array_equal(flags, (detector.model.predict(points) == -1).astype(np.int8))
+    many = _feed(rng, 5000)
+    np.testing.assert_array_equal(detector.score(many)[1], (detector.model.predict(many) == -1).astype(np.int8))
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        SlidingWindowDetector(window_size=10, min_samples=20)